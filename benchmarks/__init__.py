@@ -0,0 +1 @@
+# Throughput benchmarks for the batch and email grading paths.
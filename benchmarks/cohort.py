@@ -0,0 +1,75 @@
+import base64
+import copy
+import json
+import os
+import random
+
+SAMPLE_NOTEBOOK = os.path.join(os.path.dirname(__file__), "..", "examples", "sample.ipynb")
+
+# 1x1 transparent PNG, repeated to reach the requested payload size.
+_PNG_PIXEL = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+def _code_cell(idx, output_lines, rng):
+    lines = [f"epoch {i}: loss={rng.random():.4f}\n" for i in range(output_lines)]
+    return {
+        "cell_type": "code",
+        "execution_count": idx,
+        "metadata": {},
+        "outputs": [{"name": "stdout", "output_type": "stream", "text": lines}],
+        "source": [f"resultado_{idx} = entrenar(paso={idx})\n", f"print(resultado_{idx})\n"],
+    }
+
+
+def _image_output(image_kb):
+    payload = _PNG_PIXEL * max(1, (image_kb * 1024) // len(_PNG_PIXEL))
+    return {
+        "output_type": "display_data",
+        "metadata": {},
+        "data": {
+            "image/png": base64.b64encode(payload).decode("ascii"),
+            "text/plain": ["<Figure size 640x480 with 1 Axes>"],
+        },
+    }
+
+
+def build_notebook(cells=10, output_lines=5, images=0, image_kb=64, seed=0):
+    """Synthetic submission derived from ``examples/sample.ipynb``."""
+    rng = random.Random(seed)
+    with open(SAMPLE_NOTEBOOK, "r", encoding="utf-8") as f:
+        nb = json.load(f)
+    base_cells = nb["cells"]
+    out_cells = copy.deepcopy(base_cells[:2])
+    for idx in range(max(0, cells - len(base_cells))):
+        cell = _code_cell(idx + 2, output_lines, rng)
+        if idx < images:
+            cell["outputs"].append(_image_output(image_kb))
+        out_cells.append(cell)
+    out_cells.append(copy.deepcopy(base_cells[-1]))
+    nb["cells"] = out_cells
+    return nb
+
+
+def generate_cohort(root, students=20, cells=10, output_lines=5, images=0, image_kb=64, seed=0):
+    """Write ``students`` folders named ``apellido_nombre`` under ``root``."""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for i in range(students):
+        student_dir = os.path.join(root, f"alumno{i:04d}_bench")
+        os.makedirs(student_dir, exist_ok=True)
+        # Vary the size a little so scheduling has something to work with.
+        nb = build_notebook(
+            cells=max(3, cells + rng.randint(-cells // 2, cells // 2)),
+            output_lines=output_lines,
+            images=images,
+            image_kb=image_kb,
+            seed=seed + i,
+        )
+        path = os.path.join(student_dir, "entrega.ipynb")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(nb, f, ensure_ascii=False)
+        paths.append(path)
+    return paths
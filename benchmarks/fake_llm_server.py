@@ -0,0 +1,286 @@
+import email
+import email.policy
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_STUDENT_RE = re.compile(r"STUDENT_ID:\s*(\S+)")
+_FOCUS_RE = re.compile(r"CRITERIO A EVALUAR:\s*(.+)")
+_CELL_RE = re.compile(r"\[CELL (C\d{3})\]\[[A-Z]+\]\n([^\n\[]{8,})")
+
+
+def fake_evaluation(prompt):
+    """A schema-valid evaluation that quotes the first cell of the prompt."""
+    student = _STUDENT_RE.search(prompt)
+    cell = _CELL_RE.search(prompt)
+    evidence = []
+    if cell:
+        quote = " ".join(cell.group(2).split()[:10])
+        evidence = [{"cell_ref": cell.group(1), "quote": quote}]
+    criteria = [
+        {
+            "name": f"Criterio {i + 1}",
+            "score": 14,
+            "weight": 0.25,
+            "rationale": "Generado por el servidor de benchmark.",
+            "evidence": evidence,
+            "common_errors": [],
+            "improvement": "Sin cambios.",
+            "confidence": 0.8,
+        }
+        for i in range(4)
+    ]
+    focus = _FOCUS_RE.search(prompt)
+    if focus:
+        criteria = [{**criteria[0], "name": focus.group(1).strip(), "weight": 1.0}]
+    return {
+        "student_id": student.group(1) if student else "",
+        "scale_min": 0,
+        "scale_max": 20,
+        "criteria": criteria,
+        "summary": {"good": "ok", "missing": "nada", "priority": "seguir"},
+        "top_improvements": ["seguir practicando"],
+        "guiding_questions": ["¿Por qué?", "¿Cómo?"],
+        "flags": [],
+    }
+
+
+class FakeLLMServer:
+    """Local stand-in for ``LLM_API_URL`` (messages payload mode).
+
+    ``latency`` seconds (+/- ``jitter``) are slept per request and a fraction
+    ``error_rate`` of requests answers with ``error_status`` (plus a
+    ``Retry-After`` header when ``retry_after`` is set).
+
+    Requests with ``"stream": true`` get server-sent events in ``chunk_chars``
+    pieces, ``chunk_delay`` seconds apart; ``trailing_text`` is appended after
+    the JSON (as models often do) and ``stream_aborts`` counts clients that hung
+    up before the end.
+
+    It also serves a minimal files + batches API (``/v1/files``, ``/v1/batches``);
+    a submitted job reports ``in_progress`` for ``batch_polls`` status calls.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=500,
+        seed=0,
+        retry_after=None,
+        batch_polls=0,
+        trailing_text="",
+        chunk_chars=40,
+        chunk_delay=0.0,
+    ):
+        self.latency = latency
+        self.trailing_text = trailing_text
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.stream_aborts = 0
+        self.batch_polls = batch_polls
+        self.files = {}
+        self.jobs = {}
+        self._last_prompt = ""
+        self.retry_after = retry_after
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                return
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _send_json(self, status, data, headers=None):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_events(self, data):
+                content = data["choices"][0]["message"]["content"]
+                step = max(1, server.chunk_chars)
+                events = [
+                    {"choices": [{"delta": {"content": content[i : i + step]}}]}
+                    for i in range(0, len(content), step)
+                ]
+                events.append({"choices": [], "usage": data["usage"]})
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for event in events:
+                        chunk = f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                        self._write_chunk(chunk.encode("utf-8"))
+                        time.sleep(server.chunk_delay)
+                    self._write_chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.stream_aborts += 1
+                    self.close_connection = True
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                raw = self.rfile.read(length)
+                if self.path.endswith("/files"):
+                    self._send_json(200, server._store_file(self.headers, raw))
+                elif self.path.endswith("/batches"):
+                    self._send_json(200, server._create_job(json.loads(raw)))
+                else:
+                    payload = json.loads(raw or b"{}")
+                    status, data = server._complete(payload)
+                    if status == 200 and payload.get("stream"):
+                        self._send_events(data)
+                        return
+                    headers = {}
+                    if status != 200 and server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._send_json(status, data, headers)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) >= 2 and parts[-2] == "batches":
+                    self._send_json(200, server._poll_job(parts[-1]))
+                elif len(parts) >= 3 and parts[-1] == "content":
+                    body = server.files.get(parts[-2], b"")
+                    self.send_response(200 if parts[-2] in server.files else 404)
+                    self.send_header("Content-Type", "application/jsonl")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+        return Handler
+
+    def _complete(self, payload):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-1, 1) * self.jitter)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        if fail:
+            return self.error_status, {"error": "injected"}
+        messages = payload.get("messages") or payload.get("input") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        if isinstance(prompt, list):
+            prompt = "".join(part.get("text", "") for part in prompt)
+        full = "".join(str(m.get("content", "")) for m in messages[:-1]) + prompt
+        with self._lock:
+            # Mimics automatic prefix caching: the prefix shared with the previous request.
+            shared = len(os.path.commonprefix([self._last_prompt, full]))
+            self._last_prompt = full
+        content = json.dumps(fake_evaluation(prompt), ensure_ascii=False) + self.trailing_text
+        return 200, {
+            "choices": [{"message": {"content": content}}],
+            "usage": {
+                "prompt_tokens": len(full) // 4,
+                "completion_tokens": len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": shared // 4},
+            },
+        }
+
+    def _store_file(self, headers, raw):
+        head = f"Content-Type: {headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        form = email.message_from_bytes(head + raw, policy=email.policy.HTTP)
+        content = b""
+        for part in form.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                content = part.get_payload(decode=True)
+        with self._lock:
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = content
+        return {"id": file_id, "bytes": len(content)}
+
+    def _create_job(self, request):
+        with self._lock:
+            job_id = f"batch-{len(self.jobs) + 1}"
+            self.jobs[job_id] = {
+                "id": job_id,
+                "input_file_id": request["input_file_id"],
+                "status": "in_progress",
+                "polls": 0,
+            }
+        return {"id": job_id, "status": "validating"}
+
+    def _poll_job(self, job_id):
+        job = self.jobs[job_id]
+        job["polls"] += 1
+        if job["status"] == "in_progress" and job["polls"] > self.batch_polls:
+            lines = []
+            for line in self.files[job["input_file_id"]].decode("utf-8").splitlines():
+                request = json.loads(line)
+                status, body = self._complete(request["body"])
+                lines.append(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": status, "body": body},
+                        "error": None,
+                    }
+                )
+            output = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            with self._lock:
+                output_id = f"file-{len(self.files) + 1}"
+                self.files[output_id] = output
+            job.update(status="completed", output_file_id=output_id)
+        return {k: v for k, v in job.items() if k != "polls"}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
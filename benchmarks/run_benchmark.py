@@ -0,0 +1,245 @@
+"""Throughput benchmark for ``run_batch`` and the email ingestion path.
+
+Example::
+
+    python -m benchmarks.run_benchmark --students 50 --latency 0.5 --workers 8 \\
+        --output bench.json
+"""
+
+import argparse
+import email.policy
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from email.message import EmailMessage
+from pathlib import Path
+
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args as parse_batch_args
+from mvp_agent.email_inbox import BatchConfig, process_single_message
+
+from .cohort import generate_cohort
+from .fake_llm_server import FakeLLMServer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUBRIC = os.path.join(REPO_ROOT, "examples", "rubric.json")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest rank: the smallest value with at least pct% of the samples at or below it.
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return round(ordered[rank], 4)
+
+
+def _peak_rss_mb():
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {"self": round(own, 1), "children": round(children, 1)}
+
+
+def _journal_rows(journal_path, batch_id):
+    rows = []
+    if not journal_path or not os.path.exists(journal_path):
+        return rows
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("batch_id") == batch_id:
+                rows.append(entry.get("row", {}))
+    return rows
+
+
+def _stage_stats(rows):
+    out = {}
+    for stage in ("prepare_sec", "evaluate_sec", "duration_sec"):
+        values = [float(r[stage]) for r in rows if r.get(stage) not in (None, "")]
+        out[stage] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return out
+
+
+def _batch_argv(opts, submissions, out_dir):
+    argv = [
+        "--submissions-root",
+        str(submissions),
+        "--rubric",
+        RUBRIC,
+        "--output-dir",
+        str(out_dir),
+        "--llm-provider",
+        opts.provider,
+        "--model",
+        "bench-model",
+        "--workers",
+        str(opts.workers),
+        "--no-cache",
+    ]
+    if opts.staged:
+        argv.append("--staged")
+    return argv + list(opts.batch_arg)
+
+
+def run_batch_benchmark(opts, work_dir):
+    submissions = work_dir / "submissions"
+    generate_cohort(
+        str(submissions),
+        students=opts.students,
+        cells=opts.cells,
+        output_lines=opts.output_lines,
+        images=opts.images,
+        image_kb=opts.image_kb,
+        seed=opts.seed,
+    )
+    args = parse_batch_args(_batch_argv(opts, submissions, work_dir / "outputs"))
+    started = time.monotonic()
+    report = run_batch(args)
+    return report, time.monotonic() - started
+
+
+def run_email_benchmark(opts, work_dir):
+    submissions = work_dir / "cohort"
+    paths = generate_cohort(
+        str(submissions),
+        students=opts.students,
+        cells=opts.cells,
+        output_lines=opts.output_lines,
+        images=opts.images,
+        image_kb=opts.image_kb,
+        seed=opts.seed,
+    )
+    zip_path = work_dir / "entregas.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for path in paths:
+            zf.write(path, os.path.relpath(path, submissions))
+
+    msg = EmailMessage(policy=email.policy.default)
+    msg["From"] = "docente@example.com"
+    msg["Subject"] = "Benchmark"
+    msg.set_content("Entregas del benchmark")
+    msg.add_attachment(
+        zip_path.read_bytes(), maintype="application", subtype="zip", filename="entregas.zip"
+    )
+
+    cfg = BatchConfig(
+        rubric=RUBRIC,
+        output_dir=str(work_dir / "outputs_email"),
+        llm_provider=opts.provider,
+        model="bench-model",
+        workers=opts.workers,
+        no_cache=True,
+    )
+    started = time.monotonic()
+    report, _, _ = process_single_message(msg, cfg, "agent@example.com")
+    return report, time.monotonic() - started
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de throughput de corrección por lote")
+    ap.add_argument("--mode", choices=["batch", "email"], default="batch")
+    ap.add_argument("--students", type=int, default=20)
+    ap.add_argument("--cells", type=int, default=12)
+    ap.add_argument("--output-lines", type=int, default=5)
+    ap.add_argument("--images", type=int, default=0, help="Imágenes PNG por notebook")
+    ap.add_argument("--image-kb", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--provider", choices=["http", "mock"], default="http")
+    ap.add_argument("--latency", type=float, default=0.2, help="Latencia simulada (seg)")
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", type=int, default=500)
+    ap.add_argument(
+        "--retry-after", type=float, default=None, help="Retry-After en respuestas de error"
+    )
+    ap.add_argument(
+        "--trailing-chars",
+        type=int,
+        default=0,
+        help="Caracteres de texto que el servidor agrega tras el JSON",
+    )
+    ap.add_argument("--chunk-delay", type=float, default=0.0, help="Pausa entre eventos SSE (seg)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--staged", action="store_true")
+    ap.add_argument(
+        "--batch-arg",
+        action="append",
+        default=[],
+        help="Flag extra para mvp-agent-batch (repetible), p. ej. --batch-arg=--schedule=fifo",
+    )
+    ap.add_argument("--work-dir", help="Directorio de trabajo (default: temporal)")
+    ap.add_argument("--output", help="Archivo JSON de resultados (default: stdout)")
+    return ap.parse_args(argv)
+
+
+def run(opts):
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(opts.work_dir or tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        server = FakeLLMServer(
+            latency=opts.latency,
+            jitter=opts.jitter,
+            error_rate=opts.error_rate,
+            error_status=opts.error_status,
+            seed=opts.seed,
+            retry_after=opts.retry_after,
+            trailing_text=("\n" + "x" * opts.trailing_chars) if opts.trailing_chars else "",
+            chunk_delay=opts.chunk_delay,
+        )
+        previous = {k: os.environ.get(k) for k in ("LLM_API_URL", "LLM_PAYLOAD_MODE")}
+        with server:
+            os.environ["LLM_API_URL"] = server.url
+            os.environ["LLM_PAYLOAD_MODE"] = "messages"
+            try:
+                if opts.mode == "email":
+                    report, wall = run_email_benchmark(opts, work_dir)
+                else:
+                    report, wall = run_batch_benchmark(opts, work_dir)
+            finally:
+                for key, value in previous.items():
+                    if value is None:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+
+        rows = _journal_rows(report.get("journal"), report.get("batch_id"))
+        return {
+            "mode": opts.mode,
+            "students": opts.students,
+            "workers": opts.workers,
+            "staged": opts.staged,
+            "latency": opts.latency,
+            "error_rate": opts.error_rate,
+            "wall_sec": round(wall, 3),
+            "students_per_min": round(opts.students / wall * 60, 2) if wall > 0 else None,
+            "ok": report.get("ok", 0),
+            "errors": report.get("errors", 0),
+            "stages": _stage_stats(rows),
+            "peak_rss_mb": _peak_rss_mb(),
+            "llm_requests": server.requests,
+            "llm_injected_errors": server.errors,
+            "adaptive_concurrency": report.get("adaptive_concurrency"),
+            "avg_ttft_sec": report.get("avg_ttft_sec"),
+            "avg_time_to_json_sec": report.get("avg_time_to_json_sec"),
+            "llm_stream_aborts": server.stream_aborts,
+        }
+
+
+def main():
+    opts = parse_args()
+    result = run(opts)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,20 @@ __all__ = [
     "cli",
     "batch",
     "batch_cli",
+    "batch_journal",
+    "work_queue",
     "extractor",
     "evaluator",
+    "eval_cache",
     "validator",
     "render",
     "utils",
     "notebook_runner",
     "syllabus",
     "codex_cli_client",
+    "async_llm",
+    "adaptive",
+    "resilience",
+    "batch_api",
     "review_ui",
 ]
@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from .llm_client import LLMHTTPError
+
+# Statuses that mean "slow down" rather than "this request is wrong".
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_throttle(exc: BaseException | None) -> bool:
+    return isinstance(exc, LLMHTTPError) and exc.status in THROTTLE_STATUSES
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease limit on provider requests in flight.
+
+    Every success adds ``increase / limit`` (about +``increase`` per full window);
+    a throttled response multiplies the limit by ``decrease``. Throttles from
+    requests sent before the last cut are ignored, so one burst of 429s halves
+    the limit once instead of collapsing it to the minimum. ``Retry-After``
+    pauses new admissions until it has elapsed.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64, increase=1.0, decrease=0.5):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.successes = 0
+        self.throttles = 0
+        self.decreases = 0
+        self.lowest = self.limit
+        self.highest = self.limit
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return max(self.minimum, int(self.limit))
+
+    def pause_remaining(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.limit = min(float(self.maximum), self.limit + self.increase / self.limit)
+            self.highest = max(self.highest, self.limit)
+
+    def record_throttle(self, started: float, retry_after: float | None = None) -> None:
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if started >= self._last_decrease:
+                self.limit = max(float(self.minimum), self.limit * self.decrease)
+                self.lowest = min(self.lowest, self.limit)
+                self.decreases += 1
+                self._last_decrease = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def observe(self, exc: BaseException | None, started: float) -> None:
+        if exc is None:
+            self.record_success()
+        elif is_throttle(exc):
+            self.record_throttle(started, exc.retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.current,
+            "lowest_limit": max(self.minimum, int(self.lowest)),
+            "highest_limit": int(self.highest),
+            "max_limit": self.maximum,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "decreases": self.decreases,
+        }
+
+
+class ConcurrencyGate:
+    """Blocks threads while the controller's limit is reached or a pause is active."""
+
+    def __init__(self, controller: AIMDController):
+        self.controller = controller
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while True:
+                pause = self.controller.pause_remaining()
+                if pause <= 0 and self.in_flight < self.controller.current:
+                    break
+                self._cond.wait(timeout=pause if pause > 0 else None)
+            self.in_flight += 1
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self.controller.observe(error, started)
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
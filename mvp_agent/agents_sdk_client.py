@@ -1,4 +1,9 @@
-def agents_complete(prompt, system, model):
+import asyncio
+
+from .llm_client import env_timeout
+
+
+def _build_agent(system, model):
     try:
         from agents import Agent, Runner
     except ImportError as exc:
@@ -11,5 +16,17 @@ def agents_complete(prompt, system, model):
         instructions=system,
         model=model,
     )
-    result = Runner.run_sync(starting_agent=agent, input=prompt)
+    return agent, Runner
+
+
+def agents_complete(prompt, system, model, timeout=None):
+    return asyncio.run(agents_acomplete(prompt, system, model, timeout=timeout))
+
+
+async def agents_acomplete(prompt, system, model, timeout=None):
+    """Final output of one agent run, bounded like an http request (``LLM_TIMEOUT``)."""
+    agent, runner = _build_agent(system, model)
+    result = await asyncio.wait_for(
+        runner.run(starting_agent=agent, input=prompt), timeout or env_timeout()
+    )
     return result.final_output
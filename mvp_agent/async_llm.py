@@ -0,0 +1,185 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from .agents_sdk_client import agents_acomplete
+from .codex_cli_client import CODEX_TIMEOUT, codex_acomplete
+from .context_budget import count_tokens
+from .llm_client import AsyncHttpClient
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units evenly over a minute; 0 disables the budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self._rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        # A request larger than the whole budget waits for a full bucket, not forever.
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self._rate)
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Shared admission control for async provider calls.
+
+    Enforces requests-per-minute and tokens-per-minute budgets plus a cap on
+    requests in flight. Waiters are admitted in arrival order. With a
+    ``controller`` (``adaptive.AIMDController``) the in-flight cap follows its
+    current limit and each request's outcome is reported back to it.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, max_in_flight: int = 0, controller=None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_in_flight = max_in_flight
+        self.controller = controller
+        self.in_flight = 0
+        self.admitted = 0
+        self.waited_sec = 0.0
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None
+        self._order = asyncio.Lock()
+        self._changed = asyncio.Condition()
+
+    async def _wait_for_controller(self) -> None:
+        async with self._changed:
+            while True:
+                pause = self.controller.pause_remaining()
+                if pause <= 0 and self.in_flight < self.controller.current:
+                    return
+                try:
+                    await asyncio.wait_for(self._changed.wait(), pause or None)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def acquire(self, tokens: int = 0) -> None:
+        started = time.monotonic()
+        if self._slots is not None:
+            await self._slots.acquire()
+        async with self._order:
+            if self.controller is not None:
+                await self._wait_for_controller()
+            while True:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+        self.admitted += 1
+        self.waited_sec += time.monotonic() - started
+
+    async def release(self, error: BaseException | None = None, started: float = 0.0) -> None:
+        self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+        if self.controller is not None:
+            self.controller.observe(error, started)
+            async with self._changed:
+                self._changed.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        await self.acquire(tokens)
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            await self.release(error, started)
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "waited_sec": round(self.waited_sec, 3),
+        }
+
+
+class AsyncCompleter:
+    """One async ``complete()`` for every provider, gated by a shared limiter."""
+
+    def __init__(self, provider: str, limiter: RateLimiter | None = None, http_client=None):
+        self.provider = provider
+        self.limiter = limiter or RateLimiter()
+        self._http = http_client
+
+    @classmethod
+    def from_args(cls, args, controller=None) -> "AsyncCompleter":
+        max_in_flight = int(getattr(args, "max_in_flight", 0) or DEFAULT_MAX_IN_FLIGHT)
+        limiter = RateLimiter(
+            rpm=float(getattr(args, "rpm", 0) or 0),
+            tpm=float(getattr(args, "tpm", 0) or 0),
+            max_in_flight=max_in_flight,
+            controller=controller,
+        )
+        http_client = None
+        if args.llm_provider == "http":
+            pool_size = int(getattr(args, "http_pool_size", 0) or 0)
+            http_client = AsyncHttpClient.from_env(pool_size=pool_size or max_in_flight)
+        return cls(args.llm_provider, limiter, http_client)
+
+    async def complete(
+        self,
+        prompt,
+        system,
+        model,
+        temperature=0.2,
+        max_tokens=1200,
+        timeout=None,
+        cache_prefix=None,
+        cache_hint="none",
+        stream=False,
+    ):
+        if self.provider not in ("http", "agents", "codex"):
+            raise ValueError(f"Unsupported async provider: {self.provider}")
+        budget = count_tokens(system) + count_tokens(prompt) + max_tokens
+        async with self.limiter.slot(budget):
+            if self.provider == "http":
+                if self._http is None:
+                    self._http = AsyncHttpClient.from_env()
+                return await self._http.complete(
+                    prompt,
+                    system,
+                    model,
+                    temperature,
+                    max_tokens,
+                    timeout=timeout,
+                    cache_prefix=cache_prefix,
+                    cache_hint=cache_hint,
+                    stream=stream,
+                )
+            if self.provider == "agents":
+                return await agents_acomplete(
+                    prompt=prompt, system=system, model=model, timeout=timeout
+                )
+            return await codex_acomplete(
+                prompt=prompt, system=system, model=model, timeout=timeout or CODEX_TIMEOUT
+            )
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
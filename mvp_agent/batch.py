@@ -1,12 +1,125 @@
+import asyncio
 import csv
 import glob
 import json
 import os
+import queue
 import re
+import threading
+import time
 from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 
-from .cli import run_pipeline
-from .utils import ensure_dir, utc_timestamp
+from . import llm_client
+from .adaptive import AIMDController, ConcurrencyGate
+from .async_llm import DEFAULT_MAX_IN_FLIGHT, AsyncCompleter
+from .batch_api import evaluate_cohort
+from .batch_journal import BatchJournal, config_fingerprint, is_resumable
+from .cascade import CascadePolicy, summarize_cascade
+from .cli import (
+    afinish_submission,
+    finalize_submission,
+    finish_submission,
+    prepare_submission,
+)
+from .dedup import duplicate_groups, single_flight_scope
+from .evaluator import with_session
+from .utils import ensure_dir, in_current_context, sha256_file, utc_timestamp
+
+DEFAULT_MAX_DEPTH = 6
+
+# Cache and dependency directories students upload by accident; they never hold
+# the graded notebook and can contain tens of thousands of files. Virtualenvs are
+# recognized by their ``pyvenv.cfg`` and hidden directories (``.git``) always skipped.
+DEFAULT_PRUNE_DIRS = frozenset({"__pycache__", "node_modules"})
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    parts: list[str] = []
+    segments = pattern.replace(os.sep, "/").split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if last else "(?:[^/]+/)*")
+            continue
+        seg = ""
+        j = 0
+        while j < len(segment):
+            ch = segment[j]
+            if ch == "*":
+                seg += "[^/]*"
+            elif ch == "?":
+                seg += "[^/]"
+            elif ch == "[" and "]" in segment[j + 1 :]:
+                end = segment.index("]", j + 1)
+                body = segment[j + 1 : end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                seg += f"[{body}]"
+                j = end
+            else:
+                seg += re.escape(ch)
+            j += 1
+        parts.append(seg if last else seg + "/")
+    return re.compile("".join(parts) + r"\Z")
+
+
+def _walk_notebooks(
+    student_dir: str, matcher: re.Pattern, max_depth: int, prune_dirs, stats: dict
+) -> list:
+    found: list[str] = []
+    for path, dirnames, filenames in os.walk(student_dir):
+        rel = os.path.relpath(path, student_dir).replace(os.sep, "/")
+        rel = "" if rel == "." else rel + "/"
+        for name in filenames:
+            if not name.startswith(".") and matcher.match(rel + name):
+                found.append(os.path.join(path, name))
+        if rel.count("/") >= max_depth:
+            dirnames[:] = []
+            continue
+        # Hidden directories (.git, .venv, .ipynb_checkpoints) are ignored like glob does.
+        kept = [d for d in dirnames if not d.startswith(".")]
+        dirnames[:] = [
+            d
+            for d in kept
+            if d not in prune_dirs and not os.path.isfile(os.path.join(path, d, "pyvenv.cfg"))
+        ]
+        stats["pruned_dirs"] = stats.get("pruned_dirs", 0) + len(kept) - len(dirnames)
+    return sorted(found)
+
+
+def index_submissions(
+    submissions_root: str,
+    student_key_regex: str = r"^[^/]+_[^/]+$",
+    notebook_glob: str = "**/*.ipynb",
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    prune_dirs=DEFAULT_PRUNE_DIRS,
+    stats: dict | None = None,
+) -> dict[str, list[str]]:
+    """Map each student folder to its notebooks in one ``os.scandir`` walk.
+
+    Hidden directories, virtualenvs and ``prune_dirs`` are never entered; the
+    latter two are counted in ``stats["pruned_dirs"]``. The walk stops
+    ``max_depth`` levels below each student folder. Keys follow the sorted order
+    of ``discover_student_folders``; notebook lists are sorted too.
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault("pruned_dirs", 0)
+    if not os.path.isdir(submissions_root):
+        return {}
+    pat = re.compile(student_key_regex)
+    matcher = _glob_to_regex(notebook_glob)
+    student_entries = []
+    with os.scandir(submissions_root) as it:
+        for entry in it:
+            if entry.is_dir() and pat.match(entry.name):
+                student_entries.append(entry)
+    index: dict[str, list[str]] = {}
+    for entry in sorted(student_entries, key=lambda e: e.name):
+        student_dir = os.path.join(submissions_root, entry.name)
+        index[student_dir] = _walk_notebooks(student_dir, matcher, max_depth, prune_dirs, stats)
+    return index
 
 
 def discover_student_folders(
@@ -15,14 +128,9 @@ def discover_student_folders(
     if not os.path.isdir(submissions_root):
         return []
     pat = re.compile(student_key_regex)
-    out: list[str] = []
-    for name in sorted(os.listdir(submissions_root)):
-        full = os.path.join(submissions_root, name)
-        if not os.path.isdir(full):
-            continue
-        if pat.match(name):
-            out.append(full)
-    return out
+    with os.scandir(submissions_root) as it:
+        names = [e.name for e in it if e.is_dir() and pat.match(e.name)]
+    return [os.path.join(submissions_root, name) for name in sorted(names)]
 
 
 def find_notebook(student_dir: str, notebook_glob: str = "**/*.ipynb") -> str:
@@ -30,6 +138,60 @@ def find_notebook(student_dir: str, notebook_glob: str = "**/*.ipynb") -> str:
     return matches[0] if matches else ""
 
 
+SUMMARY_FIELDS = [
+    "student_key",
+    "student_id",
+    "final_score",
+    "scale_min",
+    "scale_max",
+    "status",
+    "flags_count",
+    "top_feedback",
+    "run_folder",
+    "error",
+    "estimated_sec",
+    "duration_sec",
+]
+
+
+class SummaryWriter:
+    """Append rows to the summary CSV as students finish, then rewrite it in order.
+
+    Rows are flushed one by one so progress is visible mid-run and a crash keeps
+    every completed row; ``finalize`` replaces the file atomically with the rows
+    sorted in discovery order.
+    """
+
+    def __init__(self, path: str, fieldnames: list[str] | None = None):
+        self.path = path
+        self.fieldnames = fieldnames or SUMMARY_FIELDS
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write(self, row: dict) -> None:
+        with self._lock:
+            self._writer.writerow(row)
+            self._file.flush()
+
+    def finalize(self, rows: list[dict]) -> None:
+        with self._lock:
+            self._file.close()
+            write_summary_csv(self.path, rows, self.fieldnames)
+
+
+def write_summary_csv(path: str, rows: list[dict], fieldnames: list[str] | None = None) -> None:
+    """Write the summary CSV in one go, replacing ``path`` atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames or SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
 def _default_row(student_key: str) -> dict:
     return {
         "student_key": student_key,
@@ -42,100 +204,662 @@ def _default_row(student_key: str) -> dict:
         "top_feedback": "",
         "run_folder": "",
         "error": "",
+        "estimated_sec": "",
+        "duration_sec": "",
     }
 
 
-def run_batch(args) -> dict:
-    batch_id = utc_timestamp()
-    ensure_dir(args.output_dir)
+def _build_single_args(args, notebook: str, student_key: str) -> Namespace:
+    return Namespace(
+        notebook=notebook,
+        rubric=args.rubric,
+        assignment=args.assignment,
+        materials=args.materials,
+        student_id=student_key,
+        output_dir=args.output_dir,
+        gradebook_column=args.gradebook_column,
+        llm_provider=args.llm_provider,
+        model=args.model,
+        prompt=args.prompt,
+        temperature=args.temperature,
+        max_tokens=args.max_tokens,
+        llm_stream=getattr(args, "llm_stream", False),
+        context_token_budget=getattr(args, "context_token_budget", 0),
+        per_criterion=getattr(args, "per_criterion", False),
+        max_output_lines=getattr(args, "max_output_lines", 60),
+        max_output_chars=getattr(args, "max_output_chars", 4000),
+        max_notebook_output_chars=getattr(args, "max_notebook_output_chars", 30000),
+        template_notebook=getattr(args, "template_notebook", ""),
+        template_mode=getattr(args, "template_mode", "mark"),
+        cascade_model=getattr(args, "cascade_model", ""),
+        cascade_min_confidence=getattr(args, "cascade_min_confidence", 0.6),
+        cascade_pass_score=getattr(args, "cascade_pass_score", 10.5),
+        cascade_margin=getattr(args, "cascade_margin", 1.0),
+        cascade_price_ratio=getattr(args, "cascade_price_ratio", 0.1),
+        execute_notebook=args.execute_notebook,
+        exec_mode=args.exec_mode,
+        execution_timeout=args.execution_timeout,
+        allow_exec_errors=args.allow_exec_errors,
+        docker_image=args.docker_image,
+        docker_cpus=args.docker_cpus,
+        docker_memory=args.docker_memory,
+        docker_network=args.docker_network,
+        cache_dir=getattr(args, "cache_dir", ""),
+        no_cache=getattr(args, "no_cache", False),
+        cache_max_mb=getattr(args, "cache_max_mb", 0),
+        prompt_layout=getattr(args, "prompt_layout", "inline"),
+        prompt_cache_hint=getattr(args, "prompt_cache_hint", "none"),
+        llm_timeout=getattr(args, "llm_timeout", 0),
+        max_retries=getattr(args, "max_retries", 2),
+        retry_base_delay=getattr(args, "retry_base_delay", 1.0),
+        breaker_threshold=getattr(args, "breaker_threshold", 5),
+        breaker_reset=getattr(args, "breaker_reset", 30.0),
+        session=getattr(args, "session", None),
+    )
 
-    summary_rows: list[dict] = []
-    student_dirs = discover_student_folders(args.submissions_root, args.student_key_regex)
 
-    for student_dir in student_dirs:
-        student_key = os.path.basename(student_dir)
-        row = _default_row(student_key)
+def _error_row(row: dict, exc: Exception) -> dict:
+    row["status"] = "error"
+    row["error"] = str(exc)[:300]
+    return row
 
+
+def prepare_student(
+    student_dir: str, args, notebook: str | None = None
+) -> tuple[dict, dict | None]:
+    """Execution stage: locate the notebook, run it if requested and build the context."""
+    started = time.monotonic()
+    student_key = os.path.basename(student_dir)
+    row = _default_row(student_key)
+    row["duration_sec"] = 0.0
+
+    if notebook is None:
         notebook = find_notebook(student_dir, args.notebook_glob)
-        if not notebook:
-            row["error"] = "notebook_not_found"
-            summary_rows.append(row)
-            continue
+    if not notebook:
+        row["error"] = "notebook_not_found"
+        return row, None
+
+    single_args = _build_single_args(args, notebook, student_key)
+    try:
+        prepared = prepare_submission(single_args)
+    except Exception as exc:  # noqa: BLE001
+        return _error_row(row, exc), None
+    finally:
+        # Per-stage timings stay out of the CSV but are kept in the journal rows.
+        row["prepare_sec"] = row["duration_sec"] = round(time.monotonic() - started, 3)
+    prepared["args"] = single_args
+    template = prepared["context"]["notebook"].get("template")
+    if template:
+        row["template_tokens_saved"] = template["tokens_saved"]
+    return row, prepared
+
+
+def _record_evaluation(row: dict, prepared: dict, evaluation: dict) -> None:
+    row["run_folder"] = prepared["out_dir"]
+    row["status"] = "ok"
+    row["final_score"] = f"{float(evaluation.get('final_score', 0.0)):.2f}"
+    row["flags_count"] = len(evaluation.get("flags", []))
+    summary = evaluation.get("summary", {})
+    row["top_feedback"] = str(summary.get("priority", ""))[:240]
+
+
+_USAGE_KEYS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+_STREAM_KEYS = ("ttft_sec", "time_to_json_sec")
+
+
+def _record_evaluate_time(row: dict, prepared: dict, started: float) -> None:
+    row.update(prepared.get("retry", {}))
+    usage = prepared.get("usage") or {}
+    row.update({key: usage[key] for key in _USAGE_KEYS + _STREAM_KEYS if key in usage})
+    if usage.get("dedup_of"):
+        row["duplicate_of"] = usage["dedup_of"]
+    cascade = usage.get("cascade")
+    if cascade:
+        row["cascade_escalated"] = cascade["escalated"]
+        row["cascade_reasons"] = ",".join(cascade["reasons"])
+        row["cascade_cost"] = cascade["cost"]
+        row["cascade_baseline"] = cascade["baseline"]
+    row["evaluate_sec"] = round(time.monotonic() - started, 3)
+    row["duration_sec"] = round(float(row["duration_sec"] or 0.0) + row["evaluate_sec"], 3)
+
+
+def finish_student(row: dict, prepared: dict) -> dict:
+    """Evaluation stage: call the provider, validate and write the run folder."""
+    started = time.monotonic()
+    try:
+        evaluation = finish_submission(prepared["args"], prepared)
+        _record_evaluation(row, prepared, evaluation)
+    except Exception as exc:  # noqa: BLE001
+        _error_row(row, exc)
+    _record_evaluate_time(row, prepared, started)
+    return row
+
+
+async def afinish_student(row: dict, prepared: dict, completer) -> dict:
+    """Async evaluation stage; ``completer`` is shared by every in-flight student."""
+    started = time.monotonic()
+    try:
+        evaluation = await afinish_submission(prepared["args"], prepared, completer)
+        _record_evaluation(row, prepared, evaluation)
+    except Exception as exc:  # noqa: BLE001
+        _error_row(row, exc)
+    _record_evaluate_time(row, prepared, started)
+    return row
+
+
+def local_exec_pool(args, workers: int) -> ProcessPoolExecutor | None:
+    """Processes for local notebook execution, which is CPU-bound inside nbclient.
+
+    Only the execution stage runs there: evaluation stays in this process, where
+    the shared HTTP client, circuit breaker and single-flight dedup live.
+    """
+    if args.execute_notebook and args.exec_mode == "local":
+        return ProcessPoolExecutor(max_workers=workers)
+    return None
+
+
+def prepare_student_in(
+    exec_pool: ProcessPoolExecutor | None, student_dir: str, args, notebook: str | None = None
+) -> tuple[dict, dict | None]:
+    if exec_pool is None:
+        return prepare_student(student_dir, args, notebook)
+    return exec_pool.submit(prepare_student, student_dir, args, notebook).result()
+
+
+def grade_student(student_dir: str, args, notebook: str | None = None, exec_pool=None) -> dict:
+    row, prepared = prepare_student_in(exec_pool, student_dir, args, notebook)
+    if prepared is None:
+        return row
+    return finish_student(row, prepared)
+
+
+def _grade_students(jobs: list[tuple[str, str]], args, on_row=None) -> list[dict]:
+    on_row = on_row or (lambda idx, row: None)
+    workers = max(1, int(getattr(args, "workers", 1) or 1))
+    rows: list[dict | None] = [None] * len(jobs)
+    if workers == 1 or len(jobs) <= 1:
+        for idx, (student_dir, notebook) in enumerate(jobs):
+            rows[idx] = grade_student(student_dir, args, notebook)
+            on_row(idx, rows[idx])
+        return rows
+
+    workers = min(workers, len(jobs))
+    exec_pool = local_exec_pool(args, workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    in_current_context(grade_student), student_dir, args, notebook, exec_pool
+                ): idx
+                for idx, (student_dir, notebook) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    rows[idx] = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    rows[idx] = _error_row(_default_row(os.path.basename(jobs[idx][0])), exc)
+                on_row(idx, rows[idx])
+    finally:
+        if exec_pool is not None:
+            exec_pool.shutdown()
+    return rows
+
+
+def _stage_sizes(args) -> dict:
+    eval_workers = max(1, int(getattr(args, "eval_workers", 0) or getattr(args, "workers", 1) or 1))
+    exec_workers = max(1, int(getattr(args, "exec_workers", 0) or os.cpu_count() or 1))
+    queue_size = max(1, int(getattr(args, "queue_size", 0) or 2 * eval_workers))
+    return {"exec_workers": exec_workers, "eval_workers": eval_workers, "queue_size": queue_size}
+
+
+def adaptive_controller(args) -> AIMDController | None:
+    """AIMD in-flight limit for the http provider when ``--adaptive-concurrency`` is set.
+
+    The ceiling is ``--max-in-flight`` with ``--async-llm``, otherwise the evaluation
+    thread count; the limit starts at a quarter of it and adapts to 429/5xx responses.
+    """
+    if not getattr(args, "adaptive_concurrency", False) or args.llm_provider != "http":
+        return None
+    if getattr(args, "async_llm", False):
+        maximum = int(getattr(args, "max_in_flight", 0) or DEFAULT_MAX_IN_FLIGHT)
+    else:
+        maximum = _stage_sizes(args)["eval_workers"]
+    return AIMDController(initial=max(1, maximum // 4), maximum=maximum)
 
-        single_args = Namespace(
-            notebook=notebook,
-            rubric=args.rubric,
-            assignment=args.assignment,
-            materials=args.materials,
-            student_id=student_key,
-            output_dir=args.output_dir,
-            gradebook_column=args.gradebook_column,
-            llm_provider=args.llm_provider,
-            model=args.model,
-            prompt=args.prompt,
-            temperature=args.temperature,
-            max_tokens=args.max_tokens,
-            execute_notebook=args.execute_notebook,
-            exec_mode=args.exec_mode,
-            execution_timeout=args.execution_timeout,
-            allow_exec_errors=args.allow_exec_errors,
-            docker_image=args.docker_image,
-            docker_cpus=args.docker_cpus,
-            docker_memory=args.docker_memory,
-            docker_network=args.docker_network,
+
+@contextmanager
+def http_client_scope(args, controller: AIMDController | None = None):
+    """Share one keep-alive HTTP client across every evaluation of the batch."""
+    if getattr(args, "llm_provider", "mock") != "http":
+        yield None
+        return
+    pool_size = int(getattr(args, "http_pool_size", 0) or 0)
+    if not pool_size:
+        pool_size = max(
+            int(getattr(args, "workers", 1) or 1), int(getattr(args, "eval_workers", 0) or 0)
         )
+    gate = None
+    if controller is not None and not getattr(args, "async_llm", False):
+        gate = ConcurrencyGate(controller)
+    client = llm_client.HttpClient.from_env(pool_size=max(1, pool_size), gate=gate)
+    try:
+        with llm_client.use_client(client):
+            yield client
+    finally:
+        client.close()
+
+
+def _async_evaluation_stage(
+    ready: queue.Queue, rows: list, on_row, args, stats: dict, controller=None
+) -> None:
+    """Evaluate prepared students concurrently on one event loop.
+
+    At most ``--max-in-flight`` students are evaluated at once; the shared limiter
+    additionally holds requests to the ``--rpm`` / ``--tpm`` budgets.
+    """
+
+    async def run():
+        completer = AsyncCompleter.from_args(args, controller=controller)
+        slots = asyncio.Semaphore(completer.limiter.max_in_flight)
+        tasks = set()
+
+        async def evaluate(idx, row, prepared):
+            try:
+                rows[idx] = await afinish_student(row, prepared, completer)
+                on_row(idx, rows[idx])
+            finally:
+                slots.release()
 
         try:
-            run_folder = run_pipeline(single_args)
-            row["run_folder"] = run_folder
-            row["status"] = "ok"
-
-            eval_path = os.path.join(run_folder, "evaluation.json")
-            if os.path.exists(eval_path):
-                with open(eval_path, "r", encoding="utf-8") as f:
-                    evaluation = json.load(f)
-                row["final_score"] = f"{float(evaluation.get('final_score', 0.0)):.2f}"
-                row["flags_count"] = len(evaluation.get("flags", []))
-                summary = evaluation.get("summary", {})
-                row["top_feedback"] = str(summary.get("priority", ""))[:240]
+            while True:
+                await slots.acquire()
+                item = await asyncio.to_thread(ready.get)
+                if item is None:
+                    break
+                task = asyncio.create_task(evaluate(*item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await completer.aclose()
+            stats["async_llm"] = completer.limiter.stats()
+
+    asyncio.run(run())
+
+
+def _run_staged(
+    jobs: list[tuple[str, str]],
+    args,
+    on_row=None,
+    stats: dict | None = None,
+    controller: AIMDController | None = None,
+) -> list[dict]:
+    """Two-stage pipeline: notebook execution feeds evaluation through bounded queues.
+
+    The execution stage is sized to the machine (CPU-bound), the evaluation stage to
+    provider concurrency (network-bound). Both queues are bounded, so at most
+    ``queue_size`` prepared contexts wait in memory regardless of cohort size. With
+    ``--async-llm`` the evaluation stage is a single event loop instead of threads.
+    """
+    stats = {} if stats is None else stats
+    on_row = on_row or (lambda idx, row: None)
+    sizes = _stage_sizes(args)
+    pending: queue.Queue = queue.Queue(maxsize=sizes["queue_size"])
+    ready: queue.Queue = queue.Queue(maxsize=sizes["queue_size"])
+    rows: list[dict | None] = [None] * len(jobs)
+
+    exec_pool = local_exec_pool(args, sizes["exec_workers"])
+
+    def execution_stage():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            idx, (student_dir, notebook) = item
+            try:
+                row, prepared = prepare_student_in(exec_pool, student_dir, args, notebook)
+            except Exception as exc:  # noqa: BLE001
+                row = _error_row(_default_row(os.path.basename(student_dir)), exc)
+                prepared = None
+            if prepared is None:
+                rows[idx] = row
+                on_row(idx, row)
+            else:
+                ready.put((idx, row, prepared))
+
+    def evaluation_stage():
+        while True:
+            item = ready.get()
+            if item is None:
+                return
+            idx, row, prepared = item
+            rows[idx] = finish_student(row, prepared)
+            on_row(idx, rows[idx])
+
+    exec_threads = [
+        threading.Thread(target=execution_stage, daemon=True) for _ in range(sizes["exec_workers"])
+    ]
+    if getattr(args, "async_llm", False):
+        eval_threads = [
+            threading.Thread(
+                target=_async_evaluation_stage,
+                args=(ready, rows, on_row, args, stats, controller),
+                daemon=True,
+            )
+        ]
+    else:
+        eval_threads = [
+            threading.Thread(target=in_current_context(evaluation_stage), daemon=True)
+            for _ in range(sizes["eval_workers"])
+        ]
+    for t in exec_threads + eval_threads:
+        t.start()
+
+    try:
+        for idx, job in enumerate(jobs):
+            pending.put((idx, job))
+        for _ in exec_threads:
+            pending.put(None)
+        for t in exec_threads:
+            t.join()
+        for _ in eval_threads:
+            ready.put(None)
+        for t in eval_threads:
+            t.join()
+    finally:
+        if exec_pool is not None:
+            exec_pool.shutdown()
+
+    return [
+        row if row is not None else _default_row(os.path.basename(jobs[idx][0]))
+        for idx, row in enumerate(rows)
+    ]
+
+
+def _run_provider_batch(
+    jobs: list[tuple[str, str]], args, on_row=None, stats: dict | None = None
+) -> list[dict]:
+    """``http-batch`` provider: prepare every student, grade them in one provider job, fan in.
+
+    Students are prepared as in ``_grade_students``, their prompts go out as a single
+    JSONL batch job and each result then goes through validation and rendering.
+    """
+    on_row = on_row or (lambda idx, row: None)
+    stats = {} if stats is None else stats
+    workers = max(1, int(getattr(args, "workers", 1) or 1))
+    rows: list[dict | None] = [None] * len(jobs)
+    ready: list[tuple[int, dict, dict]] = []
+
+    exec_pool = local_exec_pool(args, workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    in_current_context(prepare_student_in), exec_pool, student_dir, args, notebook
+                ): idx
+                for idx, (student_dir, notebook) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    row, prepared = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    row = _error_row(_default_row(os.path.basename(jobs[idx][0])), exc)
+                    prepared = None
+                if prepared is None:
+                    rows[idx] = row
+                    on_row(idx, row)
+                else:
+                    ready.append((idx, row, prepared))
+    finally:
+        if exec_pool is not None:
+            exec_pool.shutdown()
+
+    try:
+        outcomes, stats["provider_batch"] = evaluate_cohort(
+            [(row["student_key"], prepared) for _, row, prepared in ready], args
+        )
+    except Exception as exc:  # noqa: BLE001
+        outcomes = {row["student_key"]: exc for _, row, _ in ready}
+        stats["provider_batch"] = {"error": str(exc)[:300]}
+
+    usages = stats["provider_batch"].pop("usage", {})
+    for idx, row, prepared in ready:
+        started = time.monotonic()
+        try:
+            outcome = outcomes[row["student_key"]]
+            if isinstance(outcome, Exception):
+                raise outcome
+            evaluation = finalize_submission(
+                prepared["args"], prepared, outcome, usages.get(row["student_key"])
+            )
+            _record_evaluation(row, prepared, evaluation)
         except Exception as exc:  # noqa: BLE001
-            row["status"] = "error"
-            row["error"] = str(exc)[:300]
+            _error_row(row, exc)
+        _record_evaluate_time(row, prepared, started)
+        rows[idx] = row
+        on_row(idx, row)
+    return rows
+
+
+_RUN_FOLDER_RE = re.compile(r"^(?P<student_key>.+)_(?P<run_id>\d{8}T\d{6}Z)$")
+
+
+def load_execution_history(output_dir: str) -> dict[str, float]:
+    """Latest notebook execution time per student from earlier run folders."""
+    history: dict[str, tuple[str, float]] = {}
+    if not os.path.isdir(output_dir):
+        return {}
+    with os.scandir(output_dir) as it:
+        for entry in it:
+            match = _RUN_FOLDER_RE.match(entry.name)
+            if not match or not entry.is_dir():
+                continue
+            report_path = os.path.join(entry.path, "execution_report.json")
+            try:
+                with open(report_path, "r", encoding="utf-8") as f:
+                    duration = float(json.load(f).get("duration_sec"))
+            except (OSError, ValueError, TypeError, json.JSONDecodeError):
+                continue
+            key, run_id = match.group("student_key"), match.group("run_id")
+            if key not in history or run_id > history[key][0]:
+                history[key] = (run_id, duration)
+    return {key: duration for key, (_, duration) in history.items()}
+
 
-        summary_rows.append(row)
+def estimate_cost(notebook: str, history_sec: float | None, execute: bool) -> float:
+    """Rough grading cost in seconds, only meaningful relative to other students.
+
+    Only the file size is read, so estimating a whole cohort costs one ``stat``
+    per student; execution time comes from history when there is some.
+    """
+    if not notebook:
+        return 0.0
+    try:
+        kib = os.path.getsize(notebook) / 1024
+    except OSError:
+        return 0.0
+    # Prompt size (hence LLM latency) tracks the notebook's text; base64 images
+    # inflate the byte size too, which only makes the estimate conservative.
+    cost = 1.0 + 0.03 * kib
+    if execute:
+        cost += history_sec if history_sec is not None else 0.3 * kib
+    return round(cost, 3)
+
+
+def dispatch_order(estimates: list[float], schedule: str = "ljf") -> list[int]:
+    if schedule != "ljf":
+        return list(range(len(estimates)))
+    return sorted(range(len(estimates)), key=lambda i: (-estimates[i], i))
+
+
+def discover_jobs(args, stats: dict | None = None) -> tuple[list[str], list[str]]:
+    """Student folders and their selected notebook ("" when missing), in sorted order."""
+    notebook_index = index_submissions(
+        args.submissions_root,
+        args.student_key_regex,
+        args.notebook_glob,
+        max_depth=getattr(args, "max_depth", DEFAULT_MAX_DEPTH),
+        prune_dirs=getattr(args, "prune_dirs", None) or DEFAULT_PRUNE_DIRS,
+        stats=stats,
+    )
+    student_dirs = list(notebook_index)
+    return student_dirs, [(notebook_index[d] or [""])[0] for d in student_dirs]
+
+
+def run_batch(args) -> dict:
+    batch_id = utc_timestamp()
+    ensure_dir(args.output_dir)
+
+    discovery: dict = {}
+    student_dirs, notebooks = discover_jobs(args, discovery)
+
+    journal = BatchJournal(args.output_dir)
+    config_sha256 = config_fingerprint(args)
+    completed = journal.completed() if getattr(args, "resume", False) else {}
+
+    summary_rows: list[dict | None] = [None] * len(student_dirs)
+    # Hashed up front only to check a journal entry; the rest are hashed as they finish.
+    notebook_hashes: dict[int, str] = {}
+    todo: list[int] = []
+    for idx, student_dir in enumerate(student_dirs):
+        student_key = os.path.basename(student_dir)
+        entry = completed.get(student_key)
+        if entry and notebooks[idx]:
+            notebook_hashes[idx] = sha256_file(notebooks[idx])
+        if is_resumable(entry, config_sha256, notebook_hashes.get(idx, "")):
+            summary_rows[idx] = {**_default_row(student_key), **entry.get("row", {})}
+        else:
+            todo.append(idx)
+    resumed = len(student_dirs) - len(todo)
+
+    schedule = getattr(args, "schedule", "ljf")
+    # fifo dispatches in folder order, so it never reads notebooks for an estimate.
+    estimates = {idx: "" for idx in todo}
+    if schedule == "ljf":
+        history = load_execution_history(args.output_dir) if args.execute_notebook else {}
+        for idx in todo:
+            estimates[idx] = estimate_cost(
+                notebooks[idx],
+                history.get(os.path.basename(student_dirs[idx])),
+                args.execute_notebook,
+            )
+        order = dispatch_order([estimates[idx] for idx in todo], schedule)
+    else:
+        order = list(range(len(todo)))
+    dispatch = [todo[i] for i in order]
 
     summary_csv = os.path.join(args.output_dir, args.summary_csv)
-    with open(summary_csv, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "student_key",
-                "student_id",
-                "final_score",
-                "scale_min",
-                "scale_max",
-                "status",
-                "flags_count",
-                "top_feedback",
-                "run_folder",
-                "error",
-            ],
+    summary_writer = SummaryWriter(summary_csv)
+    for row in summary_rows:
+        if row is not None:
+            summary_writer.write(row)
+
+    def record(job_idx: int, row: dict) -> None:
+        idx = dispatch[job_idx]
+        row["estimated_sec"] = estimates[idx]
+        summary_writer.write(row)
+        if idx not in notebook_hashes:
+            notebook_hashes[idx] = sha256_file(notebooks[idx]) if notebooks[idx] else ""
+        journal.append(
+            {
+                "batch_id": batch_id,
+                "student_key": row["student_key"],
+                "status": row["status"],
+                "notebook_sha256": notebook_hashes[idx],
+                "config_sha256": config_sha256,
+                "run_folder": row["run_folder"],
+                "row": row,
+            }
         )
-        writer.writeheader()
-        for row in summary_rows:
-            writer.writerow(row)
+
+    jobs = [(student_dirs[idx], notebooks[idx]) for idx in dispatch]
+    # Rubric, texts and prompt template are loaded once here, not once per student.
+    args = with_session(args)
+    async_llm = bool(getattr(args, "async_llm", False))
+    controller = adaptive_controller(args)
+    # Both need evaluation in this process's threads, which only the staged pipeline has.
+    staged = bool(getattr(args, "staged", False)) or async_llm or controller is not None
+    stage_stats: dict = {}
+    dedup = not getattr(args, "no_dedup", False)
+    with http_client_scope(args, controller), single_flight_scope(dedup):
+        if args.llm_provider == "http-batch":
+            staged = False
+            graded = _run_provider_batch(jobs, args, on_row=record, stats=stage_stats)
+        elif staged:
+            graded = _run_staged(
+                jobs, args, on_row=record, stats=stage_stats, controller=controller
+            )
+        else:
+            graded = _grade_students(jobs, args, on_row=record)
+    for idx, row in zip(dispatch, graded):
+        row["estimated_sec"] = estimates[idx]
+        summary_rows[idx] = row
+
+    summary_writer.finalize(summary_rows)
 
     report = {
         "batch_id": batch_id,
         "submissions_root": args.submissions_root,
         "students_discovered": len(student_dirs),
+        **discovery,
         "summary_csv": summary_csv,
+        **summarize_rows(summary_rows),
+        "resumed": resumed,
+        "llm_retries": sum(int(r.get("llm_retries", 0) or 0) for r in summary_rows),
+        **summarize_usage(summary_rows),
+        "journal": journal.path,
+        "workers": max(1, int(getattr(args, "workers", 1) or 1)),
+        "pipeline": _pipeline_name(args, staged),
+        "schedule": schedule,
+    }
+    if staged:
+        report.update(_stage_sizes(args))
+    report.update(stage_stats)
+    if controller is not None:
+        report["adaptive_concurrency"] = controller.stats()
+    if getattr(args, "template_notebook", ""):
+        report["template_tokens_saved"] = sum(
+            int(r.get("template_tokens_saved", 0) or 0) for r in summary_rows
+        )
+    if dedup:
+        report["duplicate_groups"] = duplicate_groups(summary_rows)
+    policy = CascadePolicy.from_args(args)
+    if policy is not None:
+        report["cascade"] = summarize_cascade(summary_rows, args.model, policy)
+    return write_batch_report(args, report)
+
+
+def _pipeline_name(args, staged: bool) -> str:
+    if args.llm_provider == "http-batch":
+        return "provider_batch"
+    return "staged" if staged else "pool"
+
+
+def summarize_rows(summary_rows: list[dict]) -> dict:
+    return {
         "rows": len(summary_rows),
         "ok": len([r for r in summary_rows if r["status"] == "ok"]),
         "errors": len([r for r in summary_rows if r["status"] == "error"]),
         "skipped": len([r for r in summary_rows if r["status"] == "skipped"]),
     }
 
+
+def summarize_usage(summary_rows: list[dict]) -> dict:
+    totals = {key: sum(int(r.get(key, 0) or 0) for r in summary_rows) for key in _USAGE_KEYS}
+    prompt_tokens = totals["prompt_tokens"]
+    cached_ratio = totals["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    totals["cached_ratio"] = round(cached_ratio, 3)
+    for key in _STREAM_KEYS:
+        values = [float(r[key]) for r in summary_rows if r.get(key) not in (None, "")]
+        if values:
+            totals[f"avg_{key}"] = round(sum(values) / len(values), 4)
+    return totals
+
+
+def write_batch_report(args, report: dict) -> dict:
     report_path = os.path.join(args.output_dir, "batch_report.json")
     with open(report_path, "w", encoding="utf-8") as f:
         json.dump(report, f, ensure_ascii=False, indent=2)
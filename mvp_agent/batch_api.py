@@ -0,0 +1,239 @@
+import importlib
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from .dedup import context_fingerprint, current_single_flight, restamp_evaluation
+from .eval_cache import cache_from_args
+from .evaluator import session_from_args
+from .llm_client import HttpConfig, LLMHTTPError, build_payload, completion_text
+from .utils import extract_json_block, utc_timestamp
+
+DEFAULT_POLL_SEC = 30.0
+DEFAULT_WAIT_HOURS = 24.0
+_DONE = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchJobError(RuntimeError):
+    pass
+
+
+class OpenAIBatchEndpoint:
+    """Files + batches API (``/files``, ``/batches``) as offered by OpenAI-compatible providers.
+
+    Any object with the same ``request_path``, ``submit``, ``status`` and
+    ``results`` members can be plugged in through ``LLM_BATCH_ENDPOINT``.
+    """
+
+    def __init__(self, base_url, api_key="", request_path="/v1/chat/completions", timeout=120.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.request_path = request_path
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        config = HttpConfig.from_env()
+        url = urllib.parse.urlsplit(config.api_url)
+        request_path = url.path or "/v1/chat/completions"
+        base_url = os.getenv("LLM_BATCH_URL", "")
+        if not base_url:
+            # https://host/v1/chat/completions -> https://host/v1
+            prefix = request_path.rsplit("/v1/", 1)[0] + "/v1" if "/v1/" in request_path else ""
+            base_url = urllib.parse.urlunsplit((url.scheme, url.netloc, prefix, "", ""))
+        return cls(base_url, config.api_key, request_path, config.timeout)
+
+    def _request(self, method, path, body=None, content_type="application/json"):
+        headers = {"Content-Type": content_type} if body is not None else {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        req = urllib.request.Request(
+            f"{self.base_url}{path}", data=body, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as exc:
+            raise LLMHTTPError(
+                exc.code, exc.read().decode("utf-8", errors="replace"), dict(exc.headers)
+            ) from exc
+
+    def submit(self, jsonl_path):
+        boundary = uuid.uuid4().hex
+        with open(jsonl_path, "rb") as f:
+            content = f.read()
+        filename = os.path.basename(jsonl_path)
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="purpose"\r\n\r\nbatch\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{filename}"\r\nContent-Type: application/jsonl\r\n\r\n'
+        ).encode("utf-8")
+        body += content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        uploaded = json.loads(
+            self._request("POST", "/files", body, f"multipart/form-data; boundary={boundary}")
+        )
+        job = json.loads(
+            self._request(
+                "POST",
+                "/batches",
+                json.dumps(
+                    {
+                        "input_file_id": uploaded["id"],
+                        "endpoint": self.request_path,
+                        "completion_window": "24h",
+                    }
+                ).encode("utf-8"),
+            )
+        )
+        return job["id"]
+
+    def status(self, job_id):
+        return json.loads(self._request("GET", f"/batches/{job_id}"))
+
+    def results(self, job):
+        lines = []
+        for key in ("output_file_id", "error_file_id"):
+            if job.get(key):
+                raw = self._request("GET", f"/files/{job[key]}/content")
+                lines += [json.loads(line) for line in raw.decode("utf-8").splitlines() if line]
+        return lines
+
+
+def load_endpoint():
+    """``LLM_BATCH_ENDPOINT=package.module:Class`` plugs in another batch API."""
+    spec = os.getenv("LLM_BATCH_ENDPOINT", "")
+    if not spec:
+        return OpenAIBatchEndpoint.from_env()
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory.from_env() if hasattr(factory, "from_env") else factory()
+
+
+def wait_for_job(endpoint, job_id, poll_sec=DEFAULT_POLL_SEC, max_wait_sec=None):
+    deadline = None if not max_wait_sec else time.monotonic() + max_wait_sec
+    while True:
+        job = endpoint.status(job_id)
+        if job.get("status") in _DONE:
+            return job
+        if deadline is not None and time.monotonic() > deadline:
+            raise BatchJobError(f"batch job {job_id} still {job.get('status')} after wait limit")
+        time.sleep(poll_sec)
+
+
+def _result_text(line, response_path):
+    response = line.get("response") or {}
+    status = int(response.get("status_code") or 0)
+    body = response.get("body")
+    if line.get("error") or status >= 400 or body is None:
+        detail = line.get("error") or body or "missing response"
+        raise LLMHTTPError(status or 500, json.dumps(detail, ensure_ascii=False))
+    return completion_text(body, response_path)
+
+
+def _share_duplicates(outcomes, info, duplicates):
+    for student_key, leader in duplicates.items():
+        outcome = outcomes[leader]
+        if not isinstance(outcome, Exception):
+            outcome = restamp_evaluation(outcome, student_key, leader)
+            info["usage"][student_key] = {"dedup_of": leader}
+        outcomes[student_key] = outcome
+    return outcomes, info
+
+
+def evaluate_cohort(items, args, endpoint=None):
+    """Grade every ``(student_key, prepared)`` pair through one provider batch job.
+
+    Returns ``(outcomes, info)``: ``outcomes`` maps student key to a parsed
+    evaluation or the exception for that student; ``info["usage"]`` holds the
+    token usage per student. Cache hits never enter the job
+    and results are cached under the same keys as the ``http`` provider. Inside
+    ``dedup.single_flight_scope`` identical submissions are sent once.
+    """
+    if not args.model:
+        raise ValueError("Model is required for http-batch provider. Set --model or LLM_MODEL.")
+    config = HttpConfig.from_env()
+    session = session_from_args(args)
+    cache = cache_from_args(args)
+    dedup = current_single_flight() is not None
+    outcomes = {}
+    cache_keys = {}
+    leaders: dict = {}
+    duplicates = {}
+    response_path = ""
+    requests = []
+    for student_key, prepared in items:
+        if dedup:
+            leader = leaders.setdefault(context_fingerprint(prepared["context"]), student_key)
+            if leader != student_key:
+                duplicates[student_key] = leader
+                continue
+        prefix, rest = session.render(prepared["context"])
+        prompt = prefix + rest
+        payload, response_path = build_payload(
+            config,
+            prompt,
+            session.system,
+            session.model,
+            session.temperature,
+            session.max_tokens,
+            cache_prefix=prefix,
+            cache_hint=session.cache_hint,
+        )
+        if cache is not None:
+            cache_keys[student_key] = cache.key(**session.cache_key_parts(prompt, "http"))
+            hit = cache.get(cache_keys[student_key])
+            if hit is not None:
+                outcomes[student_key] = hit
+                continue
+        requests.append({"custom_id": student_key, "method": "POST", "body": payload})
+
+    info = {"requests": len(requests), "cache_hits": len(outcomes), "usage": {}}
+    if duplicates:
+        info["duplicates"] = len(duplicates)
+    if not requests:
+        return _share_duplicates(outcomes, info, duplicates)
+
+    endpoint = endpoint or load_endpoint()
+    jsonl_path = os.path.join(args.output_dir, f"llm_batch_{utc_timestamp()}.jsonl")
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for request in requests:
+            request["url"] = endpoint.request_path
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    started = time.monotonic()
+    job_id = endpoint.submit(jsonl_path)
+    job = wait_for_job(
+        endpoint,
+        job_id,
+        poll_sec=float(getattr(args, "batch_poll_sec", DEFAULT_POLL_SEC)),
+        max_wait_sec=float(getattr(args, "batch_max_wait_hours", DEFAULT_WAIT_HOURS)) * 3600,
+    )
+    info.update(
+        job_id=job_id,
+        status=job.get("status"),
+        input_jsonl=jsonl_path,
+        wait_sec=round(time.monotonic() - started, 3),
+    )
+
+    for line in endpoint.results(job):
+        student_key = line.get("custom_id")
+        try:
+            text = _result_text(line, response_path)
+            evaluation = extract_json_block(text)
+        except Exception as exc:  # noqa: BLE001
+            outcomes[student_key] = exc
+            continue
+        info["usage"][student_key] = text.usage
+        if student_key in cache_keys:
+            cache.put(cache_keys[student_key], evaluation)
+        outcomes[student_key] = evaluation
+
+    for request in requests:
+        outcomes.setdefault(
+            request["custom_id"], BatchJobError(f"batch_result_missing:{job.get('status')}")
+        )
+    return _share_duplicates(outcomes, info, duplicates)
@@ -2,10 +2,18 @@ import argparse
 import json
 import os
 
-from .batch import run_batch
+from .batch import DEFAULT_MAX_DEPTH, DEFAULT_PRUNE_DIRS, run_batch
+from .cli import (
+    add_cascade_args,
+    add_output_limit_args,
+    add_prompt_layout_args,
+    add_resilience_args,
+    add_template_args,
+)
+from .work_queue import run_queue_role
 
 
-def parse_args():
+def parse_args(argv=None):
     ap = argparse.ArgumentParser(
         description="Batch grading CLI for student folders (apellidos_nombres)"
     )
@@ -20,6 +28,18 @@ def parse_args():
         default="**/*.ipynb",
         help="Notebook discovery glob inside student folder",
     )
+    ap.add_argument(
+        "--max-depth",
+        type=int,
+        default=DEFAULT_MAX_DEPTH,
+        help="Profundidad máxima de búsqueda dentro de cada carpeta de alumno",
+    )
+    ap.add_argument(
+        "--prune-dirs",
+        type=lambda v: frozenset(x.strip() for x in v.split(",") if x.strip()),
+        default=DEFAULT_PRUNE_DIRS,
+        help="Carpetas a ignorar, separadas por coma (default: __pycache__, node_modules)",
+    )
 
     ap.add_argument("--rubric", required=True, help="Ruta al rubric.json")
     ap.add_argument("--assignment", help="Ruta al enunciado (txt)")
@@ -36,8 +56,8 @@ def parse_args():
     ap.add_argument(
         "--llm-provider",
         default="mock",
-        choices=["mock", "http", "agents", "codex"],
-        help="Proveedor LLM",
+        choices=["mock", "http", "http-batch", "agents", "codex"],
+        help="Proveedor LLM (http-batch: un único job batch del proveedor para todo el lote)",
     )
     ap.add_argument(
         "--model",
@@ -49,6 +69,26 @@ def parse_args():
     )
     ap.add_argument("--temperature", type=float, default=0.2)
     ap.add_argument("--max-tokens", type=int, default=1200)
+    ap.add_argument(
+        "--llm-stream",
+        action="store_true",
+        help="Respuesta en streaming (SSE, proveedor http); corta al cerrarse el JSON",
+    )
+    ap.add_argument(
+        "--context-token-budget",
+        type=int,
+        default=0,
+        help="Máximo de tokens del prompt; recorta outputs y luego código largo (0 = sin límite)",
+    )
+    ap.add_argument(
+        "--per-criterion",
+        action="store_true",
+        help="Una solicitud concurrente por criterio de la rúbrica, combinadas en una evaluación",
+    )
+    add_prompt_layout_args(ap)
+    add_output_limit_args(ap)
+    add_template_args(ap)
+    add_cascade_args(ap)
 
     ap.add_argument(
         "--execute-notebook", action="store_true", help="Ejecutar notebook antes de evaluar"
@@ -64,12 +104,145 @@ def parse_args():
     ap.add_argument("--docker-cpus", default="2", help="CPUs contenedor")
     ap.add_argument("--docker-memory", default="2g", help="Memoria contenedor")
     ap.add_argument("--docker-network", default="none", help="Red contenedor")
-    return ap.parse_args()
+
+    ap.add_argument(
+        "--cache-dir",
+        default="",
+        help="Caché de evaluaciones LLM (default: <output-dir>/.eval_cache)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Desactivar caché de evaluaciones")
+    ap.add_argument("--cache-max-mb", type=int, default=512, help="Tamaño máximo de la caché (MB)")
+    add_resilience_args(ap)
+
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Alumnos corregidos en paralelo (hilos; la ejecución local corre en procesos)",
+    )
+    ap.add_argument(
+        "--schedule",
+        choices=["ljf", "fifo"],
+        default="ljf",
+        help="Orden de despacho: ljf (más costosos primero) o fifo (orden alfabético)",
+    )
+    ap.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Evaluar por separado entregas idénticas (por defecto se evalúan una sola vez)",
+    )
+    ap.add_argument(
+        "--staged",
+        action="store_true",
+        help="Separar ejecución y evaluación en etapas conectadas por colas acotadas",
+    )
+    ap.add_argument(
+        "--exec-workers",
+        type=int,
+        default=0,
+        help="Workers de la etapa de ejecución (default: núcleos de CPU)",
+    )
+    ap.add_argument(
+        "--eval-workers",
+        type=int,
+        default=0,
+        help="Workers de la etapa de evaluación (default: --workers)",
+    )
+    ap.add_argument(
+        "--queue-size",
+        type=int,
+        default=0,
+        help="Capacidad de cada cola entre etapas (default: 2 x --eval-workers)",
+    )
+    ap.add_argument(
+        "--http-pool-size",
+        type=int,
+        default=0,
+        help="Conexiones keep-alive al LLM (proveedor http; default: --workers)",
+    )
+    ap.add_argument(
+        "--async-llm",
+        action="store_true",
+        help="Evaluar en un bucle asyncio (implica --staged) en lugar de un hilo por solicitud",
+    )
+    ap.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=64,
+        help="Solicitudes LLM simultáneas con --async-llm",
+    )
+    ap.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Ajustar solicitudes HTTP simultáneas según respuestas 429/5xx (implica --staged)",
+    )
+    ap.add_argument(
+        "--batch-poll-sec",
+        type=float,
+        default=30.0,
+        help="Intervalo de consulta del job con --llm-provider http-batch (seg)",
+    )
+    ap.add_argument(
+        "--batch-max-wait-hours",
+        type=float,
+        default=24.0,
+        help="Espera máxima del job con --llm-provider http-batch (horas)",
+    )
+    ap.add_argument(
+        "--rpm", type=float, default=0, help="Límite de solicitudes por minuto (0 = sin límite)"
+    )
+    ap.add_argument(
+        "--tpm", type=float, default=0, help="Límite de tokens por minuto (0 = sin límite)"
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Omitir alumnos ya corregidos con las mismas entradas (según batch_journal.jsonl)",
+    )
+
+    ap.add_argument(
+        "--queue-db",
+        help="Base SQLite compartida para repartir el lote entre varias máquinas",
+    )
+    ap.add_argument(
+        "--queue-role",
+        choices=["enqueue", "work", "merge"],
+        default="work",
+        help="enqueue: encolar alumnos; work: procesar trabajos; merge: consolidar resultados",
+    )
+    ap.add_argument(
+        "--lease-seconds",
+        type=int,
+        default=600,
+        help="Duración del lease de cada trabajo (se renueva con heartbeats)",
+    )
+    ap.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Leases vencidos tolerados antes de marcar al alumno con error",
+    )
+    args = ap.parse_args(argv)
+    if args.llm_provider == "http-batch":
+        unsupported = [
+            flag
+            for flag, enabled in (
+                ("--per-criterion", args.per_criterion),
+                ("--cascade-model", args.cascade_model),
+            )
+            if enabled
+        ]
+        if unsupported:
+            ap.error(f"--llm-provider http-batch no admite {', '.join(unsupported)}")
+    return args
 
 
 def main():
     args = parse_args()
-    report = run_batch(args)
+    if args.queue_db:
+        report = run_queue_role(args)
+    else:
+        report = run_batch(args)
     print(json.dumps(report, ensure_ascii=False))
 
 
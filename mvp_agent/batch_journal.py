@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+
+from .evaluator import prompt_template_path
+from .utils import read_text, sha256_file, sha256_text, utc_timestamp
+
+JOURNAL_NAME = "batch_journal.jsonl"
+
+# Options that change the evaluation of an otherwise identical notebook.
+_CONFIG_KEYS = (
+    "gradebook_column",
+    "llm_provider",
+    "model",
+    "temperature",
+    "max_tokens",
+    "execute_notebook",
+    "exec_mode",
+    "execution_timeout",
+    "allow_exec_errors",
+    "docker_image",
+    "context_token_budget",
+    "per_criterion",
+    "max_output_lines",
+    "max_output_chars",
+    "max_notebook_output_chars",
+    "template_mode",
+    "cascade_model",
+    "cascade_min_confidence",
+    "cascade_pass_score",
+    "cascade_margin",
+    "prompt_layout",
+    "prompt_cache_hint",
+)
+
+
+def config_fingerprint(args) -> str:
+    payload = {key: getattr(args, key, None) for key in _CONFIG_KEYS}
+    payload["rubric"] = sha256_file(args.rubric)
+    payload["assignment"] = sha256_text(read_text(args.assignment))
+    payload["materials"] = sha256_text(read_text(args.materials))
+    layout = getattr(args, "prompt_layout", "inline")
+    payload["prompt"] = sha256_text(read_text(prompt_template_path(args.prompt, layout)))
+    template = getattr(args, "template_notebook", "") or ""
+    payload["template_notebook"] = sha256_file(template) if template else ""
+    return sha256_text(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+
+class BatchJournal:
+    """Append-only JSONL log of finished students, one file per output dir."""
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, JOURNAL_NAME)
+        self._lock = threading.Lock()
+
+    def entries(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        out: list[dict] = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line.
+                    continue
+        return out
+
+    def completed(self) -> dict[str, dict]:
+        latest: dict[str, dict] = {}
+        for entry in self.entries():
+            key = entry.get("student_key")
+            if key:
+                latest[key] = entry
+        return {k: e for k, e in latest.items() if e.get("status") == "ok"}
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps({**entry, "recorded_at": utc_timestamp()}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def is_resumable(entry: dict | None, config_sha256: str, notebook_sha256: str) -> bool:
+    if not entry or not notebook_sha256:
+        return False
+    if entry.get("config_sha256") != config_sha256:
+        return False
+    if entry.get("notebook_sha256") != notebook_sha256:
+        return False
+    return os.path.isdir(str(entry.get("run_folder", "")))
@@ -0,0 +1,158 @@
+from collections import Counter
+
+# The validator already fixes this one by using the rubric weights.
+_BENIGN_ISSUES = ("LLM weights differ from rubric weights",)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cost_units(usage) -> int:
+    """Billed tokens of a run (0 on a cache hit); request count when usage is unknown."""
+    if not usage or usage.get("eval_cache_hit"):
+        return 0
+    tokens = int(usage.get("prompt_tokens", 0) or 0) + int(usage.get("completion_tokens", 0) or 0)
+    return tokens or int(usage.get("requests", 1))
+
+
+class CascadePolicy:
+    """Decides when a cheap first-pass evaluation must be re-graded by ``--model``.
+
+    A student escalates when the cheap pass fails (error or invalid JSON), any
+    criterion has ``confidence`` below ``min_confidence``, the validator
+    reported issues (other than the weight override it resolves itself), or
+    the final score lies within ``margin`` of ``pass_score``. ``price_ratio`` is the cheap model's
+    price per token relative to the expensive one, used for the savings estimate.
+    """
+
+    def __init__(
+        self,
+        cheap_model: str,
+        min_confidence: float = 0.6,
+        pass_score: float = 10.5,
+        margin: float = 1.0,
+        price_ratio: float = 0.1,
+    ):
+        self.cheap_model = cheap_model
+        self.min_confidence = min_confidence
+        self.pass_score = pass_score
+        self.margin = margin
+        self.price_ratio = price_ratio
+
+    @classmethod
+    def from_args(cls, args) -> "CascadePolicy | None":
+        cheap_model = getattr(args, "cascade_model", "") or ""
+        if not cheap_model:
+            return None
+        return cls(
+            cheap_model,
+            min_confidence=float(getattr(args, "cascade_min_confidence", 0.6)),
+            pass_score=float(getattr(args, "cascade_pass_score", 10.5)),
+            margin=float(getattr(args, "cascade_margin", 1.0)),
+            price_ratio=float(getattr(args, "cascade_price_ratio", 0.1)),
+        )
+
+    def reasons(self, validation: dict) -> list[str]:
+        evaluation = validation["evaluation"]
+        reasons = []
+        confidences = [_to_float(c.get("confidence")) for c in evaluation.get("criteria", [])]
+        if not confidences or any(c is None or c < self.min_confidence for c in confidences):
+            reasons.append("low_confidence")
+        if any(not issue.startswith(_BENIGN_ISSUES) for issue in validation["issues"]):
+            reasons.append("validator_issues")
+        final_score = _to_float(evaluation.get("final_score"))
+        if final_score is not None and abs(final_score - self.pass_score) <= self.margin:
+            reasons.append("borderline_score")
+        return reasons
+
+    def decide(self, usage, first_usage, first=None, error=None) -> list[str]:
+        """Reasons to escalate the cheap pass; with none, ``first`` is accepted and recorded."""
+        reasons = ["cheap_pass_failed"] if error is not None else self.reasons(first)
+        if not reasons:
+            self.record(usage, first_usage)
+        return reasons
+
+    def evaluate(self, run, usage=None) -> dict:
+        """Cascade over ``run(model, run_usage)``; ``model=None`` grades with ``--model``."""
+        first_usage: dict = {}
+        try:
+            first, error = run(self.cheap_model, first_usage), None
+        except Exception as exc:  # noqa: BLE001 - any cheap-pass failure escalates
+            first, error = None, exc
+        reasons = self.decide(usage, first_usage, first, error)
+        if not reasons:
+            return first
+        final_usage: dict = {}
+        validation = run(None, final_usage)
+        self.record(usage, first_usage, final_usage, reasons, error)
+        return validation
+
+    async def aevaluate(self, run, usage=None) -> dict:
+        """:meth:`evaluate` for an async ``run``."""
+        first_usage: dict = {}
+        try:
+            first, error = await run(self.cheap_model, first_usage), None
+        except Exception as exc:  # noqa: BLE001 - any cheap-pass failure escalates
+            first, error = None, exc
+        reasons = self.decide(usage, first_usage, first, error)
+        if not reasons:
+            return first
+        final_usage: dict = {}
+        validation = await run(None, final_usage)
+        self.record(usage, first_usage, final_usage, reasons, error)
+        return validation
+
+    def record(self, usage, first_usage, final_usage=None, reasons=(), error=None) -> None:
+        """Store the cascade outcome in ``usage``; token counts become the sum of both passes."""
+        if usage is None:
+            return
+        escalated = final_usage is not None
+        final_usage = final_usage or {}
+        for key in set(first_usage) | set(final_usage):
+            if key.endswith("_tokens"):
+                usage[key] = first_usage.get(key, 0) + final_usage.get(key, 0)
+        timings = final_usage if escalated else first_usage
+        usage.update({key: value for key, value in timings.items() if key.endswith("_sec")})
+        usage["eval_cache_hit"] = bool(first_usage.get("eval_cache_hit")) and (
+            not escalated or bool(final_usage.get("eval_cache_hit"))
+        )
+        first_units = _cost_units(first_usage)
+        final_units = _cost_units(final_usage)
+        usage["cascade"] = {
+            "cheap_model": self.cheap_model,
+            "escalated": escalated,
+            "reasons": list(reasons),
+            "first_pass": first_usage,
+            "cost": round(self.price_ratio * first_units + final_units, 3),
+            # What grading this student with --model alone would have cost.
+            "baseline": final_units if escalated else first_units,
+        }
+        if error is not None:
+            usage["cascade"]["first_pass_error"] = str(error)[:300]
+
+
+def summarize_cascade(rows: list[dict], model: str, policy: CascadePolicy) -> dict:
+    graded = [r for r in rows if r.get("cascade_escalated") not in (None, "")]
+    escalated = [r for r in graded if r["cascade_escalated"]]
+    reasons = Counter(
+        reason
+        for r in escalated
+        for reason in str(r.get("cascade_reasons", "")).split(",")
+        if reason
+    )
+    cost = sum(float(r.get("cascade_cost", 0) or 0) for r in graded)
+    baseline = sum(float(r.get("cascade_baseline", 0) or 0) for r in graded)
+    return {
+        "cheap_model": policy.cheap_model,
+        "model": model,
+        "students": len(graded),
+        "escalated": len(escalated),
+        "escalation_rate": round(len(escalated) / len(graded), 3) if graded else 0.0,
+        "reasons": dict(reasons),
+        "price_ratio": policy.price_ratio,
+        "estimated_savings": round(1 - cost / baseline, 3) if baseline else 0.0,
+    }
@@ -1,24 +1,26 @@
 import argparse
+import asyncio
 import csv
 import json
 import os
 
-from .evaluator import (
-    evaluate_with_agents,
-    evaluate_with_codex,
-    evaluate_with_llm,
-    mock_evaluate,
-)
-from .extractor import build_context_pack
+from .cascade import CascadePolicy
+from .dedup import context_fingerprint, current_single_flight, restamp
+from .eval_cache import cache_from_args
+from .evaluator import PROMPT_LAYOUTS, session_from_args, with_session
+from .llm_client import CACHE_HINTS
+from .notebook_model import json_default
 from .notebook_runner import execute_notebook, execute_notebook_docker
 from .render import render_instructor_feedback, render_student_feedback
-from .utils import ensure_dir, read_json, read_text, utc_timestamp
+from .resilience import retrier_from_args
+from .template_diff import TEMPLATE_MODES
+from .utils import ensure_dir, utc_timestamp
 from .validator import validate_evaluation
 
 
 def _write_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
 
 
 def _write_text(path, text):
@@ -63,6 +65,22 @@ def parse_args():
     )
     ap.add_argument("--temperature", type=float, default=0.2)
     ap.add_argument("--max-tokens", type=int, default=1200)
+    ap.add_argument(
+        "--llm-stream",
+        action="store_true",
+        help="Respuesta en streaming (SSE, proveedor http); corta al cerrarse el JSON",
+    )
+    ap.add_argument(
+        "--context-token-budget",
+        type=int,
+        default=0,
+        help="Máximo de tokens del prompt; recorta outputs y luego código largo (0 = sin límite)",
+    )
+    ap.add_argument(
+        "--per-criterion",
+        action="store_true",
+        help="Una solicitud concurrente por criterio de la rúbrica, combinadas en una evaluación",
+    )
     ap.add_argument(
         "--execute-notebook", action="store_true", help="Ejecutar notebook antes de evaluar"
     )
@@ -82,14 +100,127 @@ def parse_args():
     ap.add_argument("--docker-cpus", default="2", help="CPUs asignados al contenedor")
     ap.add_argument("--docker-memory", default="2g", help="Memoria asignada al contenedor")
     ap.add_argument("--docker-network", default="none", help="Red del contenedor")
+    ap.add_argument(
+        "--cache-dir",
+        default="",
+        help="Caché de evaluaciones LLM (default: <output-dir>/.eval_cache)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Desactivar caché de evaluaciones")
+    ap.add_argument("--cache-max-mb", type=int, default=512, help="Tamaño máximo de la caché (MB)")
+    add_prompt_layout_args(ap)
+    add_output_limit_args(ap)
+    add_template_args(ap)
+    add_cascade_args(ap)
+    add_resilience_args(ap)
     return ap.parse_args()
 
 
-def run_pipeline(args) -> str:
-    rubric = read_json(args.rubric)
-    assignment_text = read_text(args.assignment)
-    materials_text = read_text(args.materials)
+def add_prompt_layout_args(ap) -> None:
+    ap.add_argument(
+        "--prompt-layout",
+        choices=list(PROMPT_LAYOUTS),
+        default="inline",
+        help="prefix: rúbrica/enunciado/materiales primero (idénticos en el lote), alumno al final",
+    )
+    ap.add_argument(
+        "--prompt-cache-hint",
+        choices=list(CACHE_HINTS),
+        default="none",
+        help="Pista de caché de prompt para el proveedor http (requiere --prompt-layout prefix)",
+    )
+
+
+def add_template_args(ap) -> None:
+    ap.add_argument(
+        "--template-notebook",
+        default="",
+        help="Notebook inicial del enunciado; sus celdas sin cambios no se envían completas",
+    )
+    ap.add_argument(
+        "--template-mode",
+        choices=list(TEMPLATE_MODES),
+        default="mark",
+        help="mark: dejar una marca en la celda sin cambios; drop: omitirla (salvo sus outputs)",
+    )
+
+
+def add_output_limit_args(ap) -> None:
+    ap.add_argument(
+        "--max-output-lines",
+        type=int,
+        default=60,
+        help="Líneas de output por celda (inicio y final; 0 = sin límite)",
+    )
+    ap.add_argument(
+        "--max-output-chars",
+        type=int,
+        default=4000,
+        help="Caracteres de output por celda (inicio y final; 0 = sin límite)",
+    )
+    ap.add_argument(
+        "--max-notebook-output-chars",
+        type=int,
+        default=30000,
+        help="Caracteres de output de todo el notebook; recorta los más largos (0 = sin límite)",
+    )
+
+
+def add_cascade_args(ap) -> None:
+    ap.add_argument(
+        "--cascade-model",
+        default="",
+        help="Modelo barato para una primera pasada; --model solo re-evalúa los casos dudosos",
+    )
+    ap.add_argument(
+        "--cascade-min-confidence",
+        type=float,
+        default=0.6,
+        help="Escalar si algún criterio tiene confidence menor a este valor",
+    )
+    ap.add_argument(
+        "--cascade-pass-score", type=float, default=10.5, help="Nota de aprobación (0-20)"
+    )
+    ap.add_argument(
+        "--cascade-margin",
+        type=float,
+        default=1.0,
+        help="Escalar si la nota final está a esta distancia o menos de la de aprobación",
+    )
+    ap.add_argument(
+        "--cascade-price-ratio",
+        type=float,
+        default=0.1,
+        help="Precio por token del modelo barato relativo a --model (para estimar el ahorro)",
+    )
+
+
+def add_resilience_args(ap) -> None:
+    ap.add_argument(
+        "--llm-timeout",
+        type=float,
+        default=0,
+        help="Timeout por intento LLM en seg (default: LLM_TIMEOUT o 120; 240 en codex)",
+    )
+    ap.add_argument("--max-retries", type=int, default=2, help="Reintentos por llamada LLM")
+    ap.add_argument(
+        "--retry-base-delay", type=float, default=1.0, help="Espera base del backoff (seg)"
+    )
+    ap.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=5,
+        help="Fallos consecutivos que abren el circuito del proveedor (0 = desactivado)",
+    )
+    ap.add_argument(
+        "--breaker-reset",
+        type=float,
+        default=30.0,
+        help="Segundos con el circuito abierto antes de probar de nuevo",
+    )
+
 
+def prepare_submission(args) -> dict:
+    session = session_from_args(args)
     run_id = utc_timestamp()
     out_dir = os.path.join(args.output_dir, f"{args.student_id}_{run_id}")
     ensure_dir(out_dir)
@@ -118,48 +249,85 @@ def run_pipeline(args) -> str:
         notebook_path = executed_path
         _write_json(os.path.join(out_dir, "execution_report.json"), execution_report)
 
-    context = build_context_pack(
-        student_id=args.student_id,
-        rubric=rubric,
-        assignment_text=assignment_text,
-        materials_text=materials_text,
-        notebook_path=notebook_path,
-        execution_report=execution_report,
-    )
-
-    if args.llm_provider == "mock":
-        evaluation = mock_evaluate(context)
-    elif args.llm_provider == "agents":
-        if not args.model:
-            raise ValueError("Model is required for agents provider. Set --model or LLM_MODEL.")
-        evaluation = evaluate_with_agents(
-            context=context,
-            prompt_path=args.prompt,
-            model=args.model,
-        )
-    elif args.llm_provider == "codex":
-        if not args.model:
-            raise ValueError(
-                "Model is required for codex provider. "
-                "Set --model, CODEX_MODEL, or LLM_MODEL."
-            )
-        evaluation = evaluate_with_codex(
-            context=context,
-            prompt_path=args.prompt,
-            model=args.model,
-        )
-    else:
-        if not args.model:
-            raise ValueError("Model is required for http provider. Set --model or LLM_MODEL.")
-        evaluation = evaluate_with_llm(
-            context=context,
-            prompt_path=args.prompt,
-            model=args.model,
-            temperature=args.temperature,
-            max_tokens=args.max_tokens,
+    context = session.build_context(args.student_id, notebook_path, execution_report)
+    return {"out_dir": out_dir, "context": context}
+
+
+_MODEL_REQUIRED = {
+    "agents": "Model is required for agents provider. Set --model or LLM_MODEL.",
+    "codex": "Model is required for codex provider. Set --model, CODEX_MODEL, or LLM_MODEL.",
+    "http": "Model is required for http provider. Set --model or LLM_MODEL.",
+}
+
+
+def _require_model(args) -> None:
+    if not args.model:
+        raise ValueError(_MODEL_REQUIRED.get(args.llm_provider, _MODEL_REQUIRED["http"]))
+
+
+def evaluate_context(args, context, retry=None, usage=None) -> dict:
+    flight = current_single_flight()
+    if flight is None:
+        return _evaluate_context(args, context, retry, usage)
+    student_id = context["student_id"]
+    validation, leader = flight.do(
+        context_fingerprint(context),
+        student_id,
+        lambda: _evaluate_context(args, context, retry, usage),
+    )
+    return validation if leader is None else restamp(validation, student_id, leader, usage)
+
+
+def _evaluate_context(args, context, retry=None, usage=None) -> dict:
+    session = session_from_args(args)
+    if args.llm_provider != "mock":
+        _require_model(args)
+    cache = cache_from_args(args)
+
+    def run(model, run_usage):
+        model_session = session if model is None else session.with_model(model)
+        evaluation = model_session.evaluate(context, cache=cache, retry=retry, usage=run_usage)
+        return validate_evaluation(evaluation, context, session.weights)
+
+    policy = CascadePolicy.from_args(args)
+    if policy is None:
+        return run(None, usage)
+    return policy.evaluate(run, usage)
+
+
+async def aevaluate_context(args, context, completer, retry=None, usage=None) -> dict:
+    flight = current_single_flight()
+    if flight is None:
+        return await _aevaluate_context(args, context, completer, retry, usage)
+    student_id = context["student_id"]
+    validation, leader = await flight.ado(
+        context_fingerprint(context),
+        student_id,
+        lambda: _aevaluate_context(args, context, completer, retry, usage),
+    )
+    return validation if leader is None else restamp(validation, student_id, leader, usage)
+
+
+async def _aevaluate_context(args, context, completer, retry=None, usage=None) -> dict:
+    session = session_from_args(args)
+    if args.llm_provider != "mock":
+        _require_model(args)
+    cache = cache_from_args(args)
+
+    async def run(model, run_usage):
+        model_session = session if model is None else session.with_model(model)
+        evaluation = await model_session.aevaluate(
+            context, completer, cache=cache, retry=retry, usage=run_usage
         )
+        return validate_evaluation(evaluation, context, session.weights)
+
+    policy = CascadePolicy.from_args(args)
+    if policy is None:
+        return await run(None, usage)
+    return await policy.aevaluate(run, usage)
+
 
-    validation = validate_evaluation(evaluation, context)
+def write_outputs(args, out_dir, context, validation) -> None:
     evaluation = validation["evaluation"]
 
     _write_json(os.path.join(out_dir, "context_package.json"), context)
@@ -199,7 +367,57 @@ def run_pipeline(args) -> str:
             ],
         )
 
-    return out_dir
+
+def _write_usage(prepared, usage) -> None:
+    prepared["usage"] = usage
+    if usage:
+        _write_json(os.path.join(prepared["out_dir"], "llm_usage.json"), usage)
+
+
+def finish_submission(args, prepared) -> dict:
+    retry = retrier_from_args(args)
+    usage: dict = {}
+    try:
+        validation = evaluate_context(args, prepared["context"], retry=retry, usage=usage)
+    finally:
+        if retry is not None:
+            prepared["retry"] = retry.stats()
+    write_outputs(args, prepared["out_dir"], prepared["context"], validation)
+    _write_usage(prepared, usage)
+    return validation["evaluation"]
+
+
+def finalize_submission(args, prepared, evaluation, usage=None) -> dict:
+    """Validate an evaluation obtained elsewhere (e.g. a provider batch job) and write outputs."""
+    weights = session_from_args(args).weights
+    validation = validate_evaluation(evaluation, prepared["context"], weights)
+    write_outputs(args, prepared["out_dir"], prepared["context"], validation)
+    _write_usage(prepared, usage or {})
+    return validation["evaluation"]
+
+
+async def afinish_submission(args, prepared, completer) -> dict:
+    retry = retrier_from_args(args)
+    usage: dict = {}
+    try:
+        validation = await aevaluate_context(
+            args, prepared["context"], completer, retry=retry, usage=usage
+        )
+    finally:
+        if retry is not None:
+            prepared["retry"] = retry.stats()
+    await asyncio.to_thread(
+        write_outputs, args, prepared["out_dir"], prepared["context"], validation
+    )
+    _write_usage(prepared, usage)
+    return validation["evaluation"]
+
+
+def run_pipeline(args) -> str:
+    args = with_session(args)
+    prepared = prepare_submission(args)
+    finish_submission(args, prepared)
+    return prepared["out_dir"]
 
 
 def main():
@@ -1,14 +1,18 @@
+import asyncio
 import os
 import shutil
 import subprocess
 import tempfile
 
+from .resilience import ProviderExecError
 
-def codex_complete(prompt, system, model, timeout=240):
+CODEX_TIMEOUT = 240
+
+
+def _codex_invocation(prompt, system, model):
     if not shutil.which("codex"):
         raise RuntimeError(
-            "Codex CLI no está instalado o no está en PATH. "
-            "Instala Codex y ejecuta `codex login`."
+            "Codex CLI no está instalado o no está en PATH. Instala Codex y ejecuta `codex login`."
         )
 
     model_name = model or os.getenv("CODEX_MODEL") or os.getenv("LLM_MODEL")
@@ -20,51 +24,88 @@ def codex_complete(prompt, system, model, timeout=240):
         f"User prompt:\n{prompt}\n\n"
         "Return only the final answer content."
     )
+    return model_name, combined_prompt
+
+
+def _codex_command(model_name, output_path):
     reasoning_effort = os.getenv("CODEX_REASONING_EFFORT", "high")
+    return [
+        "codex",
+        "exec",
+        "-c",
+        f'model_reasoning_effort="{reasoning_effort}"',
+        "--sandbox",
+        "read-only",
+        "--skip-git-repo-check",
+        "--ephemeral",
+        "--model",
+        model_name,
+        "--output-last-message",
+        output_path,
+        "-",
+    ]
+
+
+def _codex_output(returncode, stdout, stderr, output_path):
+    if returncode != 0:
+        detail = (stderr or stdout or "").strip()
+        lowered = detail.lower()
+        if "login" in lowered or "auth" in lowered or "unauthorized" in lowered:
+            raise RuntimeError(
+                "Codex CLI no está autenticado. Ejecuta `codex login` y vuelve a intentar."
+            )
+        raise ProviderExecError(f"codex exec failed: {detail[:500]}")
+
+    if not os.path.exists(output_path):
+        raise RuntimeError("Codex no devolvió salida final.")
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+
+    if not text:
+        raise RuntimeError("Codex devolvió una respuesta vacía.")
+    return text
+
+
+def codex_complete(prompt, system, model, timeout=CODEX_TIMEOUT):
+    model_name, combined_prompt = _codex_invocation(prompt, system, model)
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         output_path = os.path.join(tmp_dir, "codex_last_message.txt")
-        cmd = [
-            "codex",
-            "exec",
-            "-c",
-            f'model_reasoning_effort="{reasoning_effort}"',
-            "--sandbox",
-            "read-only",
-            "--skip-git-repo-check",
-            "--ephemeral",
-            "--model",
-            model_name,
-            "--output-last-message",
-            output_path,
-            "-",
-        ]
-
         result = subprocess.run(
-            cmd,
+            _codex_command(model_name, output_path),
             input=combined_prompt,
             text=True,
             capture_output=True,
             timeout=timeout,
             check=False,
         )
+        return _codex_output(result.returncode, result.stdout, result.stderr, output_path)
 
-        if result.returncode != 0:
-            detail = (result.stderr or result.stdout or "").strip()
-            lowered = detail.lower()
-            if "login" in lowered or "auth" in lowered or "unauthorized" in lowered:
-                raise RuntimeError(
-                    "Codex CLI no está autenticado. Ejecuta `codex login` "
-                    "y vuelve a intentar."
-                )
-            raise RuntimeError(f"codex exec failed: {detail[:500]}")
 
-        if not os.path.exists(output_path):
-            raise RuntimeError("Codex no devolvió salida final.")
+async def codex_acomplete(prompt, system, model, timeout=CODEX_TIMEOUT):
+    model_name, combined_prompt = _codex_invocation(prompt, system, model)
 
-        with open(output_path, "r", encoding="utf-8") as f:
-            text = f.read().strip()
-
-    if not text:
-        raise RuntimeError("Codex devolvió una respuesta vacía.")
-    return text
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "codex_last_message.txt")
+        cmd = _codex_command(model_name, output_path)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(combined_prompt.encode("utf-8")), timeout
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(cmd, timeout) from None
+        return _codex_output(
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            output_path,
+        )
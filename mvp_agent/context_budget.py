@@ -0,0 +1,115 @@
+from functools import lru_cache
+
+# Largest outputs are first cut down to this many tokens, then dropped.
+OUTPUT_HEAD_TOKENS = 200
+# Code cells longer than this keep only their head once outputs are gone.
+CODE_HEAD_TOKENS = 400
+# "[CELL C001][CODE]" / "[OUTPUT C001]" lines and separators.
+_CELL_OVERHEAD_TOKENS = 12
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # noqa: BLE001 - unknown encoding or no cached BPE file offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with ``tiktoken`` when installed, else ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Head of ``text`` within ``max_tokens``, cut at a line break when one is close."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        head = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens * 4:
+            return text
+        head = text[: max_tokens * 4]
+    cut = head.rfind("\n")
+    return head[:cut] if cut > len(head) // 2 else head
+
+
+def _cell_tokens(cell) -> int:
+    return _CELL_OVERHEAD_TOKENS + count_tokens(cell["source"]) + count_tokens(cell["outputs"])
+
+
+def _trim(cell, section, keep_tokens, label, trimmed) -> int:
+    """Cut ``cell[section]`` to ``keep_tokens`` of its original text; returns tokens saved."""
+    key = (cell["ref"], section)
+    entry = trimmed.get(key)
+    original = entry["original"] if entry else cell[section]
+    before = count_tokens(cell[section])
+    head = truncate_tokens(original, keep_tokens)
+    if head == original:
+        return 0
+    omitted = count_tokens(original) - count_tokens(head)
+    marker = f"[... {omitted} tokens de {label} omitidos ...]"
+    replacement = f"{head}\n{marker}" if head else marker
+    after = count_tokens(replacement)
+    if after >= before:
+        return 0
+    cell[section] = replacement
+    if entry is None:
+        entry = trimmed[key] = {
+            "ref": cell["ref"],
+            "section": section,
+            "tokens_before": count_tokens(original),
+            "original": original,
+        }
+    entry["tokens_after"] = after
+    return before - after
+
+
+def pack_cells(cells, budget: int):
+    """Fit notebook cells into ``budget`` tokens.
+
+    Outputs are cut first (largest first: to a short head, then entirely), then
+    long code cells keep only their head. Every cell and its ``ref`` stays, so
+    evidence cited as ``[CELL Cxxx]`` still points at the same cell. Returns new
+    cell dicts and a report listing what was trimmed.
+    """
+    cells = [dict(cell) for cell in cells]
+    total = sum(_cell_tokens(cell) for cell in cells)
+    report = {"budget": budget, "tokens_before": total}
+    trimmed: dict = {}
+
+    by_output = sorted(cells, key=lambda c: count_tokens(c["outputs"]), reverse=True)
+    for keep in (OUTPUT_HEAD_TOKENS, 0):
+        for cell in by_output:
+            if total <= budget:
+                break
+            if cell["outputs"]:
+                total -= _trim(cell, "outputs", keep, "salida", trimmed)
+
+    code = [c for c in cells if c["type"] == "code"]
+    for cell in sorted(code, key=lambda c: count_tokens(c["source"]), reverse=True):
+        if total <= budget:
+            break
+        if count_tokens(cell["source"]) > CODE_HEAD_TOKENS:
+            total -= _trim(cell, "source", CODE_HEAD_TOKENS, "código", trimmed)
+
+    report["dropped"] = [
+        {k: v for k, v in entry.items() if k != "original"} for entry in trimmed.values()
+    ]
+    report["tokens_after"] = total
+    report["over_budget"] = total > budget
+    return cells, report
@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from .utils import sha256_text
+
+
+def context_fingerprint(context) -> str:
+    """Hash of what makes two submissions grade the same, ignoring the student id.
+
+    Trailing whitespace and blank edges of the notebook text are normalized; of
+    the execution report only the outcome counts (paths and timings differ).
+    """
+    text = "\n".join(line.rstrip() for line in context["notebook"]["text"].splitlines()).strip()
+    report = context.get("execution_report") or {}
+    outcome = {key: report.get(key) for key in ("success", "execution_error", "cell_errors")}
+    return sha256_text(json.dumps([text, outcome], sort_keys=True, ensure_ascii=False))
+
+
+class _Flight:
+    def __init__(self, leader):
+        self.leader = leader
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _AsyncFlight:
+    def __init__(self, leader):
+        self.leader = leader
+        self.future = asyncio.get_running_loop().create_future()
+
+    @property
+    def failed(self) -> bool:
+        future = self.future
+        return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+class SingleFlight:
+    """One evaluation per fingerprint; identical submissions wait for it and share it.
+
+    If the leading evaluation fails, a waiting student takes over instead of
+    inheriting the error. Only valid in the process that created it: a forked
+    worker process gets no deduplication.
+    """
+
+    def __init__(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flights: dict = {}
+        self._aflights: dict = {}
+
+    @property
+    def active(self) -> bool:
+        return os.getpid() == self._pid
+
+    def do(self, key, member, fn):
+        """``(result, leader)``: ``leader`` is None when ``member`` ran ``fn`` itself."""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                lead = flight is None or flight.error is not None
+                if lead:
+                    flight = self._flights[key] = _Flight(member)
+            if lead:
+                try:
+                    flight.result = fn()
+                except BaseException as exc:
+                    flight.error = exc
+                    raise
+                finally:
+                    flight.done.set()
+                return flight.result, None
+            flight.done.wait()
+            if flight.error is None:
+                return flight.result, flight.leader
+
+    async def ado(self, key, member, fn):
+        """Async ``do`` for evaluations running on one event loop."""
+        while True:
+            flight = self._aflights.get(key)
+            if flight is None or flight.failed:
+                flight = self._aflights[key] = _AsyncFlight(member)
+                try:
+                    result = await fn()
+                except Exception as exc:
+                    flight.future.set_exception(exc)
+                    raise
+                except BaseException:
+                    flight.future.cancel()
+                    raise
+                flight.future.set_result(result)
+                return result, None
+            await asyncio.wait((flight.future,))
+            if not flight.failed:
+                return flight.future.result(), flight.leader
+
+
+def restamp_evaluation(evaluation, student_id, leader):
+    """Copy of the leader's evaluation for ``student_id``, flagged as a duplicate."""
+    evaluation = copy.deepcopy(evaluation)
+    evaluation["student_id"] = student_id
+    evaluation.setdefault("flags", []).append(
+        {"type": "duplicate_submission", "detail": f"Entrega idéntica a {leader}."}
+    )
+    return evaluation
+
+
+def restamp(validation, student_id, leader, usage=None):
+    """The leader's validation for ``student_id``; ``usage`` records whose tokens were reused."""
+    validation = {
+        **validation,
+        "evaluation": restamp_evaluation(validation["evaluation"], student_id, leader),
+    }
+    if usage is not None:
+        usage["dedup_of"] = leader
+    return validation
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("single_flight", default=None)
+
+
+@contextmanager
+def single_flight_scope(enabled=True):
+    """Deduplicate identical submissions evaluated in this scope.
+
+    The ``SingleFlight`` is held in a context variable: threads started inside
+    the scope see it only through ``utils.in_current_context``.
+    """
+    token = _current.set(SingleFlight() if enabled else None)
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current_single_flight():
+    flight = _current.get()
+    if flight is None or not flight.active:
+        return None
+    return flight
+
+
+def duplicate_groups(rows) -> list[list[str]]:
+    """Groups of students whose submissions were identical, leader first."""
+    groups: dict = {}
+    for row in rows:
+        leader = row.get("duplicate_of")
+        if leader:
+            groups.setdefault(leader, [leader]).append(row["student_key"])
+    return [groups[leader] for leader in sorted(groups)]
@@ -51,6 +51,9 @@ def parse_args():
         action="store_true",
         help="Usar LLM para extraer instrucciones del cuerpo del correo",
     )
+    ap.add_argument("--workers", type=int, default=1, help="Alumnos en paralelo por lote")
+    ap.add_argument("--cache-dir", default="", help="Caché de evaluaciones LLM")
+    ap.add_argument("--no-cache", action="store_true", help="Desactivar caché de evaluaciones")
 
     return ap.parse_args()
 
@@ -107,6 +110,9 @@ def main():
         docker_memory=args.docker_memory,
         docker_network=args.docker_network,
         email_body_llm_parse=args.email_body_llm_parse,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        no_cache=args.no_cache,
     )
 
     result = poll_and_process_once(mail_cfg, batch_cfg)
@@ -17,7 +17,7 @@ from pathlib import Path
 from typing import Iterable
 
 from .agents_sdk_client import agents_complete
-from .batch import run_batch
+from .batch import index_submissions, run_batch
 from .llm_client import http_complete
 from .utils import ensure_dir, utc_timestamp
 
@@ -53,6 +53,9 @@ class BatchConfig:
     docker_memory: str = "2g"
     docker_network: str = "none"
     email_body_llm_parse: bool = False
+    workers: int = 1
+    cache_dir: str = ""
+    no_cache: bool = False
 
 
 @dataclass
@@ -118,9 +121,7 @@ def llm_parse_email_body(body_text: str, batch_cfg: BatchConfig) -> dict:
         "notebook_glob, requires_confirmation, notes."
     )
     prompt = (
-        "Email body to parse:\n"
-        f"{body_text}\n\n"
-        "Return JSON only. Do not include markdown fences."
+        f"Email body to parse:\n{body_text}\n\nReturn JSON only. Do not include markdown fences."
     )
 
     if batch_cfg.llm_provider == "agents":
@@ -253,13 +254,11 @@ def prepare_submissions_root(attachments: Iterable[Path], work_dir: Path) -> Pat
 
 def build_notebook_student_index(submissions_root: Path) -> dict[str, str]:
     index: dict[str, str] = {}
-    for nb in submissions_root.rglob("*.ipynb"):
-        try:
-            rel = nb.relative_to(submissions_root)
-            student_key = rel.parts[0]
-        except (ValueError, IndexError):
-            continue
-        index[nb.name.lower()] = student_key
+    student_notebooks = index_submissions(str(submissions_root), student_key_regex=r".+")
+    for student_dir, notebooks in student_notebooks.items():
+        student_key = os.path.basename(student_dir)
+        for nb in notebooks:
+            index[os.path.basename(nb).lower()] = student_key
     return index
 
 
@@ -366,6 +365,9 @@ def build_batch_args(
         docker_cpus=batch_cfg.docker_cpus,
         docker_memory=batch_cfg.docker_memory,
         docker_network=batch_cfg.docker_network,
+        workers=batch_cfg.workers,
+        cache_dir=batch_cfg.cache_dir,
+        no_cache=batch_cfg.no_cache,
     )
 
 
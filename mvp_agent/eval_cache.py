@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import threading
+
+from .utils import ensure_dir, sha256_text
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class EvaluationCache:
+    """Content-addressed store of parsed LLM evaluations.
+
+    Entries live as ``<sha256>.json`` files under ``cache_dir``. The file mtime
+    doubles as the LRU clock: hits touch it and eviction removes the oldest
+    entries once the directory exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        ensure_dir(cache_dir)
+
+    @staticmethod
+    def key(**parts):
+        return sha256_text(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, evaluation):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(evaluation, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                return
+
+
+def cache_from_args(args):
+    if getattr(args, "no_cache", False) or getattr(args, "llm_provider", "mock") == "mock":
+        return None
+    cache_dir = getattr(args, "cache_dir", "") or os.path.join(args.output_dir, ".eval_cache")
+    max_mb = getattr(args, "cache_max_mb", 0) or DEFAULT_MAX_BYTES // (1024 * 1024)
+    return EvaluationCache(cache_dir, max_bytes=int(max_mb) * 1024 * 1024)
@@ -1,9 +1,19 @@
+import asyncio
+import copy
 import json
+import os
+import string
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 
 from . import llm_client
 from .agents_sdk_client import agents_complete
-from .codex_cli_client import codex_complete
-from .utils import extract_json_block, read_text
+from .codex_cli_client import CODEX_TIMEOUT, codex_complete
+from .context_budget import count_tokens
+from .extractor import build_context_pack
+from .output_trim import OutputLimits
+from .template_diff import TemplateNotebook
+from .utils import extract_json_block, in_current_context, read_json, read_text
 
 
 def _to_float(value):
@@ -36,10 +46,11 @@ def _default_evidence(notebook_cells):
     return []
 
 
-def mock_evaluate(context):
+def mock_evaluate(context, weights=None):
     rubric = context["rubric"]
     criteria = rubric.get("criteria", [])
-    weights = _normalize_weights(criteria)
+    if weights is None:
+        weights = _normalize_weights(criteria)
     notebook_cells = context["notebook"]["cells"]
     evidence = _default_evidence(notebook_cells)
 
@@ -82,70 +93,467 @@ def mock_evaluate(context):
     }
 
 
-def evaluate_with_llm(context, prompt_path, model, temperature=0.2, max_tokens=1200):
-    system = "Eres un evaluador académico. Devuelve SOLO JSON válido según el esquema."
-    prompt_template = read_text(prompt_path)
-    if not prompt_template:
-        raise ValueError("Prompt template is empty")
+SYSTEM_PROMPT = "Eres un evaluador académico. Devuelve SOLO JSON válido según el esquema."
 
-    prompt = prompt_template.format(
-        student_id=context["student_id"],
-        rubric_json=json.dumps(context["rubric"], ensure_ascii=False, indent=2),
-        assignment=context["assignment"],
-        materials=context["materials"],
-        notebook_text=context["notebook"]["text"],
-        execution_report=json.dumps(
-            context.get("execution_report", {}), ensure_ascii=False, indent=2
-        ),
-    )
+DEFAULT_PROMPT = "mvp_agent/prompts/evaluator_prompt.txt"
+PREFIX_PROMPT = "mvp_agent/prompts/evaluator_prompt_prefix.txt"
+STUDENT_MARKER = "<<<ALUMNO>>>"
+PROMPT_LAYOUTS = ("inline", "prefix")
+CRITERION_FOCUS = (
+    "\n\nCRITERIO A EVALUAR: {name}\n"
+    "Evalúa SOLO este criterio: `criteria` debe tener un único elemento con ese nombre. "
+    "`summary`, `top_improvements` y `guiding_questions` deben referirse solo a este criterio.\n"
+)
 
-    text = llm_client.http_complete(
-        prompt=prompt,
-        system=system,
-        model=model,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-    return extract_json_block(text)
+_FORMATTER = string.Formatter()
+_STUDENT_FIELDS = ("student_id", "notebook_text", "execution_report")
 
 
-def evaluate_with_agents(context, prompt_path, model):
-    system = "Eres un evaluador académico. Devuelve SOLO JSON válido según el esquema."
-    prompt_template = read_text(prompt_path)
-    if not prompt_template:
-        raise ValueError("Prompt template is empty")
+def _shared_fields(rubric, assignment, materials):
+    return {
+        "rubric_json": json.dumps(rubric, ensure_ascii=False, indent=2),
+        "assignment": assignment or "",
+        "materials": materials or "",
+    }
 
-    prompt = prompt_template.format(
-        student_id=context["student_id"],
-        rubric_json=json.dumps(context["rubric"], ensure_ascii=False, indent=2),
-        assignment=context["assignment"],
-        materials=context["materials"],
-        notebook_text=context["notebook"]["text"],
-        execution_report=json.dumps(
+
+def _student_fields(context):
+    return {
+        "student_id": context["student_id"],
+        "notebook_text": context["notebook"]["text"],
+        "execution_report": json.dumps(
             context.get("execution_report", {}), ensure_ascii=False, indent=2
         ),
-    )
+    }
+
+
+def _fill(pieces, fields):
+    """Finish a template compiled by ``_compile``; same output as ``str.format``."""
+    out = []
+    for piece in pieces:
+        if isinstance(piece, str):
+            out.append(piece)
+            continue
+        field_name, format_spec, conversion = piece
+        value = _FORMATTER.get_field(field_name, (), fields)[0]
+        value = _FORMATTER.convert_field(value, conversion)
+        out.append(_FORMATTER.format_field(value, format_spec))
+    return "".join(out)
+
+
+def _compile(template, shared):
+    """Substitute the ``shared`` fields now and keep the rest as placeholders.
+
+    Returns a list of literal strings and ``(field, spec, conversion)`` tuples.
+    Literal braces are already unescaped, so the result is never formatted again.
+    """
+    pieces = []
+    for literal, field_name, format_spec, conversion in _FORMATTER.parse(template):
+        if literal:
+            pieces.append(literal)
+        if field_name is None:
+            continue
+        root = field_name.split(".", 1)[0].split("[", 1)[0]
+        piece = (field_name, format_spec, conversion)
+        pieces.append(_fill([piece], shared) if root in shared else piece)
+    return pieces
+
 
-    text = agents_complete(prompt=prompt, system=system, model=model)
-    return extract_json_block(text)
+def prompt_template_path(prompt_path, layout="inline"):
+    """Template actually rendered: ``prefix`` swaps the default for its twin."""
+    if layout == "prefix" and os.path.normpath(prompt_path) == os.path.normpath(DEFAULT_PROMPT):
+        return PREFIX_PROMPT
+    return prompt_path
 
 
-def evaluate_with_codex(context, prompt_path, model):
-    system = "Eres un evaluador académico. Devuelve SOLO JSON válido según el esquema."
+def compile_prompt(prompt_path, layout, shared):
+    """``(prefix, pieces)`` for a template; ``prefix`` is fully rendered.
+
+    With ``layout="prefix"`` the template is split at the ``<<<ALUMNO>>>`` line:
+    the part before it may only use rubric, assignment and materials, so it is
+    byte-identical for the whole cohort and provider prompt caches can reuse it.
+    The default template is swapped for its prefix-ordered twin. ``inline``
+    returns an empty prefix.
+    """
+    prompt_path = prompt_template_path(prompt_path, layout)
     prompt_template = read_text(prompt_path)
     if not prompt_template:
         raise ValueError("Prompt template is empty")
+    if layout != "prefix":
+        return "", _compile(prompt_template, shared)
 
-    prompt = prompt_template.format(
-        student_id=context["student_id"],
-        rubric_json=json.dumps(context["rubric"], ensure_ascii=False, indent=2),
-        assignment=context["assignment"],
-        materials=context["materials"],
-        notebook_text=context["notebook"]["text"],
-        execution_report=json.dumps(
-            context.get("execution_report", {}), ensure_ascii=False, indent=2
+    head, marker, student = prompt_template.partition(STUDENT_MARKER)
+    if not marker:
+        raise ValueError(f"Prompt layout 'prefix' needs a {STUDENT_MARKER} line in {prompt_path}")
+    try:
+        prefix = _fill(_compile(head, shared), {})
+    except KeyError as exc:
+        raise ValueError(
+            f"Student field {exc} must go after {STUDENT_MARKER} in {prompt_path}"
+        ) from exc
+    return prefix, _compile(student.lstrip("\n"), shared)
+
+
+def render_prompt_parts(context, prompt_path, layout="inline"):
+    """``(prefix, rest)`` of the prompt; ``prefix + rest`` is what gets sent.
+
+    Reads the template on every call; batches go through ``GradingSession``.
+    """
+    shared = _shared_fields(context["rubric"], context["assignment"], context["materials"])
+    prefix, pieces = compile_prompt(prompt_path, layout, shared)
+    return prefix, _fill(pieces, _student_fields(context))
+
+
+def render_prompt(context, prompt_path):
+    return render_prompt_parts(context, prompt_path)[1]
+
+
+def _record_usage(usage, text=None, cache_hit=False):
+    if usage is None:
+        return
+    usage["eval_cache_hit"] = cache_hit
+    usage.update(getattr(text, "usage", None) or {})
+
+
+class GradingSession:
+    """What every student of a batch shares, loaded and prepared once.
+
+    Holds the parsed rubric and its normalized weights, the assignment and
+    materials texts and the prompt template with those already substituted,
+    so grading a student only fills in the notebook and execution report. It
+    is plain data, so it also travels to process-pool workers.
+    """
+
+    def __init__(
+        self,
+        rubric,
+        assignment="",
+        materials="",
+        prompt_path=DEFAULT_PROMPT,
+        layout="inline",
+        provider="mock",
+        model="",
+        temperature=0.2,
+        max_tokens=1200,
+        timeout=None,
+        cache_hint="none",
+        stream=False,
+        token_budget=0,
+        per_criterion=False,
+        output_limits=None,
+        template=None,
+    ):
+        self.rubric = rubric
+        self.weights = _normalize_weights(rubric.get("criteria", []))
+        self.assignment = assignment or ""
+        self.materials = materials or ""
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.cache_hint = cache_hint
+        self.stream = stream
+        self.per_criterion = per_criterion
+        self.system = SYSTEM_PROMPT
+        self.prefix, self._pieces = compile_prompt(
+            prompt_path, layout, _shared_fields(rubric, self.assignment, self.materials)
+        )
+        self.token_budget = token_budget
+        self.output_limits = output_limits
+        self.template = template
+        # Everything but the student's own sections: system prompt, template, rubric, texts.
+        self.fixed_tokens = count_tokens(self.system) + count_tokens(
+            self.prefix + _fill(self._pieces, dict.fromkeys(_STUDENT_FIELDS, ""))
+        )
+        if per_criterion:
+            self.fixed_tokens += count_tokens(CRITERION_FOCUS)
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            rubric=read_json(args.rubric),
+            assignment=read_text(args.assignment),
+            materials=read_text(args.materials),
+            prompt_path=args.prompt,
+            layout=getattr(args, "prompt_layout", "inline"),
+            provider=args.llm_provider,
+            model=args.model,
+            temperature=args.temperature,
+            max_tokens=args.max_tokens,
+            timeout=float(getattr(args, "llm_timeout", 0) or 0) or None,
+            cache_hint=getattr(args, "prompt_cache_hint", "none"),
+            stream=bool(getattr(args, "llm_stream", False)),
+            token_budget=int(getattr(args, "context_token_budget", 0) or 0),
+            per_criterion=bool(getattr(args, "per_criterion", False)),
+            output_limits=OutputLimits.from_args(args),
+            template=TemplateNotebook.from_args(args),
+        )
+
+    def with_model(self, model):
+        """Same session graded by another model (e.g. the cheap pass of a cascade)."""
+        session = copy.copy(self)
+        session.model = model
+        return session
+
+    def build_context(self, student_id, notebook_path, execution_report=None):
+        """Context pack for one student; with ``token_budget`` the notebook gets what is left."""
+        notebook_budget = None
+        report_tokens = 0
+        if self.token_budget:
+            report_tokens = count_tokens(
+                json.dumps(execution_report or {}, ensure_ascii=False, indent=2)
+            )
+            notebook_budget = self.token_budget - self.fixed_tokens - report_tokens
+        context = build_context_pack(
+            student_id=student_id,
+            rubric=self.rubric,
+            assignment_text=self.assignment,
+            materials_text=self.materials,
+            notebook_path=notebook_path,
+            execution_report=execution_report,
+            notebook_token_budget=notebook_budget,
+            output_limits=self.output_limits,
+            template=self.template,
+        )
+        if notebook_budget is not None:
+            context["notebook"]["budget"]["sections"] = {
+                "fixed": self.fixed_tokens,
+                "execution_report": report_tokens,
+                "notebook": context["notebook"]["budget"]["tokens_after"],
+            }
+        return context
+
+    def render(self, context):
+        """``(prefix, rest)`` of this student's prompt; ``prefix + rest`` is what gets sent."""
+        return self.prefix, _fill(self._pieces, _student_fields(context))
+
+    def cache_key_parts(self, prompt, provider=None):
+        provider = provider or self.provider
+        parts = {"provider": provider, "model": self.model, "system": self.system, "prompt": prompt}
+        if provider == "http":
+            parts.update(temperature=self.temperature, max_tokens=self.max_tokens)
+        return parts
+
+    def prompts(self, context):
+        """``(prefix, prompt)`` per request: one, or one per criterion with ``per_criterion``.
+
+        Criterion requests append their focus line after the full shared prompt,
+        so they only differ at the end and prefix caches serve the rest.
+        """
+        prefix, rest = self.render(context)
+        prompt = prefix + rest
+        criteria = self.rubric.get("criteria", [])
+        if not self.per_criterion or len(criteria) < 2:
+            return [(prefix, prompt)]
+        return [
+            (prefix, prompt + CRITERION_FOCUS.format(name=c.get("name", f"Criterio {i + 1}")))
+            for i, c in enumerate(criteria)
+        ]
+
+    def _lookup(self, prompt, cache, usage):
+        if cache is None:
+            return None, None
+        key = cache.key(**self.cache_key_parts(prompt))
+        hit = cache.get(key)
+        if hit is not None:
+            _record_usage(usage, cache_hit=True)
+        return key, hit
+
+    def _finish(self, text, cache, key, usage):
+        _record_usage(usage, text)
+        evaluation = extract_json_block(text)
+        if cache is not None:
+            cache.put(key, evaluation)
+        return evaluation
+
+    def _completion(self, prefix, prompt):
+        if self.provider == "http":
+            return lambda: llm_client.http_complete(
+                prompt=prompt,
+                system=self.system,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                timeout=self.timeout,
+                cache_prefix=prefix,
+                cache_hint=self.cache_hint,
+                stream=self.stream,
+            )
+        if self.provider == "agents":
+            return lambda: agents_complete(
+                prompt=prompt, system=self.system, model=self.model, timeout=self.timeout
+            )
+        if self.provider == "codex":
+            return lambda: codex_complete(
+                prompt=prompt,
+                system=self.system,
+                model=self.model,
+                timeout=self.timeout or CODEX_TIMEOUT,
+            )
+        raise ValueError(f"Unsupported provider: {self.provider}")
+
+    def _request(self, prefix, prompt, cache, retry, usage):
+        key, hit = self._lookup(prompt, cache, usage)
+        if hit is not None:
+            return hit
+        complete = self._completion(prefix, prompt)
+        text = retry.call(complete) if retry is not None else complete()
+        return self._finish(text, cache, key, usage)
+
+    async def _arequest(self, prefix, prompt, completer, cache, retry, usage):
+        key, hit = self._lookup(prompt, cache, usage)
+        if hit is not None:
+            return hit
+
+        def complete():
+            return completer.complete(
+                prompt=prompt,
+                system=self.system,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                timeout=self.timeout,
+                cache_prefix=prefix,
+                cache_hint=self.cache_hint,
+                stream=self.stream,
+            )
+
+        text = await retry.acall(complete) if retry is not None else await complete()
+        return self._finish(text, cache, key, usage)
+
+    def evaluate(self, context, cache=None, retry=None, usage=None):
+        """Evaluate one student with the session's provider (``mock`` needs no model)."""
+        if self.provider == "mock":
+            return mock_evaluate(context, self.weights)
+        prompts = self.prompts(context)
+        if len(prompts) == 1:
+            return self._request(*prompts[0], cache, retry, usage)
+        usages = [{} for _ in prompts]
+        with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+            futures = [
+                pool.submit(
+                    in_current_context(self._request), prefix, prompt, cache, retry, part_usage
+                )
+                for (prefix, prompt), part_usage in zip(prompts, usages)
+            ]
+            parts = [future.result() for future in futures]
+        _merge_usage(usage, usages)
+        return merge_criterion_evaluations(parts, self.rubric, context["student_id"])
+
+    async def aevaluate(self, context, completer, cache=None, retry=None, usage=None):
+        """Async evaluation through an ``async_llm.AsyncCompleter`` (any provider).
+
+        Shares cache keys with ``evaluate``, so both paths reuse entries.
+        """
+        if self.provider == "mock":
+            return mock_evaluate(context, self.weights)
+        prompts = self.prompts(context)
+        if len(prompts) == 1:
+            return await self._arequest(*prompts[0], completer, cache, retry, usage)
+        usages = [{} for _ in prompts]
+        parts = await asyncio.gather(
+            *[
+                self._arequest(prefix, prompt, completer, cache, retry, part_usage)
+                for (prefix, prompt), part_usage in zip(prompts, usages)
+            ]
+        )
+        _merge_usage(usage, usages)
+        return merge_criterion_evaluations(parts, self.rubric, context["student_id"])
+
+
+def _merge_usage(usage, parts):
+    if usage is None:
+        return
+    usage["eval_cache_hit"] = all(part.get("eval_cache_hit") for part in parts)
+    usage["requests"] = len(parts)
+    for part in parts:
+        for key, value in part.items():
+            if key.endswith("_tokens"):
+                usage[key] = usage.get(key, 0) + value
+            elif key.endswith("_sec"):
+                # Requests run concurrently: the slowest one bounds the student.
+                usage[key] = max(usage.get(key, 0.0), value)
+            elif key == "usage_estimated":
+                usage[key] = True
+
+
+def _unique(values, limit):
+    seen = []
+    for value in values:
+        if value and value not in seen:
+            seen.append(value)
+    return seen[:limit]
+
+
+def merge_criterion_evaluations(parts, rubric, student_id):
+    """One evaluation in the regular schema from per-criterion answers (rubric order).
+
+    Criterion names come from the rubric. A part without criteria keeps its slot
+    as a zero-confidence ``needs_review`` placeholder so the validator still
+    matches weights by position.
+    """
+    criteria = []
+    flags = []
+    for idx, item in enumerate(rubric["criteria"]):
+        name = item.get("name", f"Criterio {idx + 1}")
+        found = (parts[idx].get("criteria") if idx < len(parts) else None) or []
+        if found:
+            criteria.append({**found[0], "name": name})
+            continue
+        criteria.append(
+            {
+                "name": name,
+                "score": None,
+                "rationale": "El modelo no devolvió este criterio.",
+                "evidence": [],
+                "common_errors": [],
+                "improvement": "",
+                "confidence": 0.0,
+            }
+        )
+        flags.append({"type": "needs_review", "detail": f"Criterio sin evaluar: {name}."})
+
+    def score(part):
+        found = part.get("criteria") or [{}]
+        try:
+            return float(found[0].get("score"))
+        except (TypeError, ValueError):
+            return 20.0
+
+    summaries = [part.get("summary") or {} for part in parts]
+    weakest = summaries[min(range(len(parts)), key=lambda i: score(parts[i]))] if parts else {}
+    for part in parts:
+        for flag in part.get("flags") or []:
+            if flag not in flags:
+                flags.append(flag)
+    return {
+        "student_id": student_id,
+        "scale_min": 0,
+        "scale_max": 20,
+        "criteria": criteria,
+        "summary": {
+            "good": " ".join(_unique((s.get("good", "") for s in summaries), len(summaries))),
+            "missing": " ".join(_unique((s.get("missing", "") for s in summaries), len(summaries))),
+            "priority": weakest.get("priority", ""),
+        },
+        "top_improvements": _unique(
+            (item for part in parts for item in part.get("top_improvements") or []), 5
         ),
-    )
+        "guiding_questions": _unique(
+            (item for part in parts for item in part.get("guiding_questions") or []), 5
+        ),
+        "flags": flags,
+    }
+
+
+def session_from_args(args) -> GradingSession:
+    """The session attached by ``with_session``, or a fresh one for a single run."""
+    return getattr(args, "session", None) or GradingSession.from_args(args)
+
 
-    text = codex_complete(prompt=prompt, system=system, model=model)
-    return extract_json_block(text)
+def with_session(args) -> Namespace:
+    """Copy of ``args`` carrying one ``GradingSession`` for every student it reaches."""
+    if getattr(args, "session", None) is not None:
+        return args
+    return Namespace(**vars(args), session=GradingSession.from_args(args))
@@ -1,5 +1,10 @@
 import json
 
+from .context_budget import count_tokens, pack_cells
+from .notebook_model import NotebookCells
+from .notebook_stream import stream_notebook
+from .output_trim import error_output_text
+
 
 def load_notebook(path):
     with open(path, "r", encoding="utf-8") as f:
@@ -10,7 +15,12 @@ def _cell_ref(index):
     return f"C{index + 1:03d}"
 
 
-def extract_notebook_cells(nb):
+def extract_notebook_cells(nb, limits=None):
+    """Cells with their source and text outputs.
+
+    With ``limits`` (``OutputLimits``) error tracebacks are included too and
+    outputs over the limits are trimmed; without them outputs are kept verbatim.
+    """
     cells_out = []
     cells = nb.get("cells", [])
     for idx, cell in enumerate(cells):
@@ -28,14 +38,21 @@ def extract_notebook_cells(nb):
                 if isinstance(text_plain, list):
                     text_plain = "".join(text_plain)
                 outputs.append(text_plain)
+            elif out.get("output_type") == "error" and limits is not None:
+                outputs.append(error_output_text(out))
+        output_text = "\n".join([o for o in outputs if o])
+        if limits is not None:
+            output_text = limits.trim(output_text)
         cells_out.append(
             {
                 "ref": _cell_ref(idx),
                 "type": cell_type,
                 "source": source.strip(),
-                "outputs": "\n".join([o for o in outputs if o]).strip(),
+                "outputs": output_text.strip(),
             }
         )
+    if limits is not None:
+        limits.apply_to_notebook(cells_out)
     return cells_out
 
 
@@ -59,11 +76,27 @@ def build_context_pack(
     materials_text,
     notebook_path,
     execution_report=None,
+    notebook_token_budget=None,
+    output_limits=None,
+    template=None,
 ):
-    nb = load_notebook(notebook_path)
-    cells = extract_notebook_cells(nb)
-    notebook_text = build_notebook_text(cells)
-    return {
+    nb, skipped_outputs = stream_notebook(notebook_path)
+    cells = extract_notebook_cells(nb, output_limits)
+    template_report = None
+    if template is not None:
+        tokens_before = count_tokens(build_notebook_text(cells))
+        cells, unchanged = template.apply(cells)
+        template_report = {
+            "path": template.path,
+            "mode": template.mode,
+            "unchanged": unchanged,
+            "tokens_saved": tokens_before - count_tokens(build_notebook_text(cells)),
+        }
+    budget_report = None
+    if notebook_token_budget is not None:
+        cells, budget_report = pack_cells(cells, max(0, notebook_token_budget))
+    cells = NotebookCells(cells)
+    context = {
         "student_id": student_id,
         "rubric": rubric,
         "assignment": assignment_text or "",
@@ -71,7 +104,14 @@ def build_context_pack(
         "notebook": {
             "path": notebook_path,
             "cells": cells,
-            "text": notebook_text,
+            "text": cells.text,
         },
         "execution_report": execution_report,
     }
+    if template_report is not None:
+        context["notebook"]["template"] = template_report
+    if skipped_outputs["count"]:
+        context["notebook"]["skipped_outputs"] = skipped_outputs
+    if budget_report is not None:
+        context["notebook"]["budget"] = budget_report
+    return context
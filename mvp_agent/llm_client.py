@@ -1,6 +1,60 @@
+import asyncio
+import base64
+import contextvars
+import hashlib
+import http.client
 import json
 import os
+import queue
+import ssl
+import threading
+import time
+import urllib.parse
 import urllib.request
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .context_budget import count_tokens
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 120.0
+
+# Errors that mean a kept-alive socket was closed by the server between requests.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class LLMHTTPError(RuntimeError):
+    def __init__(self, status, body="", headers=None):
+        super().__init__(f"LLM HTTP {status}: {body[:300]}")
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        lowered = {k.lower(): v for k, v in self.headers.items()}
+        self.retry_after = parse_retry_after(lowered.get("retry-after"))
 
 
 def _get_by_path(data, path):
@@ -19,13 +73,66 @@ def _get_by_path(data, path):
     return cur
 
 
-def http_complete(prompt, system, model, temperature=0.2, max_tokens=1200):
-    api_url = os.getenv("LLM_API_URL")
-    if not api_url:
-        raise ValueError("LLM_API_URL is not set")
+def env_timeout():
+    """Seconds per LLM request from ``LLM_TIMEOUT``."""
+    return float(os.getenv("LLM_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    api_url: str
+    api_key: str = ""
+    payload_mode: str = "messages"
+    response_path: str = ""
+    timeout: float = DEFAULT_TIMEOUT
+
+    @classmethod
+    def from_env(cls):
+        api_url = os.getenv("LLM_API_URL")
+        if not api_url:
+            raise ValueError("LLM_API_URL is not set")
+        return cls(
+            api_url=api_url,
+            api_key=os.getenv("LLM_API_KEY", ""),
+            payload_mode=os.getenv("LLM_PAYLOAD_MODE", "messages").lower(),
+            response_path=os.getenv("LLM_RESPONSE_PATH", ""),
+            timeout=env_timeout(),
+        )
+
 
-    payload_mode = os.getenv("LLM_PAYLOAD_MODE", "messages").lower()
-    if payload_mode == "input":
+def request_headers(config):
+    headers = {"Content-Type": "application/json"}
+    if config.api_key:
+        headers["Authorization"] = f"Bearer {config.api_key}"
+    return headers
+
+
+CACHE_HINTS = ("none", "cache_control", "prompt_cache_key")
+
+
+def _user_content(prompt, cache_prefix, cache_hint):
+    if cache_hint != "cache_control" or not cache_prefix or not prompt.startswith(cache_prefix):
+        return prompt
+    # Explicit breakpoint for providers that only cache marked prefixes.
+    return [
+        {"type": "text", "text": cache_prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": prompt[len(cache_prefix) :]},
+    ]
+
+
+def build_payload(
+    config,
+    prompt,
+    system,
+    model,
+    temperature=0.2,
+    max_tokens=1200,
+    cache_prefix=None,
+    cache_hint="none",
+    stream=False,
+):
+    """Request body for ``prompt``; ``cache_prefix`` is the part shared by the cohort."""
+    if config.payload_mode == "input":
         payload = {
             "model": model,
             "input": [
@@ -41,25 +148,623 @@ def http_complete(prompt, system, model, temperature=0.2, max_tokens=1200):
             "model": model,
             "messages": [
                 {"role": "system", "content": system},
-                {"role": "user", "content": prompt},
+                {"role": "user", "content": _user_content(prompt, cache_prefix, cache_hint)},
             ],
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
         default_path = "choices.0.message.content"
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+    if stream:
+        payload["stream"] = True
+    if cache_hint == "prompt_cache_key" and cache_prefix:
+        digest = hashlib.sha256(f"{model}\0{system}\0{cache_prefix}".encode("utf-8"))
+        payload["prompt_cache_key"] = digest.hexdigest()[:32]
+    return payload, config.response_path or default_path
 
-    response_path = os.getenv("LLM_RESPONSE_PATH", default_path)
 
-    headers = {"Content-Type": "application/json"}
-    api_key = os.getenv("LLM_API_KEY")
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
-
-    req = urllib.request.Request(api_url, data=json.dumps(payload).encode("utf-8"), headers=headers)
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        body = resp.read().decode("utf-8")
-    data = json.loads(body)
+class Completion(str):
+    """Completion text that also carries the provider's normalized token ``usage``."""
+
+    usage: dict = {}
+
+
+def normalize_usage(raw):
+    """Prompt/completion/cached token counts from OpenAI- or Anthropic-style ``usage``."""
+    if not isinstance(raw, dict):
+        return {}
+    details = raw.get("prompt_tokens_details") or raw.get("input_tokens_details") or {}
+    cache_read = int(raw.get("cache_read_input_tokens") or 0)
+    cache_write = int(raw.get("cache_creation_input_tokens") or 0)
+    prompt_tokens = int(raw.get("prompt_tokens") or raw.get("input_tokens") or 0)
+    if cache_read or cache_write:
+        # Anthropic reports cache reads/writes outside input_tokens.
+        prompt_tokens += cache_read + cache_write
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": int(raw.get("completion_tokens") or raw.get("output_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0) or cache_read,
+        "cache_write_tokens": cache_write,
+    }
+
+
+def completion_text(data, response_path):
     text = _get_by_path(data, response_path)
     if text is None:
         raise ValueError("LLM response path not found. Set LLM_RESPONSE_PATH.")
-    return text
+    completion = Completion(text)
+    completion.usage = normalize_usage(data.get("usage") if isinstance(data, dict) else None)
+    return completion
+
+
+def parse_completion(status, headers, raw, response_path):
+    body = raw.decode("utf-8", errors="replace")
+    if status >= 400:
+        raise LLMHTTPError(status, body, headers)
+    return completion_text(json.loads(body), response_path)
+
+
+def is_event_stream(headers):
+    return any(
+        k.lower() == "content-type" and "text/event-stream" in v.lower() for k, v in headers.items()
+    )
+
+
+class JsonObjectScanner:
+    """Finds where the first top-level JSON object of a streamed text closes.
+
+    Braces inside JSON strings are ignored; text before the object (a code
+    fence, a sentence) is skipped.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text):
+        """Index just past the closing brace within ``text``, or None if still open."""
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return None
+
+
+def _sse_delta(event):
+    # Chat completions, Responses API and Anthropic messages stream formats.
+    choices = event.get("choices")
+    if choices:
+        return (choices[0].get("delta") or {}).get("content") or ""
+    if event.get("type") == "response.output_text.delta":
+        return event.get("delta") or ""
+    if event.get("type") == "content_block_delta":
+        return (event.get("delta") or {}).get("text") or ""
+    return ""
+
+
+def _sse_usage(event):
+    for holder in (event, event.get("response"), event.get("message")):
+        if isinstance(holder, dict) and isinstance(holder.get("usage"), dict):
+            return holder["usage"]
+    return None
+
+
+class StreamingCompletion:
+    """Assembles a server-sent-events completion from raw body bytes.
+
+    ``feed`` returns True once the evaluation object has closed (or the stream
+    sent ``[DONE]``); the caller then stops reading, which also stops paying for
+    any prose the model appends after the JSON. Time to first token and time
+    to the closed object are added to the completion's ``usage``. Providers send
+    token counts in the last event, so a stream cut before it reports tokens
+    estimated from ``prompt_text`` and the JSON, with ``usage_estimated``.
+    """
+
+    def __init__(self, started, prompt_text=""):
+        self.started = started
+        self.prompt_text = prompt_text
+        self.done = False
+        self.first_token_at = None
+        self.json_at = None
+        self._buffer = b""
+        self._parts = []
+        self._usage = {}
+        self._scanner = JsonObjectScanner()
+
+    def feed(self, data):
+        self._buffer += data
+        while not self.done and b"\n" in self._buffer:
+            line, _, self._buffer = self._buffer.partition(b"\n")
+            self._line(line.strip())
+        return self.done
+
+    def _line(self, line):
+        if not line.startswith(b"data:"):
+            return
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            self.done = True
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        usage = _sse_usage(event)
+        if usage:
+            self._usage.update(usage)
+        delta = _sse_delta(event)
+        if not delta:
+            return
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        end = self._scanner.feed(delta)
+        if end is None:
+            self._parts.append(delta)
+            return
+        self._parts.append(delta[:end])
+        self.json_at = now
+        self.done = True
+
+    @property
+    def stopped_early(self):
+        return self.json_at is not None
+
+    def completion(self):
+        completion = Completion("".join(self._parts))
+        usage = normalize_usage(self._usage) if self._usage else {}
+        if not usage and self.stopped_early:
+            usage = {
+                "prompt_tokens": count_tokens(self.prompt_text),
+                "completion_tokens": count_tokens(completion),
+                "cached_tokens": 0,
+                "cache_write_tokens": 0,
+                "usage_estimated": True,
+            }
+        if self.first_token_at is not None:
+            usage["ttft_sec"] = round(self.first_token_at - self.started, 4)
+        if self.json_at is not None:
+            usage["time_to_json_sec"] = round(self.json_at - self.started, 4)
+        completion.usage = usage
+        return completion
+
+
+class HttpClient:
+    """Keep-alive HTTP client for the ``http`` provider.
+
+    Configuration is resolved once and up to ``pool_size`` idle connections to
+    the API host are kept for reuse, so consecutive grading calls skip the TCP
+    and TLS handshakes. Safe to share between threads. An optional ``gate``
+    (``adaptive.ConcurrencyGate``) admits each request and sees its outcome.
+    """
+
+    def __init__(self, config=None, pool_size=DEFAULT_POOL_SIZE, gate=None):
+        self.config = config or HttpConfig.from_env()
+        self.gate = gate
+        url = urllib.parse.urlsplit(self.config.api_url)
+        self._https = url.scheme == "https"
+        self._host = url.hostname or ""
+        self._port = url.port or (443 if self._https else 80)
+        self._target = urllib.parse.urlunsplit(("", "", url.path or "/", url.query, ""))
+        self._proxy = self._resolve_proxy(url)
+        self._ssl_context = ssl.create_default_context() if self._https else None
+        self._pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pid = os.getpid()
+
+        self._headers = request_headers(self.config)
+        self._proxy_headers = self._proxy_auth_headers()
+        if self._proxy is not None and not self._https:
+            self._headers = {**self._headers, **self._proxy_headers}
+
+    @classmethod
+    def from_env(cls, pool_size=DEFAULT_POOL_SIZE, gate=None):
+        return cls(HttpConfig.from_env(), pool_size=pool_size, gate=gate)
+
+    def _resolve_proxy(self, url):
+        proxies = urllib.request.getproxies()
+        proxy = proxies.get(url.scheme)
+        if not proxy or urllib.request.proxy_bypass(self._host):
+            return None
+        return urllib.parse.urlsplit(proxy)
+
+    def _proxy_auth_headers(self):
+        if self._proxy is None or not self._proxy.username:
+            return {}
+        user, password = self._proxy.username, self._proxy.password or ""
+        credentials = f"{urllib.parse.unquote(user)}:{urllib.parse.unquote(password)}"
+        token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+        return {"Proxy-Authorization": f"Basic {token}"}
+
+    def _new_connection(self):
+        timeout = self.config.timeout
+        if self._proxy is not None:
+            proxy_port = self._proxy.port or 80
+            if self._https:
+                conn = http.client.HTTPSConnection(
+                    self._proxy.hostname, proxy_port, timeout=timeout, context=self._ssl_context
+                )
+                conn.set_tunnel(self._host, self._port, headers=self._proxy_headers)
+                return conn
+            return http.client.HTTPConnection(self._proxy.hostname, proxy_port, timeout=timeout)
+        if self._https:
+            return http.client.HTTPSConnection(
+                self._host, self._port, timeout=timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+
+    def _acquire(self):
+        if os.getpid() != self._pid:
+            # Sockets inherited through fork() must not be shared with the parent.
+            self._pool = queue.LifoQueue(maxsize=self._pool_size)
+            self._pid = os.getpid()
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn):
+        # A per-call timeout must not leak into the next request on this connection.
+        conn.timeout = self.config.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(self.config.timeout)
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request_target(self):
+        if self._proxy is not None and not self._https:
+            return self.config.api_url
+        return self._target
+
+    def _send(self, payload, timeout=None):
+        body = json.dumps(payload).encode("utf-8")
+        conn, reused = self._acquire()
+        if timeout:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        try:
+            try:
+                conn.request("POST", self._request_target(), body=body, headers=self._headers)
+                return conn, conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                conn = self._new_connection()
+                if timeout:
+                    conn.timeout = timeout
+                conn.request("POST", self._request_target(), body=body, headers=self._headers)
+                return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _finish(self, conn, resp):
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def post_json(self, payload, timeout=None):
+        conn, resp = self._send(payload, timeout)
+        try:
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        self._finish(conn, resp)
+        return resp.status, dict(resp.getheaders()), data
+
+    def _stream(self, payload, response_path, timeout=None, prompt_text=""):
+        started = time.monotonic()
+        conn, resp = self._send(payload, timeout)
+        headers = dict(resp.getheaders())
+        try:
+            if resp.status >= 400 or not is_event_stream(headers):
+                data = resp.read()
+                self._finish(conn, resp)
+                return parse_completion(resp.status, headers, data, response_path)
+            stream = StreamingCompletion(started, prompt_text)
+            while True:
+                line = resp.readline()
+                if not line or stream.feed(line):
+                    break
+        except Exception:
+            conn.close()
+            raise
+        if stream.stopped_early:
+            # The rest of the body is prose after the JSON; dropping the socket ends it.
+            conn.close()
+        else:
+            resp.read()
+            self._finish(conn, resp)
+        return stream.completion()
+
+    def complete(
+        self,
+        prompt,
+        system,
+        model,
+        temperature=0.2,
+        max_tokens=1200,
+        timeout=None,
+        cache_prefix=None,
+        cache_hint="none",
+        stream=False,
+    ):
+        payload, response_path = build_payload(
+            self.config,
+            prompt,
+            system,
+            model,
+            temperature,
+            max_tokens,
+            cache_prefix,
+            cache_hint,
+            stream,
+        )
+        with self.gate.slot() if self.gate is not None else nullcontext():
+            if stream:
+                return self._stream(
+                    payload, response_path, timeout=timeout, prompt_text=f"{system}\n{prompt}"
+                )
+            status, headers, raw = self.post_json(payload, timeout=timeout)
+            return parse_completion(status, headers, raw, response_path)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class AsyncHttpClient:
+    """asyncio counterpart of :class:`HttpClient` for a single event loop.
+
+    Speaks HTTP/1.1 over ``asyncio`` streams and keeps up to ``pool_size`` idle
+    connections, so hundreds of requests can be in flight without a thread each.
+    Proxies are not supported; use :class:`HttpClient` behind a proxy.
+    """
+
+    def __init__(self, config=None, pool_size=DEFAULT_POOL_SIZE):
+        self.config = config or HttpConfig.from_env()
+        url = urllib.parse.urlsplit(self.config.api_url)
+        self._https = url.scheme == "https"
+        self._host = url.hostname or ""
+        self._port = url.port or (443 if self._https else 80)
+        self._host_header = url.netloc
+        self._target = urllib.parse.urlunsplit(("", "", url.path or "/", url.query, ""))
+        self._ssl_context = ssl.create_default_context() if self._https else None
+        self._pool_size = pool_size
+        self._idle = []
+
+    @classmethod
+    def from_env(cls, pool_size=DEFAULT_POOL_SIZE):
+        return cls(HttpConfig.from_env(), pool_size=pool_size)
+
+    async def _open(self):
+        return await asyncio.open_connection(self._host, self._port, ssl=self._ssl_context)
+
+    def _release(self, conn):
+        if len(self._idle) < self._pool_size:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+    def _encode(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        lines = [f"POST {self._target} HTTP/1.1", f"Host: {self._host_header}"]
+        lines += [f"{k}: {v}" for k, v in request_headers(self.config).items()]
+        lines += [f"Content-Length: {len(body)}", "Connection: keep-alive", "", ""]
+        return "\r\n".join(lines).encode("latin-1") + body
+
+    @staticmethod
+    async def _read_head(conn, request):
+        reader, writer = conn
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        status = int(status_line.split(None, 2)[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip()] = value.strip()
+        return status, headers
+
+    @staticmethod
+    async def _body(reader, headers):
+        """Yields the body in pieces as it arrives; the final item says if keep-alive holds."""
+        lowered = {k.lower(): v.lower() for k, v in headers.items()}
+        keep_alive = lowered.get("connection") != "close"
+        if "chunked" in lowered.get("transfer-encoding", ""):
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                yield await reader.readexactly(size)
+                await reader.readline()
+        elif "content-length" in lowered:
+            yield await reader.readexactly(int(lowered["content-length"]))
+        else:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                yield data
+            keep_alive = False
+        yield keep_alive
+
+    async def _exchange(self, conn, request):
+        status, headers = await self._read_head(conn, request)
+        chunks = [piece async for piece in self._body(conn[0], headers)]
+        keep_alive = chunks.pop()
+        return (status, headers, b"".join(chunks)), keep_alive
+
+    async def _stream_exchange(self, conn, request, response_path, prompt_text=""):
+        started = time.monotonic()
+        status, headers = await self._read_head(conn, request)
+        body = self._body(conn[0], headers)
+        if status >= 400 or not is_event_stream(headers):
+            chunks = [piece async for piece in body]
+            keep_alive = chunks.pop()
+            return parse_completion(status, headers, b"".join(chunks), response_path), keep_alive
+        stream = StreamingCompletion(started, prompt_text)
+        keep_alive = False
+        async for piece in body:
+            if isinstance(piece, bool):
+                keep_alive = piece
+            elif stream.feed(piece) and stream.stopped_early:
+                # Unread bytes stay on the socket, so keep_alive remains False.
+                break
+        await body.aclose()
+        return stream.completion(), keep_alive
+
+    async def _roundtrip(self, exchange, timeout=None):
+        timeout = timeout or self.config.timeout
+        reused = bool(self._idle)
+        conn = self._idle.pop() if reused else await self._open()
+        try:
+            try:
+                result, keep_alive = await asyncio.wait_for(exchange(conn), timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                conn[1].close()
+                conn = await self._open()
+                result, keep_alive = await asyncio.wait_for(exchange(conn), timeout)
+        except BaseException:
+            conn[1].close()
+            raise
+        if keep_alive:
+            self._release(conn)
+        else:
+            conn[1].close()
+        return result
+
+    async def post_json(self, payload, timeout=None):
+        request = self._encode(payload)
+        return await self._roundtrip(lambda conn: self._exchange(conn, request), timeout)
+
+    async def complete(
+        self,
+        prompt,
+        system,
+        model,
+        temperature=0.2,
+        max_tokens=1200,
+        timeout=None,
+        cache_prefix=None,
+        cache_hint="none",
+        stream=False,
+    ):
+        payload, response_path = build_payload(
+            self.config,
+            prompt,
+            system,
+            model,
+            temperature,
+            max_tokens,
+            cache_prefix,
+            cache_hint,
+            stream,
+        )
+        if stream:
+            request = self._encode(payload)
+            prompt_text = f"{system}\n{prompt}"
+            return await self._roundtrip(
+                lambda conn: self._stream_exchange(conn, request, response_path, prompt_text),
+                timeout,
+            )
+        status, headers, raw = await self.post_json(payload, timeout=timeout)
+        return parse_completion(status, headers, raw, response_path)
+
+    async def aclose(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+_current_client: contextvars.ContextVar = contextvars.ContextVar("llm_client", default=None)
+
+
+def shared_client(config=None, pool_size=DEFAULT_POOL_SIZE):
+    """Client for ``config`` (default: current environment), reused across calls."""
+    config = config or HttpConfig.from_env()
+    with _clients_lock:
+        client = _clients.get(config)
+        if client is None:
+            client = HttpClient(config, pool_size=pool_size)
+            _clients[config] = client
+        return client
+
+
+@contextmanager
+def use_client(client=None):
+    """Route ``http_complete`` through ``client`` (e.g. for the length of a batch).
+
+    Without ``client`` the environment is read once, here, instead of on every
+    request. The client is held in a context variable: threads started inside
+    the scope see it only through ``utils.in_current_context``.
+    """
+    token = _current_client.set(client or shared_client())
+    try:
+        yield _current_client.get()
+    finally:
+        _current_client.reset(token)
+
+
+def http_complete(
+    prompt,
+    system,
+    model,
+    temperature=0.2,
+    max_tokens=1200,
+    timeout=None,
+    cache_prefix=None,
+    cache_hint="none",
+    stream=False,
+):
+    client = _current_client.get() or shared_client()
+    return client.complete(
+        prompt=prompt,
+        system=system,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        cache_prefix=cache_prefix,
+        cache_hint=cache_hint,
+        stream=stream,
+    )
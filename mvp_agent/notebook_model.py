@@ -0,0 +1,138 @@
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+
+CELL_FIELDS = ("ref", "type", "source", "outputs")
+
+
+def cell_ref(number: int) -> str:
+    return f"C{number:03d}"
+
+
+class Cell:
+    """One cell of a ``NotebookCells``, read like the cell dicts of ``extract_notebook_cells``.
+
+    ``source`` and ``outputs`` are sliced out of the notebook text on access.
+    """
+
+    __slots__ = ("_cells", "_index")
+
+    def __init__(self, cells: "NotebookCells", index: int):
+        self._cells = cells
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._cells._field(self._index, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in CELL_FIELDS else default
+
+    def keys(self):
+        return CELL_FIELDS
+
+    def __iter__(self):
+        return iter(CELL_FIELDS)
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in CELL_FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, Cell):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Cell({self.to_dict()!r})"
+
+
+class NotebookCells(Sequence):
+    """Notebook cells stored once, as offsets into the text they render to.
+
+    ``text`` is what ``extractor.build_notebook_text`` returns for the same
+    cells and is built in the same pass that records where each cell's source
+    and outputs start and end, so a context pack holds the notebook a single
+    time. Cells are ``Cell`` views; ``by_ref`` finds one by its ``Cxxx`` ref.
+    """
+
+    __slots__ = ("text", "_numbers", "_types", "_offsets")
+
+    def __init__(self, cells):
+        self._numbers = array("I")
+        self._types = []
+        # source start, source end, outputs start, outputs end; per cell.
+        self._offsets = array("I")
+        pieces = []
+        position = 0
+
+        def add(piece):
+            nonlocal position
+            start = position
+            pieces.append(piece)
+            position += len(piece) + 1
+            return start
+
+        for cell in cells:
+            self._numbers.append(int(cell["ref"][1:]))
+            self._types.append(sys.intern(cell["type"]))
+            add(f"[CELL {cell['ref']}][{cell['type'].upper()}]")
+            spans = []
+            for section in ("source", "outputs"):
+                if not cell[section]:
+                    spans += [position, position]
+                    continue
+                if section == "outputs":
+                    add(f"[OUTPUT {cell['ref']}]")
+                start = add(cell[section])
+                spans += [start, start + len(cell[section])]
+            self._offsets.extend(spans)
+            add("")
+        self.text = "\n".join(pieces).strip()
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("cell index out of range")
+        return Cell(self, index)
+
+    def _field(self, index, key):
+        if key == "ref":
+            return cell_ref(self._numbers[index])
+        if key == "type":
+            return self._types[index]
+        if key not in ("source", "outputs"):
+            raise KeyError(key)
+        base = 4 * index + (0 if key == "source" else 2)
+        return self.text[self._offsets[base] : self._offsets[base + 1]]
+
+    def by_ref(self, ref: str) -> Cell | None:
+        try:
+            number = int(ref[1:])
+        except (TypeError, ValueError):
+            return None
+        index = bisect_left(self._numbers, number)
+        if index < len(self) and self._numbers[index] == number:
+            return Cell(self, index)
+        return None
+
+    def to_json(self) -> list[dict]:
+        return [cell.to_dict() for cell in self]
+
+
+def json_default(value):
+    """``default=`` for ``json.dump`` so context packs serialize with plain cell dicts."""
+    if isinstance(value, NotebookCells):
+        return value.to_json()
+    if isinstance(value, Cell):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -2,6 +2,7 @@ import os
 import shutil
 import subprocess
 import tempfile
+import time
 
 
 def execute_notebook(
@@ -18,6 +19,7 @@ def execute_notebook(
             "Dependencias faltantes para ejecutar notebooks. Instala con: pip install '.[exec]'"
         ) from exc
 
+    started = time.monotonic()
     nb = nbformat.read(input_path, as_version=4)
 
     with tempfile.TemporaryDirectory() as tmp_dir:
@@ -57,6 +59,7 @@ def execute_notebook(
         "cell_errors": errors,
         "success": exec_error is None and not errors,
         "mode": "local",
+        "duration_sec": round(time.monotonic() - started, 3),
     }
     return report
 
@@ -106,6 +109,7 @@ def execute_notebook_docker(
     ]
 
     exec_error = None
+    started = time.monotonic()
     try:
         subprocess.run(cmd, check=True, timeout=timeout_sec + 30)
     except Exception as exc:
@@ -121,5 +125,6 @@ def execute_notebook_docker(
         "success": exec_error is None,
         "mode": "docker",
         "docker_image": image,
+        "duration_sec": round(time.monotonic() - started, 3),
     }
     return report
@@ -0,0 +1,128 @@
+import json
+import re
+
+CHUNK_SIZE = 1 << 20
+# Output bundle entries read by ``extract_notebook_cells``; the rest is skipped.
+KEPT_MIME_TYPES = ("text/plain",)
+# A key that looks like a MIME type. Quotes inside JSON strings are always
+# escaped, so an unescaped quote followed by ``type/subtype":`` opens a real key.
+_MIME_KEY_RE = re.compile(rb'(?<!\\)"([a-z]{1,32}/[-+.\w]{1,96})"\s*:\s*')
+# Bytes held back at a chunk boundary so a key split across chunks still matches.
+_KEY_TAIL = 160
+_STRUCTURE_RE = re.compile(rb'["\[\]{},]')
+
+
+def _skip_value(read, buf, pos):
+    """Consume the JSON value at ``buf[pos:]``, reading on as needed.
+
+    Returns ``(buf, pos, nbytes)``: the buffer and position right after the
+    value, and how many bytes it took. String contents are only searched for
+    their closing quote, never decoded.
+    """
+    depth = 0
+    in_string = False
+    # The first byte of the next chunk is escaped by a backslash ending this one.
+    escaped = False
+    start = pos
+    nbytes = 0
+    while True:
+        if in_string:
+            quote = buf.find(b'"', pos)
+            if quote == -1:
+                segment = buf[pos:]
+                run = len(segment) - len(segment.rstrip(b"\\"))
+                odd = run % 2 == 1
+                escaped = escaped ^ odd if run == len(segment) else odd
+                pos = len(buf)
+            else:
+                run = quote - pos - len(buf[pos:quote].rstrip(b"\\"))
+                odd = run % 2 == 1
+                if run == quote - pos:
+                    odd ^= escaped
+                escaped = False
+                pos = quote + 1
+                if not odd:
+                    in_string = False
+                    if depth == 0:
+                        break
+        else:
+            match = _STRUCTURE_RE.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+            else:
+                char = match.group()
+                if char == b'"':
+                    in_string = True
+                    pos = match.end()
+                elif char in b"[{":
+                    depth += 1
+                    pos = match.end()
+                elif depth == 0:
+                    # "," or a closing bracket after a number, true, false or null.
+                    pos = match.start()
+                    break
+                elif char == b",":
+                    pos = match.end()
+                else:
+                    depth -= 1
+                    pos = match.end()
+                    if depth == 0:
+                        break
+        if pos >= len(buf):
+            nbytes += len(buf) - start
+            buf = read()
+            pos = start = 0
+            if not buf:
+                raise ValueError("Notebook JSON ends inside an output value")
+    return buf, pos, nbytes + pos - start
+
+
+def stream_notebook(path, chunk_size=CHUNK_SIZE):
+    """Load a notebook without materializing binary outputs.
+
+    The file is read in chunks and every output bundle entry other than
+    ``KEPT_MIME_TYPES`` (base64 images, HTML, widget state...) becomes ``null``
+    as it streams past, so memory follows the notebook's text rather than its
+    plots. Returns ``(nb, skipped)`` where ``skipped`` holds the total
+    ``count`` and ``bytes`` and the same per MIME type in ``by_mime``.
+    """
+    kept = []
+    by_mime: dict = {}
+    with open(path, "rb") as f:
+
+        def read():
+            return f.read(chunk_size)
+
+        buf = read()
+        pos = 0
+        while buf:
+            match = _MIME_KEY_RE.search(buf, pos)
+            if match is None or match.end() == len(buf):
+                more = read()
+                if not more:
+                    kept.append(buf[pos:])
+                    break
+                cut = max(pos, len(buf) - _KEY_TAIL)
+                if match is not None:
+                    cut = min(cut, match.start())
+                kept.append(buf[pos:cut])
+                # One byte before the cut stays as context for the lookbehind.
+                keep_from = max(cut - 1, 0)
+                buf, pos = buf[keep_from:] + more, cut - keep_from
+                continue
+            kept.append(buf[pos : match.end()])
+            mime = match.group(1).decode("ascii")
+            if mime in KEPT_MIME_TYPES:
+                pos = match.end()
+                continue
+            kept.append(b"null")
+            buf, pos, nbytes = _skip_value(read, buf, match.end())
+            entry = by_mime.setdefault(mime, {"count": 0, "bytes": 0})
+            entry["count"] += 1
+            entry["bytes"] += nbytes
+    skipped = {
+        "count": sum(entry["count"] for entry in by_mime.values()),
+        "bytes": sum(entry["bytes"] for entry in by_mime.values()),
+        "by_mime": by_mime,
+    }
+    return json.loads(b"".join(kept)), skipped
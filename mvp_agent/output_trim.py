@@ -0,0 +1,163 @@
+import re
+
+# Runs of at least this many lines that differ only in their numbers collapse.
+MIN_REPEAT_RUN = 4
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?(?:e[-+]?\d+)?")
+# "File "x.py", line 3" in plain tracebacks, "File /x.py:3, in f" in ipykernel ones.
+_FRAME_RE = re.compile(r'^\s*File "?([^",]+?)"?(?:, line |:)\d+')
+_LIBRARY_RE = re.compile(r"site-packages|dist-packages|[/\\]lib[/\\]python\d")
+_TRACEBACK_RE = re.compile(r"^(\w+\s+)?Traceback \(most recent call last\)")
+# ipykernel traceback entries written by the student's own cells.
+_CELL_FRAME_PREFIXES = ("Cell In[", "Input In [", "<ipython-input-")
+
+
+def _elided(what):
+    return f"[... {what} ...]"
+
+
+def _library_marker(count):
+    return f"  {_elided(f'{count} frames de librerías omitidos')}"
+
+
+def _terminal_lines(text):
+    # A carriage return redraws the line (progress bars): keep what was left on screen.
+    return [line.rsplit("\r", 1)[-1] for line in _ANSI_RE.sub("", text).split("\n")]
+
+
+def condense_tracebacks(lines):
+    """Drop library frames from Python tracebacks, keeping the student's and the exception."""
+    out = []
+    hidden = 0
+    in_traceback = False
+    in_library = False
+    for line in lines:
+        if _TRACEBACK_RE.match(line):
+            in_traceback = True
+            out.append(line)
+            continue
+        if in_traceback:
+            frame = _FRAME_RE.match(line)
+            if frame:
+                in_library = bool(_LIBRARY_RE.search(frame.group(1)))
+                if in_library:
+                    hidden += 1
+                    continue
+            elif line.startswith(_CELL_FRAME_PREFIXES):
+                in_library = False
+            elif line[:1] in (" ", "\t", "-", "^", "~") or not line:
+                if in_library:
+                    continue
+            else:
+                in_traceback = in_library = False
+            if hidden:
+                out.append(_library_marker(hidden))
+                hidden = 0
+        out.append(line)
+    if hidden:
+        out.append(_library_marker(hidden))
+    return out
+
+
+def collapse_repeats(lines):
+    """Keep the first and last line of runs that only differ in their numbers (epoch logs)."""
+    out = []
+    start = 0
+    while start < len(lines):
+        shape = _NUMBER_RE.sub("#", lines[start])
+        end = start + 1
+        while end < len(lines) and _NUMBER_RE.sub("#", lines[end]) == shape:
+            end += 1
+        run = end - start
+        if run >= MIN_REPEAT_RUN and shape.strip():
+            kind = "repetidas" if lines[start] == lines[end - 1] else "similares"
+            out += [lines[start], _elided(f"{run - 2} líneas {kind} omitidas"), lines[end - 1]]
+        else:
+            out += lines[start:end]
+        start = end
+    return out
+
+
+def head_tail_lines(lines, max_lines):
+    if not max_lines or len(lines) <= max_lines:
+        return lines
+    head = (max_lines + 1) // 2
+    tail = max_lines - head
+    omitted = len(lines) - head - tail
+    return lines[:head] + [_elided(f"{omitted} líneas omitidas")] + (lines[-tail:] if tail else [])
+
+
+def head_tail_chars(text, max_chars):
+    """Head and tail of ``text`` within ``max_chars``, cut at line breaks when close."""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    head = text[: (max_chars + 1) // 2]
+    tail = text[len(text) - max_chars // 2 :] if max_chars > 1 else ""
+    cut = head.rfind("\n")
+    if cut > len(head) // 2:
+        head = head[:cut]
+    cut = tail.find("\n")
+    if 0 <= cut < len(tail) // 2:
+        tail = tail[cut + 1 :]
+    marker = _elided(f"{len(text) - len(head) - len(tail)} caracteres omitidos")
+    return "\n".join(part for part in (head, marker, tail) if part)
+
+
+def error_output_text(output):
+    """Text of an ``error`` output: its traceback without terminal colors."""
+    header = f"{output.get('ename', 'Error')}: {output.get('evalue', '')}".rstrip(": ")
+    traceback = [_ANSI_RE.sub("", entry) for entry in output.get("traceback", [])]
+    return "\n".join(traceback) if traceback else header
+
+
+class OutputLimits:
+    """How much of each cell's outputs reaches the prompt.
+
+    Only an output over ``max_lines`` or ``max_chars`` is touched: it is cleaned
+    up first (tracebacks without library frames, runs of near-identical lines
+    collapsed) and, if still too long, cut keeping head and tail.
+    ``max_notebook_chars`` caps all outputs together by cutting the largest ones
+    first. 0 disables a limit, so ``OutputLimits(0, 0, 0)`` changes nothing.
+    Every cut leaves a ``[... N ... omitidos ...]`` / ``omitidas`` marker.
+    """
+
+    def __init__(self, max_lines: int = 60, max_chars: int = 4000, max_notebook_chars=30000):
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.max_notebook_chars = max_notebook_chars
+
+    @classmethod
+    def from_args(cls, args) -> "OutputLimits":
+        return cls(
+            max_lines=int(getattr(args, "max_output_lines", 60) or 0),
+            max_chars=int(getattr(args, "max_output_chars", 4000) or 0),
+            max_notebook_chars=int(getattr(args, "max_notebook_output_chars", 30000) or 0),
+        )
+
+    def _over(self, text: str) -> bool:
+        if self.max_chars and len(text) > self.max_chars:
+            return True
+        return bool(self.max_lines) and text.count("\n") >= self.max_lines
+
+    def trim(self, text: str) -> str:
+        text = text.rstrip()
+        if not self._over(text):
+            return text
+        lines = collapse_repeats(condense_tracebacks(_terminal_lines(text)))
+        return head_tail_chars("\n".join(head_tail_lines(lines, self.max_lines)), self.max_chars)
+
+    def apply_to_notebook(self, cells) -> None:
+        """Share ``max_notebook_chars`` among the cells' outputs, shortest kept whole."""
+        sizes = sorted(len(cell["outputs"]) for cell in cells if cell["outputs"])
+        if not self.max_notebook_chars or sum(sizes) <= self.max_notebook_chars:
+            return
+        remaining = self.max_notebook_chars
+        cap = 0
+        for left, size in enumerate(sizes):
+            cap = remaining // (len(sizes) - left)
+            if size > cap:
+                break
+            remaining -= size
+        for cell in cells:
+            cell["outputs"] = head_tail_chars(cell["outputs"], max(cap, 1))
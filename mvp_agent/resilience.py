@@ -0,0 +1,219 @@
+import asyncio
+import http.client
+import random
+import subprocess
+import threading
+import time
+
+from .llm_client import LLMHTTPError
+
+RETRYABLE_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# openai / Agents SDK exception names, matched by name so the SDK stays optional.
+_RETRYABLE_SDK_ERRORS = frozenset(
+    {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class ProviderExecError(RuntimeError):
+    """A provider process failed in a way worth retrying (e.g. ``codex exec`` exit != 0)."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, LLMHTTPError):
+        return exc.status in RETRYABLE_STATUSES
+    if isinstance(
+        exc,
+        (
+            TimeoutError,
+            asyncio.TimeoutError,
+            ConnectionError,
+            http.client.HTTPException,
+            subprocess.TimeoutExpired,
+            ProviderExecError,
+        ),
+    ):
+        return True
+    return type(exc).__name__ in _RETRYABLE_SDK_ERRORS
+
+
+class CircuitBreaker:
+    """Fails fast once a provider keeps failing.
+
+    After ``threshold`` consecutive retryable failures the circuit opens and
+    calls raise :class:`CircuitOpenError` for ``reset_sec``; then one probe is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = 5, reset_sec: float = 30.0):
+        self.threshold = threshold
+        self.reset_sec = reset_sec
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_sec:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError("circuit_open: provider failing, skipping call")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class Retrier:
+    """Retries one student's provider calls with jittered exponential backoff.
+
+    Create one per student so ``stats()`` describes that student; the circuit
+    breaker is shared by every student using the same provider.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.attempts = 0
+        self.backoff_sec = 0.0
+        self.last_error = ""
+        # Per-criterion requests of one student share the retrier from several threads.
+        self._lock = threading.Lock()
+
+    def _delay(self, retry: int, exc: BaseException) -> float:
+        # "Full jitter": spreads retries from concurrent students instead of syncing them.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    def _before(self) -> None:
+        if self.breaker is not None:
+            self.breaker.before_call()
+        with self._lock:
+            self.attempts += 1
+
+    def _after_failure(self, exc: BaseException, retry: int) -> float | None:
+        """Delay before the next attempt, or None to give up and re-raise."""
+        self.last_error = f"{type(exc).__name__}: {str(exc)[:200]}"
+        if not is_retryable(exc):
+            # The provider answered (e.g. 400); it is up even if this request is bad.
+            self._after_success()
+            return None
+        if self.breaker is not None:
+            self.breaker.record_failure()
+        if retry >= self.max_retries:
+            return None
+        delay = self._delay(retry, exc)
+        with self._lock:
+            self.backoff_sec += delay
+        return delay
+
+    def _after_success(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def call(self, fn):
+        retry = 0
+        while True:
+            self._before()
+            try:
+                result = fn()
+            except Exception as exc:
+                delay = self._after_failure(exc, retry)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                retry += 1
+                continue
+            self._after_success()
+            return result
+
+    async def acall(self, fn):
+        retry = 0
+        while True:
+            self._before()
+            try:
+                result = await fn()
+            except Exception as exc:
+                delay = self._after_failure(exc, retry)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                retry += 1
+                continue
+            self._after_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "llm_attempts": self.attempts,
+            "llm_retries": max(0, self.attempts - 1),
+            "llm_backoff_sec": round(self.backoff_sec, 3),
+        }
+
+
+_breakers: dict = {}
+_breakers_lock = threading.Lock()
+
+
+def shared_breaker(provider: str, threshold: int, reset_sec: float) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get((provider, threshold, reset_sec))
+        if breaker is None:
+            breaker = CircuitBreaker(threshold, reset_sec)
+            _breakers[(provider, threshold, reset_sec)] = breaker
+        return breaker
+
+
+def retrier_from_args(args) -> Retrier | None:
+    if args.llm_provider == "mock":
+        return None
+    threshold = int(getattr(args, "breaker_threshold", 5))
+    reset_sec = float(getattr(args, "breaker_reset", 30.0))
+    return Retrier(
+        max_retries=int(getattr(args, "max_retries", 2)),
+        base_delay=float(getattr(args, "retry_base_delay", 1.0)),
+        breaker=shared_breaker(args.llm_provider, threshold, reset_sec),
+    )
@@ -0,0 +1,60 @@
+from .notebook_stream import stream_notebook
+from .utils import sha256_text
+
+TEMPLATE_MODES = ("mark", "drop")
+TEMPLATE_MARKER = "[celda de la plantilla sin cambios]"
+
+
+def cell_fingerprint(cell_type, source) -> str:
+    """Hash of a cell's type and source with all whitespace runs collapsed."""
+    return sha256_text(f"{cell_type}\0{' '.join(source.split())}")
+
+
+class TemplateNotebook:
+    """Starter notebook whose untouched cells are not sent to the evaluator.
+
+    A student cell matches when its type and source equal some template cell's
+    up to whitespace. With ``mark`` the cell keeps its ``[CELL Cxxx]`` header and
+    the source becomes ``TEMPLATE_MARKER``; with ``drop`` it disappears from the
+    notebook text unless it has outputs, which are the student's own run. Refs
+    of every other cell stay the same either way.
+    """
+
+    def __init__(self, path: str, mode: str = "mark"):
+        if mode not in TEMPLATE_MODES:
+            raise ValueError(f"Unknown template mode: {mode}")
+        self.path = path
+        self.mode = mode
+        nb, _ = stream_notebook(path)
+        self.fingerprints = set()
+        for cell in nb.get("cells", []):
+            source = cell.get("source", "")
+            if isinstance(source, list):
+                source = "".join(source)
+            if source.strip():
+                self.fingerprints.add(cell_fingerprint(cell.get("cell_type", "unknown"), source))
+
+    @classmethod
+    def from_args(cls, args) -> "TemplateNotebook | None":
+        path = getattr(args, "template_notebook", "") or ""
+        if not path:
+            return None
+        return cls(path, getattr(args, "template_mode", "mark"))
+
+    def matches(self, cell) -> bool:
+        return bool(cell["source"]) and (
+            cell_fingerprint(cell["type"], cell["source"]) in self.fingerprints
+        )
+
+    def apply(self, cells):
+        """``(cells, unchanged_refs)`` with unchanged template cells marked or dropped."""
+        out = []
+        unchanged = []
+        for cell in cells:
+            if not self.matches(cell):
+                out.append(cell)
+                continue
+            unchanged.append(cell["ref"])
+            if self.mode == "mark" or cell["outputs"]:
+                out.append({**cell, "source": TEMPLATE_MARKER})
+        return out, unchanged
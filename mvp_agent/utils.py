@@ -1,3 +1,6 @@
+import contextvars
+import functools
+import hashlib
 import json
 import os
 import re
@@ -53,6 +56,15 @@ def extract_json_block(text):
     """
     if not text:
         raise ValueError("Empty LLM response")
+    start = text.find("{")
+    if start >= 0:
+        # Decoding from the first brace ignores prose (and braces) after the object.
+        try:
+            data, _ = json.JSONDecoder().raw_decode(text, start)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            return data
     match = re.search(r"\{.*\}", text, re.DOTALL)
     if not match:
         raise ValueError("No JSON object found in response")
@@ -61,3 +73,25 @@ def extract_json_block(text):
         return json.loads(json_str)
     except json.JSONDecodeError as exc:
         raise ValueError(f"Invalid JSON: {exc}") from exc
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_text(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def in_current_context(fn):
+    """``fn`` bound to a copy of the caller's context variables.
+
+    Threads start with an empty context, so work handed to a thread or pool
+    goes through this to see scopes like ``llm_client.use_client``. Bind once
+    per thread or submitted call: a context cannot run in two threads at once.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -33,7 +33,8 @@ def _extract_rubric_weights(context):
     return weights
 
 
-def validate_evaluation(evaluation, context):
+def validate_evaluation(evaluation, context, rubric_weights=None):
+    """Check and normalize an evaluation; ``rubric_weights`` may come precomputed."""
     issues = []
     notebook_text = context["notebook"]["text"]
 
@@ -41,8 +42,8 @@ def validate_evaluation(evaluation, context):
     if not criteria:
         issues.append("No criteria in evaluation output.")
 
-    rubric_weights_raw = _extract_rubric_weights(context)
-    rubric_weights = _normalize_weights(rubric_weights_raw) if rubric_weights_raw else []
+    if rubric_weights is None:
+        rubric_weights = _normalize_weights(_extract_rubric_weights(context))
     llm_weights_raw = [_to_float(c.get("weight")) for c in criteria]
     llm_weights = _normalize_weights(llm_weights_raw) if criteria else []
     use_weights = rubric_weights if rubric_weights else llm_weights
@@ -0,0 +1,361 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .batch import (
+    _default_row,
+    _error_row,
+    discover_jobs,
+    estimate_cost,
+    grade_student,
+    http_client_scope,
+    load_execution_history,
+    local_exec_pool,
+    summarize_rows,
+    write_batch_report,
+    write_summary_csv,
+)
+from .batch_journal import config_fingerprint
+from .dedup import duplicate_groups, single_flight_scope
+from .evaluator import with_session
+from .utils import ensure_dir, in_current_context, utc_timestamp
+
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+POLL_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    idx INTEGER NOT NULL,
+    student_key TEXT PRIMARY KEY,
+    student_dir TEXT NOT NULL,
+    notebook TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    row_json TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_id() -> str:
+    return f"{_process_id()}:{threading.get_ident()}"
+
+
+class WorkQueue:
+    """SQLite-backed job queue shared by several grading nodes.
+
+    Jobs are leased with an expiry; a worker that dies stops renewing its lease
+    and the job becomes available again once it expires. Every operation opens
+    its own short transaction so several local worker processes can share it.
+
+    Nodes on different machines need storage with working POSIX locks: SQLite
+    locking is unreliable on NFS/SMB mounts, where two nodes may lease the
+    same job.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        lease_seconds=DEFAULT_LEASE_SECONDS,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _tx(self):
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def set_meta(self, key, value):
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_meta(self, key):
+        with self._tx() as conn:
+            found = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return found[0] if found else None
+
+    def enqueue(self, jobs, priorities=None):
+        now = time.time()
+        priorities = priorities or [0.0] * len(jobs)
+        with self._tx() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            # idx orders the merged results, so later enqueues continue the sequence.
+            start = conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM jobs").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs "
+                "(idx, student_key, student_dir, notebook, priority, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (idx, os.path.basename(student_dir), student_dir, notebook, priority, now)
+                    for idx, ((student_dir, notebook), priority) in enumerate(
+                        zip(jobs, priorities), start
+                    )
+                ],
+            )
+            after = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return after - before
+
+    def lease(self, owner):
+        now = time.time()
+        with self._tx() as conn:
+            # Jobs whose lease ran out too many times are closed as errors so a
+            # notebook that kills its worker cannot block the batch forever.
+            expired = conn.execute(
+                "SELECT student_key FROM jobs WHERE status = 'leased' AND lease_expires < ? "
+                "AND attempts >= ?",
+                (now, self.max_attempts),
+            ).fetchall()
+            for (student_key,) in expired:
+                row = _default_row(student_key)
+                row["status"] = "error"
+                row["error"] = "lease_expired"
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', row_json = ?, updated_at = ? "
+                    "WHERE student_key = ?",
+                    (json.dumps(row, ensure_ascii=False), now, student_key),
+                )
+
+            found = conn.execute(
+                "SELECT student_key, student_dir, notebook FROM jobs "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY priority DESC, idx LIMIT 1",
+                (now,),
+            ).fetchone()
+            if not found:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE student_key = ?",
+                (owner, now + self.lease_seconds, now, found[0]),
+            )
+        return {"student_key": found[0], "student_dir": found[1], "notebook": found[2]}
+
+    def heartbeat(self, student_key, owner):
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE student_key = ? AND owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, student_key, owner),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, student_key, owner, row):
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', row_json = ?, updated_at = ? "
+                "WHERE student_key = ? AND owner = ? AND status = 'leased'",
+                (json.dumps(row, ensure_ascii=False), time.time(), student_key, owner),
+            )
+        return cur.rowcount == 1
+
+    def foreign_leases(self, owner_prefix):
+        """Leased jobs whose owner is not a worker of this process."""
+        with self._tx() as conn:
+            found = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND owner NOT LIKE ?",
+                (f"{owner_prefix}:%",),
+            ).fetchone()
+        return found[0]
+
+    def counts(self):
+        with self._tx() as conn:
+            found = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        out = {"pending": 0, "leased": 0, "done": 0}
+        out.update(dict(found))
+        return out
+
+    def rows(self):
+        with self._tx() as conn:
+            found = conn.execute(
+                "SELECT student_key, status, row_json FROM jobs ORDER BY idx"
+            ).fetchall()
+        out = []
+        for student_key, status, row_json in found:
+            if status == "done" and row_json:
+                out.append(json.loads(row_json))
+            else:
+                row = _default_row(student_key)
+                row["error"] = f"not_finished:{status}"
+                out.append(row)
+        return out
+
+
+class _Heartbeat:
+    def __init__(self, wq, student_key, owner):
+        self._wq = wq
+        self._student_key = student_key
+        self._owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self._wq.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                self._wq.heartbeat(self._student_key, self._owner)
+            except sqlite3.Error:
+                # A missed beat is tolerated; the lease only lapses after several.
+                continue
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _queue_from_args(args):
+    return WorkQueue(
+        args.queue_db,
+        lease_seconds=getattr(args, "lease_seconds", DEFAULT_LEASE_SECONDS),
+        max_attempts=getattr(args, "max_attempts", DEFAULT_MAX_ATTEMPTS),
+    )
+
+
+def enqueue_batch(args) -> dict:
+    ensure_dir(os.path.dirname(os.path.abspath(args.queue_db)))
+    wq = _queue_from_args(args)
+    wq.set_meta("config_sha256", config_fingerprint(args))
+    if not wq.get_meta("batch_id"):
+        wq.set_meta("batch_id", utc_timestamp())
+    discovery: dict = {}
+    student_dirs, notebooks = discover_jobs(args, discovery)
+    priorities = [0.0] * len(student_dirs)
+    if getattr(args, "schedule", "ljf") == "ljf":
+        history = load_execution_history(args.output_dir) if args.execute_notebook else {}
+        priorities = [
+            estimate_cost(nb, history.get(os.path.basename(d)), args.execute_notebook)
+            for d, nb in zip(student_dirs, notebooks)
+        ]
+    added = wq.enqueue(list(zip(student_dirs, notebooks)), priorities)
+    return {
+        "queue_db": args.queue_db,
+        "batch_id": wq.get_meta("batch_id"),
+        "students_discovered": len(student_dirs),
+        **discovery,
+        "enqueued": added,
+        **wq.counts(),
+    }
+
+
+def _worker_loop(wq, args, stats, lock, exec_pool):
+    owner = worker_id()
+    while True:
+        job = wq.lease(owner)
+        if job is None:
+            # Leases held by sibling threads finish here; only another node's
+            # leases are worth waiting for, in case that node dies and they expire.
+            if wq.foreign_leases(_process_id()) == 0:
+                return
+            time.sleep(POLL_INTERVAL)
+            continue
+        with _Heartbeat(wq, job["student_key"], owner):
+            try:
+                row = grade_student(job["student_dir"], args, job["notebook"], exec_pool)
+            except Exception as exc:  # noqa: BLE001
+                row = _error_row(_default_row(job["student_key"]), exc)
+        accepted = wq.complete(job["student_key"], owner, row)
+        with lock:
+            stats["processed" if accepted else "lost_leases"] += 1
+
+
+def work_batch(args) -> dict:
+    wq = _queue_from_args(args)
+    expected = wq.get_meta("config_sha256")
+    if expected and expected != config_fingerprint(args):
+        raise ValueError(
+            "Worker configuration differs from the coordinator "
+            "(rubric, prompt, provider or model). Use the same flags on every node."
+        )
+    ensure_dir(args.output_dir)
+    args = with_session(args)
+    stats = {"processed": 0, "lost_leases": 0}
+    lock = threading.Lock()
+    workers = max(1, int(getattr(args, "workers", 1) or 1))
+    exec_pool = local_exec_pool(args, workers)
+    try:
+        with http_client_scope(args), single_flight_scope(not getattr(args, "no_dedup", False)):
+            # Bound inside the scope so every worker sees the shared HTTP client.
+            threads = [
+                threading.Thread(
+                    target=in_current_context(_worker_loop),
+                    args=(wq, args, stats, lock, exec_pool),
+                    daemon=True,
+                )
+                for _ in range(workers)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+    finally:
+        if exec_pool is not None:
+            exec_pool.shutdown()
+    return {"queue_db": args.queue_db, "worker": socket.gethostname(), **stats, **wq.counts()}
+
+
+def merge_batch(args) -> dict:
+    wq = _queue_from_args(args)
+    ensure_dir(args.output_dir)
+    summary_rows = wq.rows()
+    summary_csv = os.path.join(args.output_dir, args.summary_csv)
+    write_summary_csv(summary_csv, summary_rows)
+    report = {
+        "batch_id": wq.get_meta("batch_id") or utc_timestamp(),
+        "submissions_root": args.submissions_root,
+        "students_discovered": len(summary_rows),
+        "summary_csv": summary_csv,
+        **summarize_rows(summary_rows),
+        "pipeline": "queue",
+        "queue_db": args.queue_db,
+        "queue": wq.counts(),
+    }
+    if not getattr(args, "no_dedup", False):
+        # Only duplicates graded by the same worker are shared.
+        report["duplicate_groups"] = duplicate_groups(summary_rows)
+    return write_batch_report(args, report)
+
+
+def run_queue_role(args) -> dict:
+    role = getattr(args, "queue_role", "work")
+    if role == "enqueue":
+        return enqueue_batch(args)
+    if role == "merge":
+        return merge_batch(args)
+    return work_batch(args)
@@ -0,0 +1,78 @@
+import shutil
+import time
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.adaptive import AIMDController
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.llm_client import LLMHTTPError, parse_retry_after
+
+
+def test_aimd_grows_on_success_and_halves_once_per_burst():
+    controller = AIMDController(initial=4, maximum=8)
+    for _ in range(6):
+        controller.record_success()
+    assert controller.current == 5
+
+    started = time.monotonic()
+    for _ in range(3):
+        controller.observe(LLMHTTPError(429, headers={"Retry-After": "0"}), started)
+    assert controller.throttles == 3
+    assert controller.decreases == 1
+    assert controller.current == 2
+
+    controller.observe(LLMHTTPError(400), time.monotonic())
+    assert controller.throttles == 3
+
+
+def test_retry_after_pauses_admissions():
+    controller = AIMDController(initial=2)
+    controller.observe(LLMHTTPError(503, headers={"retry-after": "5"}), time.monotonic())
+    assert 4 < controller.pause_remaining() <= 5
+
+
+def test_parse_retry_after_formats():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("mañana") is None
+    assert parse_retry_after(None) is None
+
+
+def test_run_batch_reports_adaptive_concurrency(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for i in range(6):
+        (submissions / f"alumno_{i}").mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / f"alumno_{i}" / "entrega.ipynb")
+
+    with FakeLLMServer(error_rate=0.5, error_status=429, seed=1) as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        args = parse_args(
+            [
+                "--submissions-root",
+                str(submissions),
+                "--rubric",
+                "examples/rubric.json",
+                "--output-dir",
+                str(tmp_path / "out"),
+                "--llm-provider",
+                "http",
+                "--model",
+                "fake",
+                "--no-cache",
+                "--no-dedup",
+                "--workers",
+                "8",
+                "--adaptive-concurrency",
+                "--max-retries",
+                "0",
+                "--breaker-threshold",
+                "0",
+            ]
+        )
+        report = run_batch(args)
+
+    stats = report["adaptive_concurrency"]
+    assert report["pipeline"] == "staged"
+    assert stats["max_limit"] == 8
+    assert stats["throttles"] == server.errors > 0
+    assert stats["successes"] == report["ok"]
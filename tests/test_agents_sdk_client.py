@@ -0,0 +1,31 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from mvp_agent.agents_sdk_client import agents_complete
+
+
+def _fake_agents(delay):
+    class Runner:
+        @staticmethod
+        async def run(starting_agent, input):
+            await asyncio.sleep(delay)
+            return types.SimpleNamespace(final_output=f"{starting_agent.model}: {input}")
+
+    class Agent:
+        def __init__(self, name, instructions, model):
+            self.model = model
+
+    return types.SimpleNamespace(Agent=Agent, Runner=Runner)
+
+
+def test_agents_complete_is_bounded_by_llm_timeout(monkeypatch):
+    monkeypatch.setitem(sys.modules, "agents", _fake_agents(delay=5))
+    monkeypatch.setenv("LLM_TIMEOUT", "0.05")
+    with pytest.raises(asyncio.TimeoutError):
+        agents_complete("hola", "system", "modelo")
+
+    monkeypatch.setitem(sys.modules, "agents", _fake_agents(delay=0))
+    assert agents_complete("hola", "system", "modelo", timeout=1) == "modelo: hola"
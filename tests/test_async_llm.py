@@ -0,0 +1,69 @@
+import asyncio
+import shutil
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.async_llm import AsyncCompleter, RateLimiter, TokenBucket
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.llm_client import AsyncHttpClient, HttpConfig
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(1) == 0
+    bucket.take(60)
+    assert 0.9 < bucket.wait_time(1) <= 1.0
+    assert TokenBucket(0).wait_time(10**6) == 0
+
+
+def test_async_completer_caps_in_flight_and_reuses_connections():
+    async def run(url):
+        client = AsyncHttpClient(HttpConfig(api_url=url), pool_size=2)
+        completer = AsyncCompleter("http", RateLimiter(max_in_flight=2), client)
+        texts = await asyncio.gather(
+            *[completer.complete(f"STUDENT_ID: s{i}", "system", "model") for i in range(8)]
+        )
+        await completer.aclose()
+        return texts, completer.limiter.stats()
+
+    with FakeLLMServer(latency=0.02) as server:
+        texts, stats = asyncio.run(run(server.url))
+    assert all(f'"s{i}"' in text for i, text in enumerate(texts))
+    assert stats["admitted"] == 8
+    assert server.requests == 8
+    assert server.connections <= 2
+
+
+def test_run_batch_async_llm(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria", "soto_pia"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        args = parse_args(
+            [
+                "--submissions-root",
+                str(submissions),
+                "--rubric",
+                "examples/rubric.json",
+                "--output-dir",
+                str(tmp_path / "out"),
+                "--llm-provider",
+                "http",
+                "--model",
+                "fake",
+                "--no-cache",
+                "--no-dedup",
+                "--async-llm",
+                "--max-in-flight",
+                "2",
+            ]
+        )
+        report = run_batch(args)
+
+    assert report["ok"] == 3
+    assert report["pipeline"] == "staged"
+    assert report["async_llm"]["admitted"] == 3
+    assert server.requests == 3
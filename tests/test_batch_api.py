@@ -0,0 +1,74 @@
+import json
+import shutil
+
+import pytest
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_api import OpenAIBatchEndpoint
+from mvp_agent.batch_cli import parse_args
+
+
+def _args(submissions, out_dir, extra=()):
+    return parse_args(
+        [
+            "--submissions-root",
+            str(submissions),
+            "--rubric",
+            "examples/rubric.json",
+            "--output-dir",
+            str(out_dir),
+            "--llm-provider",
+            "http-batch",
+            "--model",
+            "fake",
+            "--batch-poll-sec",
+            "0",
+            "--no-dedup",
+            *extra,
+        ]
+    )
+
+
+@pytest.mark.parametrize("extra", [["--per-criterion"], ["--cascade-model", "mini"]])
+def test_http_batch_rejects_per_request_strategies(tmp_path, capsys, extra):
+    with pytest.raises(SystemExit):
+        _args(tmp_path, tmp_path / "out", extra)
+    assert "http-batch no admite" in capsys.readouterr().err
+
+
+def test_endpoint_base_url_from_chat_url(monkeypatch):
+    monkeypatch.setenv("LLM_API_URL", "https://api.example.com/v1/chat/completions")
+    monkeypatch.delenv("LLM_BATCH_URL", raising=False)
+    endpoint = OpenAIBatchEndpoint.from_env()
+    assert endpoint.base_url == "https://api.example.com/v1"
+    assert endpoint.request_path == "/v1/chat/completions"
+
+
+def test_http_batch_provider_grades_cohort_in_one_job(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria", "soto_pia"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+    (submissions / "vacio_alumno").mkdir()
+    out_dir = tmp_path / "out"
+
+    with FakeLLMServer(batch_polls=2) as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        report = run_batch(_args(submissions, out_dir))
+        assert len(server.jobs) == 1
+        assert server.requests == 3
+
+        # Re-running is served from the evaluation cache: no new job.
+        again = run_batch(_args(submissions, out_dir))
+        assert len(server.jobs) == 1
+
+    assert report["pipeline"] == "provider_batch"
+    assert report["ok"] == 3
+    assert report["skipped"] == 1
+    job = report["provider_batch"]
+    assert job["status"] == "completed"
+    with open(job["input_jsonl"], encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(line["custom_id"] for line in lines) == ["garcia_maria", "perez_juan", "soto_pia"]
+    assert again["provider_batch"] == {"requests": 0, "cache_hits": 3}
@@ -1,8 +1,21 @@
 import csv
+import json
 import shutil
 import subprocess
 import sys
 
+from mvp_agent.batch import (
+    SummaryWriter,
+    _default_row,
+    dispatch_order,
+    estimate_cost,
+    index_submissions,
+    load_execution_history,
+    run_batch,
+)
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.batch_journal import config_fingerprint
+
 
 def test_batch_cli_generates_consolidated_summary(tmp_path):
     submissions = tmp_path / "submissions"
@@ -81,3 +94,196 @@ def test_batch_cli_marks_missing_notebook_as_skipped(tmp_path):
     assert len(rows) == 1
     assert rows[0]["status"] == "skipped"
     assert rows[0]["error"] == "notebook_not_found"
+
+
+def test_run_batch_parallel_workers_keeps_sorted_rows(tmp_path):
+    submissions = tmp_path / "submissions"
+    for name in ["zapata_luis", "alvarez_ana", "mendez_rosa"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+    (submissions / "vacio_alumno").mkdir()
+
+    out_dir = tmp_path / "outputs_batch"
+    args = parse_args(
+        [
+            "--submissions-root",
+            str(submissions),
+            "--rubric",
+            "examples/rubric.json",
+            "--output-dir",
+            str(out_dir),
+            "--workers",
+            "3",
+        ]
+    )
+
+    report = run_batch(args)
+
+    assert report["workers"] == 3
+    assert report["ok"] == 3
+    assert report["skipped"] == 1
+    with open(out_dir / "gradebook_summary.csv", "r", encoding="utf-8") as f:
+        keys = [r["student_key"] for r in csv.DictReader(f)]
+    assert keys == ["alvarez_ana", "mendez_rosa", "vacio_alumno", "zapata_luis"]
+
+
+def test_run_batch_staged_pipeline(tmp_path):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    out_dir = tmp_path / "outputs_batch"
+    args = parse_args(
+        [
+            "--submissions-root",
+            str(submissions),
+            "--rubric",
+            "examples/rubric.json",
+            "--output-dir",
+            str(out_dir),
+            "--staged",
+            "--exec-workers",
+            "2",
+            "--eval-workers",
+            "2",
+            "--queue-size",
+            "1",
+        ]
+    )
+
+    report = run_batch(args)
+
+    assert report["pipeline"] == "staged"
+    assert report["queue_size"] == 1
+    assert report["ok"] == 2
+    with open(out_dir / "gradebook_summary.csv", "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["student_key"] for r in rows] == ["garcia_maria", "perez_juan"]
+    assert all(r["final_score"] for r in rows)
+
+
+def test_run_batch_resume_skips_completed_students(tmp_path):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    out_dir = tmp_path / "outputs_batch"
+    argv = [
+        "--submissions-root",
+        str(submissions),
+        "--rubric",
+        "examples/rubric.json",
+        "--output-dir",
+        str(out_dir),
+        "--resume",
+    ]
+    first = run_batch(parse_args(argv))
+    assert first["resumed"] == 0
+
+    # Changing one notebook invalidates only that student's journal entry.
+    with open(submissions / "perez_juan" / "entrega.ipynb", "a", encoding="utf-8") as f:
+        f.write("\n")
+    second = run_batch(parse_args(argv))
+
+    assert second["resumed"] == 1
+    assert second["ok"] == 2
+    with open(out_dir / "batch_journal.jsonl", "r", encoding="utf-8") as f:
+        keys = [json.loads(line)["student_key"] for line in f]
+    assert sorted(keys) == ["garcia_maria", "perez_juan", "perez_juan"]
+
+
+def test_summary_writer_streams_rows_then_rewrites_in_order(tmp_path):
+    path = tmp_path / "gradebook_summary.csv"
+    writer = SummaryWriter(str(path))
+    late, early = _default_row("zapata_luis"), _default_row("alvarez_ana")
+
+    writer.write(late)
+    with open(path, "r", encoding="utf-8") as f:
+        assert [r["student_key"] for r in csv.DictReader(f)] == ["zapata_luis"]
+
+    writer.write(early)
+    writer.finalize([early, late])
+    with open(path, "r", encoding="utf-8") as f:
+        assert [r["student_key"] for r in csv.DictReader(f)] == ["alvarez_ana", "zapata_luis"]
+
+
+def test_index_submissions_prunes_heavy_dirs_and_respects_depth(tmp_path):
+    root = tmp_path / "submissions"
+    student = root / "perez_juan"
+    for rel in [
+        "tarea/entrega.ipynb",
+        ".git/objects/old.ipynb",
+        "node_modules/pkg/site.ipynb",
+        "myenv/lib/nested.ipynb",
+        "data/limpieza.ipynb",
+        "a/b/c/deep.ipynb",
+        "notas.txt",
+    ]:
+        path = student / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("{}", encoding="utf-8")
+    (student / "myenv" / "pyvenv.cfg").write_text("", encoding="utf-8")
+    (root / "README").write_text("", encoding="utf-8")
+    (root / "singuion").mkdir()
+
+    stats = {}
+    index = index_submissions(str(root), max_depth=2, stats=stats)
+
+    assert list(index) == [str(student)]
+    assert index[str(student)] == [
+        str(student / "data" / "limpieza.ipynb"),
+        str(student / "tarea" / "entrega.ipynb"),
+    ]
+    assert stats == {"pruned_dirs": 2}
+
+    top_level = index_submissions(str(root), notebook_glob="*.ipynb")
+    assert top_level[str(student)] == []
+
+
+def test_longest_job_first_uses_size_and_history(tmp_path):
+    small = tmp_path / "small.ipynb"
+    small.write_text('{"cells": [{"cell_type": "code"}]}', encoding="utf-8")
+    big = tmp_path / "big.ipynb"
+    big.write_text(
+        '{"cells": [' + ", ".join(['{"cell_type": "code"}'] * 40) + "]}", encoding="utf-8"
+    )
+
+    out_dir = tmp_path / "outputs"
+    run = out_dir / "lopez_ana_20260101T000000Z"
+    run.mkdir(parents=True)
+    (run / "execution_report.json").write_text('{"duration_sec": 300}', encoding="utf-8")
+    history = load_execution_history(str(out_dir))
+    assert history == {"lopez_ana": 300.0}
+
+    estimates = [
+        estimate_cost(str(small), None, execute=True),
+        estimate_cost(str(big), None, execute=True),
+        estimate_cost(str(small), history["lopez_ana"], execute=True),
+    ]
+    assert dispatch_order(estimates) == [2, 1, 0]
+    assert dispatch_order(estimates, "fifo") == [0, 1, 2]
+
+
+def test_config_fingerprint_follows_prompt_layout():
+    argv = ["--submissions-root", ".", "--rubric", "examples/rubric.json"]
+    inline = config_fingerprint(parse_args(argv))
+    assert config_fingerprint(parse_args([*argv, "--prompt-layout", "prefix"])) != inline
+    assert config_fingerprint(parse_args([*argv, "--prompt-cache-hint", "cache_control"])) != inline
+    assert config_fingerprint(parse_args([*argv, "--cascade-margin", "2"])) != inline
+
+
+def test_fifo_schedule_skips_cost_estimates(tmp_path):
+    submissions = tmp_path / "submissions"
+    (submissions / "perez_juan").mkdir(parents=True)
+    shutil.copy("examples/sample.ipynb", submissions / "perez_juan" / "entrega.ipynb")
+    argv = ["--submissions-root", str(submissions), "--rubric", "examples/rubric.json"]
+    argv += ["--output-dir", str(tmp_path / "out")]
+
+    run_batch(parse_args([*argv, "--schedule", "fifo"]))
+    with open(tmp_path / "out" / "gradebook_summary.csv", encoding="utf-8") as f:
+        assert next(csv.DictReader(f))["estimated_sec"] == ""
+    run_batch(parse_args(argv))
+    with open(tmp_path / "out" / "gradebook_summary.csv", encoding="utf-8") as f:
+        assert float(next(csv.DictReader(f))["estimated_sec"]) > 1.0
@@ -0,0 +1,33 @@
+from benchmarks.cohort import build_notebook
+from benchmarks.run_benchmark import parse_args, percentile, run
+
+
+def test_build_notebook_respects_cell_and_image_counts():
+    nb = build_notebook(cells=8, images=2, image_kb=1)
+    assert len(nb["cells"]) == 8
+    images = [
+        out
+        for cell in nb["cells"]
+        for out in cell.get("outputs", [])
+        if "image/png" in out.get("data", {})
+    ]
+    assert len(images) == 2
+
+
+def test_percentile_nearest_rank():
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 95) == 4
+    assert percentile([], 50) is None
+    twenty = list(range(1, 21))
+    assert [percentile(twenty, p) for p in (50, 90, 95, 99, 100)] == [10, 18, 19, 20, 20]
+    hundred = list(range(100, 0, -1))
+    assert [percentile(hundred, p) for p in (1, 7, 50, 95, 99)] == [1, 7, 50, 95, 99]
+    assert percentile(hundred, 0) == 1
+
+
+def test_batch_benchmark_against_fake_server():
+    result = run(parse_args(["--students", "3", "--latency", "0", "--workers", "2"]))
+    assert result["ok"] == 3
+    assert result["llm_requests"] == 3
+    assert result["stages"]["evaluate_sec"]["p50"] is not None
+    assert result["students_per_min"] > 0
@@ -0,0 +1,108 @@
+import asyncio
+import shutil
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.cascade import CascadePolicy
+from mvp_agent.utils import read_json
+
+
+def _validation(score, confidence=0.9, issues=()):
+    return {
+        "issues": list(issues),
+        "evaluation": {"final_score": score, "criteria": [{"confidence": confidence}]},
+    }
+
+
+def test_cascade_reasons():
+    policy = CascadePolicy("mini", min_confidence=0.6, pass_score=10.5, margin=1.0)
+    assert policy.reasons(_validation(16)) == []
+    assert policy.reasons(_validation(16, confidence=0.4)) == ["low_confidence"]
+    assert policy.reasons(_validation(11)) == ["borderline_score"]
+    assert policy.reasons(_validation(3, issues=["Summary incomplete."])) == ["validator_issues"]
+    weights = "LLM weights differ from rubric weights. Overriding with rubric."
+    assert policy.reasons(_validation(16, issues=[weights])) == []
+
+
+def test_cascade_record_estimates_cost():
+    policy = CascadePolicy("mini", price_ratio=0.1)
+    usage = {}
+    policy.record(usage, {"prompt_tokens": 900, "completion_tokens": 100})
+    assert usage["cascade"]["cost"] == 100 and usage["cascade"]["baseline"] == 1000
+
+    escalated = {}
+    first = {"prompt_tokens": 900, "completion_tokens": 100}
+    final = {"prompt_tokens": 900, "completion_tokens": 300}
+    policy.record(escalated, first, final, ["low_confidence"])
+    assert escalated["prompt_tokens"] == 1800
+    assert escalated["cascade"]["cost"] == 1300 and escalated["cascade"]["baseline"] == 1200
+
+
+def test_cascade_escalates_when_cheap_pass_fails():
+    policy = CascadePolicy("mini")
+    calls = []
+
+    def run(model, run_usage):
+        calls.append(model)
+        if model == "mini":
+            raise ValueError("invalid JSON")
+        run_usage["prompt_tokens"] = 100
+        return _validation(16)
+
+    usage = {}
+    assert policy.evaluate(run, usage) == _validation(16)
+    assert calls == ["mini", None]
+    assert usage["cascade"]["escalated"] is True
+    assert usage["cascade"]["reasons"] == ["cheap_pass_failed"]
+    assert usage["cascade"]["first_pass_error"] == "invalid JSON"
+
+    async def arun(model, run_usage):
+        return run(model, run_usage)
+
+    usage = {}
+    assert asyncio.run(policy.aevaluate(arun, usage)) == _validation(16)
+    assert usage["cascade"]["reasons"] == ["cheap_pass_failed"]
+
+
+def _batch_args(tmp_path, submissions, provider, extra=()):
+    return parse_args(
+        [
+            "--submissions-root",
+            str(submissions),
+            "--rubric",
+            "examples/rubric.json",
+            "--output-dir",
+            str(tmp_path / provider),
+            "--llm-provider",
+            provider,
+            "--model",
+            "grande",
+            "--cascade-model",
+            "mini",
+            "--no-dedup",
+            *extra,
+        ]
+    )
+
+
+def test_run_batch_cascade_reports_escalation(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria", "soto_pia"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    # Mock evaluations have confidence 0.3, so every student escalates.
+    report = run_batch(_batch_args(tmp_path, submissions, "mock"))
+    assert report["cascade"]["escalation_rate"] == 1.0
+    assert report["cascade"]["reasons"]["low_confidence"] == 3
+
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        report = run_batch(_batch_args(tmp_path, submissions, "http"))
+    cascade = report["cascade"]
+    assert cascade["students"] == 3 and cascade["escalated"] == 0
+    assert cascade["estimated_savings"] == 0.9
+    assert server.requests == 3
+    run_folder = next((tmp_path / "http").glob("perez_juan_*"))
+    assert read_json(str(run_folder / "llm_usage.json"))["cascade"]["cheap_model"] == "mini"
@@ -0,0 +1,60 @@
+import json
+
+from mvp_agent.context_budget import count_tokens, pack_cells
+from mvp_agent.evaluator import GradingSession
+from mvp_agent.extractor import build_notebook_text
+from mvp_agent.utils import read_json
+
+
+def _cells():
+    table = "\n".join(f"{i:>6} | {i * 3.5:>10} | fila {i}" for i in range(10_000))
+    long_code = "\n".join(f"x_{i} = transformar(datos, paso={i})" for i in range(400))
+    return [
+        {"ref": "C001", "type": "markdown", "source": "# Análisis", "outputs": ""},
+        {"ref": "C002", "type": "code", "source": "df = cargar()\ndf", "outputs": table},
+        {"ref": "C003", "type": "code", "source": long_code, "outputs": "listo"},
+        {"ref": "C004", "type": "code", "source": "print(df.mean())", "outputs": "3.2"},
+    ]
+
+
+def test_pack_cells_trims_outputs_before_code():
+    cells, report = pack_cells(_cells(), budget=6000)
+    assert [c["ref"] for c in cells] == ["C001", "C002", "C003", "C004"]
+    assert report["tokens_before"] > 6000 >= report["tokens_after"]
+    assert not report["over_budget"]
+    assert [(d["ref"], d["section"]) for d in report["dropped"]] == [("C002", "outputs")]
+    assert "tokens de salida omitidos" in cells[1]["outputs"]
+    assert cells[1]["outputs"].startswith("     0 |")
+    assert cells[2]["source"] == _cells()[2]["source"]
+
+
+def test_pack_cells_trims_long_code_last():
+    cells, report = pack_cells(_cells(), budget=800)
+    sections = {(d["ref"], d["section"]) for d in report["dropped"]}
+    assert ("C002", "outputs") in sections and ("C003", "source") in sections
+    assert "tokens de código omitidos" in cells[2]["source"]
+    assert cells[3]["source"] == "print(df.mean())"
+    assert "[CELL C004][CODE]" in build_notebook_text(cells)
+
+
+def test_session_budget_covers_whole_prompt(tmp_path):
+    nb = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "source": "df",
+                "outputs": [{"output_type": "stream", "text": "fila\n" * 20_000}],
+            }
+        ]
+    }
+    path = tmp_path / "grande.ipynb"
+    path.write_text(json.dumps(nb), encoding="utf-8")
+    session = GradingSession(rubric=read_json("examples/rubric.json"), token_budget=3000)
+
+    context = session.build_context("perez_juan", str(path))
+    budget = context["notebook"]["budget"]
+    assert budget["sections"]["fixed"] == session.fixed_tokens
+    assert budget["dropped"][0]["ref"] == "C001"
+    prompt = "".join(session.render(context))
+    assert count_tokens(session.system) + count_tokens(prompt) <= 3000 + 20
+    assert "budget" not in GradingSession(rubric={}).build_context("a_b", str(path))["notebook"]
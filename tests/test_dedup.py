@@ -0,0 +1,151 @@
+import asyncio
+import json
+import shutil
+import threading
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.dedup import (
+    SingleFlight,
+    context_fingerprint,
+    current_single_flight,
+    single_flight_scope,
+)
+
+
+def _context(student_id, text, success=True):
+    return {
+        "student_id": student_id,
+        "notebook": {"text": text},
+        "execution_report": {"success": success, "duration_sec": 1.0, "notebook": student_id},
+    }
+
+
+def test_fingerprint_ignores_student_and_trailing_whitespace():
+    assert context_fingerprint(_context("a", "x = 1\nprint(x)")) == context_fingerprint(
+        _context("b", "x = 1   \nprint(x)\n\n")
+    )
+    assert context_fingerprint(_context("a", "x = 1")) != context_fingerprint(
+        _context("a", "x = 2")
+    )
+    assert context_fingerprint(_context("a", "x = 1")) != context_fingerprint(
+        _context("a", "x = 1", success=False)
+    )
+
+
+def test_single_flight_shares_one_call_and_retries_after_failure():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def leader():
+        calls.append("leader")
+        release.wait(5)
+        return "graded"
+
+    results = {}
+    lead = threading.Thread(target=lambda: results.update(a=flight.do("k", "a", leader)))
+    lead.start()
+    follow = threading.Thread(target=lambda: results.update(b=flight.do("k", "b", leader)))
+    follow.start()
+    release.set()
+    lead.join()
+    follow.join()
+    assert calls == ["leader"]
+    assert results == {"a": ("graded", None), "b": ("graded", "a")}
+
+    def failing():
+        raise RuntimeError("boom")
+
+    try:
+        flight.do("k2", "a", failing)
+    except RuntimeError:
+        pass
+    assert flight.do("k2", "b", lambda: "second") == ("second", None)
+
+
+def test_single_flight_async_shares_and_retries_after_failure():
+    flight = SingleFlight()
+    calls = []
+
+    async def leader():
+        calls.append("leader")
+        await asyncio.sleep(0.01)
+        return "graded"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        shared = await asyncio.gather(flight.ado("k", "a", leader), flight.ado("k", "b", leader))
+        retried = await asyncio.gather(
+            flight.ado("k2", "a", failing),
+            flight.ado("k2", "b", lambda: asyncio.sleep(0, "second")),
+            return_exceptions=True,
+        )
+        return shared, retried
+
+    shared, retried = asyncio.run(main())
+    assert calls == ["leader"]
+    assert shared == [("graded", None), ("graded", "a")]
+    assert isinstance(retried[0], RuntimeError) and retried[1] == ("second", None)
+
+
+def test_single_flight_scope_is_context_local():
+    with single_flight_scope() as flight:
+        assert current_single_flight() is flight
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(current_single_flight()))
+        thread.start()
+        thread.join()
+        assert seen == [None]
+    assert current_single_flight() is None
+
+
+def _batch_args(tmp_path, submissions, extra=()):
+    return parse_args(
+        [
+            "--submissions-root",
+            str(submissions),
+            "--rubric",
+            "examples/rubric.json",
+            "--output-dir",
+            str(tmp_path / "out"),
+            "--llm-provider",
+            "http",
+            "--model",
+            "fake",
+            "--no-cache",
+            "--workers",
+            "3",
+            *extra,
+        ]
+    )
+
+
+def test_run_batch_grades_identical_submissions_once(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["garcia_maria", "perez_juan", "soto_pia"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        report = run_batch(_batch_args(tmp_path, submissions))
+        assert server.requests == 1
+        assert report["ok"] == 3
+        [group] = report["duplicate_groups"]
+        assert sorted(group) == ["garcia_maria", "perez_juan", "soto_pia"]
+
+        follower = next((tmp_path / "out").glob(f"{group[1]}_*/evaluation.json")).read_text(
+            encoding="utf-8"
+        )
+        evaluation = json.loads(follower)
+        assert evaluation["student_id"] == group[1]
+        assert evaluation["flags"][-1]["type"] == "duplicate_submission"
+
+        report = run_batch(_batch_args(tmp_path, submissions, ["--no-dedup"]))
+        assert server.requests == 4
+        assert "duplicate_groups" not in report
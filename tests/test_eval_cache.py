@@ -0,0 +1,54 @@
+import os
+
+from mvp_agent import evaluator, llm_client
+from mvp_agent.eval_cache import EvaluationCache
+from mvp_agent.extractor import build_context_pack
+from mvp_agent.utils import read_json
+
+
+def _context():
+    return build_context_pack(
+        student_id="perez_juan",
+        rubric=read_json("examples/rubric.json"),
+        assignment_text="Enunciado",
+        materials_text="",
+        notebook_path="examples/sample.ipynb",
+    )
+
+
+def test_session_evaluate_reuses_cached_evaluation(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_complete(**kwargs):
+        calls.append(kwargs)
+        return '{"criteria": [], "final_score": 15}'
+
+    monkeypatch.setattr(llm_client, "http_complete", fake_complete)
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    context = _context()
+
+    def session(model):
+        return evaluator.GradingSession(
+            rubric=context["rubric"], assignment="Enunciado", provider="http", model=model
+        )
+
+    first = session("m1").evaluate(context, cache=cache)
+    second = session("m1").evaluate(context, cache=cache)
+    assert first == second
+    assert len(calls) == 1
+    assert cache.hits == 1
+
+    session("m2").evaluate(context, cache=cache)
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "cache"), max_bytes=250)
+    payload = {"rationale": "x" * 80}
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.put("d", payload)
+
+    assert cache.get("a") is None
+    assert cache.get("d") == payload
@@ -1,4 +1,8 @@
+import base64
+import json
+
 from mvp_agent.extractor import build_notebook_text, extract_notebook_cells, load_notebook
+from mvp_agent.notebook_stream import CHUNK_SIZE, stream_notebook
 
 
 def test_extract_notebook_cells():
@@ -16,3 +20,37 @@ def test_build_notebook_text():
     text = build_notebook_text(cells)
     assert "[CELL C001]" in text
     assert "[OUTPUT C002]" in text
+
+
+def _plot_notebook(path):
+    image = base64.b64encode(bytes(range(256)) * 40).decode("ascii")
+    nb = load_notebook("examples/sample.ipynb")
+    nb["cells"][1]["source"] = ['s = \'"image/png": "x"\'\n', "ruta = 'C:\\\\'\n"]
+    nb["cells"][1]["outputs"] += [
+        {
+            "output_type": "display_data",
+            "data": {"image/png": image, "text/plain": ["<Figure>", " ok\\"]},
+            "metadata": {},
+        },
+        {
+            "output_type": "execute_result",
+            "data": {"text/html": ['<b>"x"</b>\\'], "text/plain": "tabla"},
+            "metadata": {},
+            "execution_count": 3,
+        },
+    ]
+    path.write_text(json.dumps(nb, indent=1), encoding="utf-8")
+    return len(json.dumps(image))
+
+
+def test_stream_notebook_skips_binary_outputs(tmp_path):
+    path = tmp_path / "plots.ipynb"
+    image_bytes = _plot_notebook(path)
+    expected = extract_notebook_cells(load_notebook(str(path)))
+    for chunk_size in (1, 7, 64, CHUNK_SIZE):
+        nb, skipped = stream_notebook(str(path), chunk_size)
+        assert extract_notebook_cells(nb) == expected
+    assert skipped["by_mime"]["image/png"] == {"count": 1, "bytes": image_bytes}
+    assert skipped["by_mime"]["text/html"]["count"] == 1
+    assert skipped["count"] == 2
+    assert "<Figure> ok" in expected[1]["outputs"] and "tabla" in expected[1]["outputs"]
@@ -0,0 +1,120 @@
+import time
+from argparse import Namespace
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent import evaluator
+from mvp_agent.evaluator import GradingSession, render_prompt, with_session
+from mvp_agent.utils import read_json
+
+
+def _args(**overrides):
+    values = dict(
+        rubric="examples/rubric.json",
+        assignment="examples/assignment.txt",
+        materials="",
+        prompt="mvp_agent/prompts/evaluator_prompt.txt",
+        llm_provider="mock",
+        model="",
+        temperature=0.2,
+        max_tokens=1200,
+    )
+    values.update(overrides)
+    return Namespace(**values)
+
+
+def test_session_prompt_matches_str_format(tmp_path):
+    template = tmp_path / "prompt.txt"
+    template.write_text(
+        'ID {student_id} {{"literal": true}}\n{rubric_json}\n{assignment}\n'
+        "{notebook_text}\n{execution_report}\n{materials!r:>6}",
+        encoding="utf-8",
+    )
+    for prompt_path in [evaluator.DEFAULT_PROMPT, str(template)]:
+        session = GradingSession.from_args(_args(prompt=prompt_path))
+        context = session.build_context("perez_juan", "examples/sample.ipynb")
+        context["execution_report"] = {"ok": True, "text": "{x}"}
+        assert session.render(context) == ("", render_prompt(context, prompt_path))
+
+    assert session.render(context)[1].startswith('ID perez_juan {"literal": true}')
+
+
+def test_session_loads_shared_inputs_once(monkeypatch):
+    reads = []
+    original = evaluator.read_text
+    monkeypatch.setattr(evaluator, "read_text", lambda path: reads.append(path) or original(path))
+
+    args = with_session(_args())
+    assert with_session(args) is args
+    reads_after_setup = len(reads)
+    for student_id in ["perez_juan", "soto_pia", "diaz_ana"]:
+        context = args.session.build_context(student_id, "examples/sample.ipynb")
+        args.session.render(context)
+        evaluation = args.session.evaluate(context)
+    assert len(reads) == reads_after_setup
+
+    rubric = read_json("examples/rubric.json")
+    assert args.session.weights == evaluator._normalize_weights(rubric["criteria"])
+    assert [c["weight"] for c in evaluation["criteria"]] == args.session.weights
+
+
+def test_merge_criterion_evaluations_keeps_rubric_order():
+    rubric = {"criteria": [{"name": "A"}, {"name": "B"}]}
+    parts = [
+        {
+            "criteria": [{"name": "A", "score": 16}],
+            "summary": {"good": "Bien A.", "missing": "", "priority": "Pulir A."},
+            "top_improvements": ["x"],
+            "guiding_questions": ["¿a?"],
+            "flags": [{"type": "needs_review", "detail": "d"}],
+        },
+        {
+            "criteria": [{"score": 9}],
+            "summary": {"good": "Bien B.", "missing": "Falta B.", "priority": "Rehacer B."},
+            "top_improvements": ["x", "y"],
+            "guiding_questions": ["¿b?"],
+            "flags": [{"type": "needs_review", "detail": "d"}],
+        },
+    ]
+    merged = evaluator.merge_criterion_evaluations(parts, rubric, "perez_juan")
+    assert [c["name"] for c in merged["criteria"]] == ["A", "B"]
+    assert merged["summary"] == {
+        "good": "Bien A. Bien B.",
+        "missing": "Falta B.",
+        "priority": "Rehacer B.",
+    }
+    assert merged["top_improvements"] == ["x", "y"]
+    assert merged["guiding_questions"] == ["¿a?", "¿b?"]
+    assert len(merged["flags"]) == 1
+
+
+def test_merge_criterion_evaluations_keeps_slot_for_missing_criterion():
+    rubric = {"criteria": [{"name": "A"}, {"name": "B"}, {"name": "C"}]}
+    parts = [
+        {"criteria": [{"name": "eco", "score": 16}]},
+        {"criteria": []},
+        {"criteria": [{"score": 9}]},
+    ]
+    merged = evaluator.merge_criterion_evaluations(parts, rubric, "perez_juan")
+    assert [c["name"] for c in merged["criteria"]] == ["A", "B", "C"]
+    assert [c["score"] for c in merged["criteria"]] == [16, None, 9]
+    assert merged["criteria"][1]["confidence"] == 0.0
+    assert merged["flags"] == [{"type": "needs_review", "detail": "Criterio sin evaluar: B."}]
+
+
+def test_per_criterion_requests_run_concurrently(monkeypatch):
+    rubric = read_json("examples/rubric.json")
+    names = [c["name"] for c in rubric["criteria"]]
+    with FakeLLMServer(latency=0.3) as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        session = GradingSession.from_args(
+            _args(llm_provider="http", model="fake", per_criterion=True)
+        )
+        context = session.build_context("perez_juan", "examples/sample.ipynb")
+        usage = {}
+        started = time.monotonic()
+        evaluation = session.evaluate(context, usage=usage)
+        elapsed = time.monotonic() - started
+    assert server.requests == len(names)
+    assert elapsed < 0.3 * len(names) - 0.1
+    assert [c["name"] for c in evaluation["criteria"]] == names
+    assert usage["requests"] == len(names) and usage["prompt_tokens"] > 0
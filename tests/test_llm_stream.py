@@ -0,0 +1,106 @@
+import asyncio
+import json
+import shutil
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.llm_client import (
+    AsyncHttpClient,
+    HttpClient,
+    HttpConfig,
+    JsonObjectScanner,
+    StreamingCompletion,
+)
+from mvp_agent.utils import extract_json_block
+
+TRAILING = "\n\nEspero que esta evaluación {te} sirva."
+
+
+def test_scanner_ignores_braces_in_strings_and_leading_prose():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('Aquí va: {"a": "}{", "b": {"c": "\\"}"') is None
+    assert scanner.feed("}") is None
+    assert scanner.feed("} y algo más }") == 1
+
+
+def test_streaming_completion_stops_when_object_closes():
+    events = [{"choices": [{"delta": {"content": part}}]} for part in ['{"x": ', "1}", " fin"]]
+    body = "".join(f"data: {json.dumps(e)}\n\n" for e in events).encode("utf-8")
+    stream = StreamingCompletion(started=0.0, prompt_text="evalúa " * 40)
+    fed = [stream.feed(body[i : i + 7]) for i in range(0, len(body), 7)]
+    assert fed[-1] and stream.stopped_early
+    completion = stream.completion()
+    assert completion == '{"x": 1}'
+    assert completion.usage["ttft_sec"] > 0 and "time_to_json_sec" in completion.usage
+    # The usage event never arrived: tokens are estimated and marked as such.
+    assert completion.usage["usage_estimated"] is True
+    assert completion.usage["prompt_tokens"] > completion.usage["completion_tokens"] > 0
+
+
+def test_streaming_completion_keeps_usage_until_done():
+    events = [
+        {"choices": [{"delta": {"content": "sin json"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 3}},
+    ]
+    body = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+    stream = StreamingCompletion(started=0.0)
+    assert stream.feed(body.encode("utf-8")) and not stream.stopped_early
+    assert stream.completion().usage["prompt_tokens"] == 10
+
+
+def test_http_client_stream_stops_after_json():
+    with FakeLLMServer(trailing_text=TRAILING, chunk_chars=16) as server:
+        client = HttpClient(HttpConfig(api_url=server.url))
+        full = client.complete("STUDENT_ID: s1", "system", "model")
+        streamed = client.complete("STUDENT_ID: s1", "system", "model", stream=True)
+        client.close()
+    assert full.endswith(TRAILING)
+    assert TRAILING.strip() not in streamed
+    assert json.loads(streamed) == extract_json_block(full)
+
+
+def test_async_client_stream():
+    async def run(url):
+        client = AsyncHttpClient(HttpConfig(api_url=url))
+        texts = [
+            await client.complete(f"STUDENT_ID: s{i}", "system", "model", stream=True)
+            for i in range(3)
+        ]
+        await client.aclose()
+        return texts
+
+    with FakeLLMServer(trailing_text=TRAILING, chunk_chars=16) as server:
+        texts = asyncio.run(run(server.url))
+    assert [json.loads(t)["student_id"] for t in texts] == ["s0", "s1", "s2"]
+    assert all(t.usage["time_to_json_sec"] > 0 for t in texts)
+
+
+def test_run_batch_llm_stream_reports_timings(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    with FakeLLMServer(trailing_text=TRAILING) as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        args = parse_args(
+            [
+                "--submissions-root",
+                str(submissions),
+                "--rubric",
+                "examples/rubric.json",
+                "--output-dir",
+                str(tmp_path / "out"),
+                "--llm-provider",
+                "http",
+                "--model",
+                "fake",
+                "--llm-stream",
+                "--async-llm",
+            ]
+        )
+        report = run_batch(args)
+    assert report["ok"] == 2
+    assert report["avg_ttft_sec"] > 0
+    assert report["avg_time_to_json_sec"] >= report["avg_ttft_sec"]
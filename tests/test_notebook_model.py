@@ -0,0 +1,33 @@
+import json
+import pickle
+
+from mvp_agent.extractor import build_context_pack, build_notebook_text
+from mvp_agent.notebook_model import NotebookCells, json_default
+from mvp_agent.utils import read_json
+
+CELLS = [
+    {"ref": "C001", "type": "markdown", "source": "# Título", "outputs": ""},
+    {"ref": "C002", "type": "code", "source": "df.mean()", "outputs": "edad    31.5"},
+    {"ref": "C004", "type": "code", "source": "", "outputs": "solo output"},
+    {"ref": "C005", "type": "code", "source": "x = 1", "outputs": ""},
+]
+
+
+def test_cells_are_views_into_the_notebook_text():
+    cells = NotebookCells(CELLS)
+    assert cells.text == build_notebook_text(CELLS)
+    assert list(cells) == CELLS
+    assert cells[-1]["source"] == "x = 1" and cells[1].get("outputs") == "edad    31.5"
+    assert cells.by_ref("C004")["outputs"] == "solo output"
+    assert cells.by_ref("C003") is None and cells.by_ref("") is None
+    assert pickle.loads(pickle.dumps(cells)).to_json() == CELLS
+
+
+def test_context_pack_serializes_like_plain_cells():
+    context = build_context_pack(
+        "perez_juan", read_json("examples/rubric.json"), "", "", "examples/sample.ipynb"
+    )
+    notebook = json.loads(json.dumps(context, default=json_default))["notebook"]
+    assert [cell["ref"] for cell in notebook["cells"]] == ["C001", "C002", "C003"]
+    assert notebook["cells"][1]["outputs"] == context["notebook"]["cells"][1]["outputs"]
+    assert notebook["text"] == context["notebook"]["text"]
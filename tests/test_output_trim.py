@@ -0,0 +1,87 @@
+from mvp_agent.extractor import build_notebook_text, extract_notebook_cells
+from mvp_agent.output_trim import OutputLimits, condense_tracebacks, error_output_text
+
+
+def _stream(text):
+    return {"output_type": "stream", "name": "stdout", "text": text}
+
+
+def _notebook(*outputs):
+    return {"cells": [{"cell_type": "code", "source": "x", "outputs": list(o)} for o in outputs]}
+
+
+def test_epoch_log_collapses_to_first_and_last_line():
+    log = "".join(f"Epoch {i}/5000 - loss: {1 / (i + 1):.4f}\n" for i in range(5000))
+    [cell] = extract_notebook_cells(_notebook([_stream(log)]), OutputLimits())
+    assert cell["outputs"].splitlines() == [
+        "Epoch 0/5000 - loss: 1.0000",
+        "[... 4998 líneas similares omitidas ...]",
+        "Epoch 4999/5000 - loss: 0.0002",
+    ]
+
+
+def test_outputs_within_limits_are_kept_verbatim():
+    head = "   edad  nota\n" + "".join(f"{i}  {20 + i}  {5.5 + i}\n" for i in range(5))
+    for limits in (OutputLimits(), OutputLimits(0, 0, 0)):
+        [cell] = extract_notebook_cells(_notebook([_stream(head)]), limits)
+        assert cell["outputs"] == head.strip()
+    [cell] = extract_notebook_cells(_notebook([_stream("x\n" * 5000)]))
+    assert cell["outputs"] == ("x\n" * 5000).strip()
+
+
+def test_long_output_keeps_head_and_tail():
+    table = "".join(f"{i} {'x' * (i % 5)}\n" for i in range(1000))
+    [cell] = extract_notebook_cells(_notebook([_stream(table)]), OutputLimits(max_lines=10))
+    lines = cell["outputs"].splitlines()
+    assert lines[:5] == ["0 ", "1 x", "2 xx", "3 xxx", "4 xxxx"]
+    assert lines[5] == "[... 990 líneas omitidas ...]"
+    assert lines[-1] == "999 xxxx"
+
+
+def test_tracebacks_keep_student_frames_and_exception():
+    text = (
+        "Traceback (most recent call last):\n"
+        '  File "/home/alumno/tarea.py", line 3, in <module>\n'
+        "    df['edad']\n"
+        '  File "/usr/lib/python3.11/site-packages/pandas/core/frame.py", line 10, in get\n'
+        "    return self._get(key)\n"
+        '  File "/usr/lib/python3.11/site-packages/pandas/core/base.py", line 20, in _get\n'
+        "    raise KeyError(key)\n"
+        "KeyError: 'edad'"
+    )
+    assert condense_tracebacks(text.splitlines()) == [
+        "Traceback (most recent call last):",
+        '  File "/home/alumno/tarea.py", line 3, in <module>',
+        "    df['edad']",
+        "  [... 2 frames de librerías omitidos ...]",
+        "KeyError: 'edad'",
+    ]
+
+    error = {
+        "output_type": "error",
+        "ename": "KeyError",
+        "evalue": "'edad'",
+        "traceback": [
+            "\x1b[0;31m-------------------\x1b[0m",
+            "\x1b[0;31mKeyError\x1b[0m    Traceback (most recent call last)",
+            "Cell In[3], line 1\n----> 1 df['edad']",
+            "File \x1b[0;32m/opt/venv/site-packages/pandas/frame.py:10\x1b[0m, in get\n   9 x",
+            "\x1b[0;31mKeyError\x1b[0m: 'edad'",
+        ],
+    }
+    text = error_output_text(error)
+    assert "\x1b" not in text and "frame.py" in text
+    condensed = "\n".join(condense_tracebacks(text.splitlines()))
+    assert "Cell In[3], line 1\n----> 1 df['edad']" in condensed and "frame.py" not in condensed
+    assert condensed.endswith("[... 1 frames de librerías omitidos ...]\nKeyError: 'edad'")
+
+
+def test_notebook_limit_cuts_largest_outputs_first():
+    small = _stream("resultado: 42\n")
+    large = _stream("".join(f"{i} {'y' * (i % 7)}\n" for i in range(3000)))
+    limits = OutputLimits(max_lines=0, max_chars=0, max_notebook_chars=2000)
+    cells = extract_notebook_cells(_notebook([small], [large], [large]), limits)
+    assert cells[0]["outputs"] == "resultado: 42"
+    assert all("caracteres omitidos" in cell["outputs"] for cell in cells[1:])
+    assert sum(len(cell["outputs"]) for cell in cells) < 2200
+    assert "[OUTPUT C002]" in build_notebook_text(cells)
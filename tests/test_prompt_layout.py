@@ -0,0 +1,103 @@
+import shutil
+
+import pytest
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.evaluator import DEFAULT_PROMPT, render_prompt_parts
+from mvp_agent.extractor import build_context_pack
+from mvp_agent.llm_client import HttpConfig, build_payload, normalize_usage
+from mvp_agent.utils import read_json
+
+
+def _context(student_id):
+    return build_context_pack(
+        student_id=student_id,
+        rubric=read_json("examples/rubric.json"),
+        assignment_text="Enunciado común",
+        materials_text="Material común",
+        notebook_path="examples/sample.ipynb",
+    )
+
+
+def test_prefix_layout_keeps_student_fields_out_of_prefix():
+    prefix_a, rest_a = render_prompt_parts(_context("ana_p"), DEFAULT_PROMPT, "prefix")
+    prefix_b, rest_b = render_prompt_parts(_context("luis_q"), DEFAULT_PROMPT, "prefix")
+    assert prefix_a == prefix_b
+    assert "ana_p" not in prefix_a and "Enunciado común" in prefix_a
+    assert rest_a.startswith("STUDENT_ID: ana_p")
+    assert _context("ana_p")["notebook"]["text"] in rest_a
+
+    prefix, rest = render_prompt_parts(_context("ana_p"), DEFAULT_PROMPT)
+    assert prefix == "" and "STUDENT_ID: ana_p" in rest
+
+
+def test_prefix_layout_requires_marker(tmp_path):
+    template = tmp_path / "prompt.txt"
+    template.write_text("{rubric_json}\n{notebook_text}", encoding="utf-8")
+    with pytest.raises(ValueError):
+        render_prompt_parts(_context("ana_p"), str(template), "prefix")
+
+
+def test_cache_hints_in_payload():
+    config = HttpConfig(api_url="http://x/v1/chat/completions")
+    payload, _ = build_payload(
+        config, "STATIC|alumno", "sys", "m", cache_prefix="STATIC|", cache_hint="cache_control"
+    )
+    parts = payload["messages"][1]["content"]
+    assert parts[0] == {"type": "text", "text": "STATIC|", "cache_control": {"type": "ephemeral"}}
+    assert parts[1]["text"] == "alumno"
+
+    keyed, _ = build_payload(
+        config, "STATIC|otro", "sys", "m", cache_prefix="STATIC|", cache_hint="prompt_cache_key"
+    )
+    again, _ = build_payload(
+        config, "STATIC|más", "sys", "m", cache_prefix="STATIC|", cache_hint="prompt_cache_key"
+    )
+    assert keyed["prompt_cache_key"] == again["prompt_cache_key"]
+    assert keyed["messages"][1]["content"] == "STATIC|otro"
+
+
+def test_normalize_usage_openai_and_anthropic():
+    openai = {"prompt_tokens": 900, "prompt_tokens_details": {"cached_tokens": 768}}
+    assert normalize_usage(openai)["cached_tokens"] == 768
+    anthropic = {"input_tokens": 50, "cache_read_input_tokens": 800, "output_tokens": 10}
+    usage = normalize_usage(anthropic)
+    assert usage["prompt_tokens"] == 850
+    assert usage["cached_tokens"] == 800
+
+
+def test_prefix_layout_raises_cached_ratio(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria", "soto_pia"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+
+    ratios = {}
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        for layout in ["inline", "prefix"]:
+            args = parse_args(
+                [
+                    "--submissions-root",
+                    str(submissions),
+                    "--rubric",
+                    "examples/rubric.json",
+                    "--assignment",
+                    "examples/assignment.txt",
+                    "--output-dir",
+                    str(tmp_path / layout),
+                    "--llm-provider",
+                    "http",
+                    "--model",
+                    "fake",
+                    "--prompt-layout",
+                    layout,
+                ]
+            )
+            report = run_batch(args)
+            assert report["ok"] == 3
+            ratios[layout] = report["cached_ratio"]
+
+    assert ratios["prefix"] > ratios["inline"]
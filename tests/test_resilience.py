@@ -0,0 +1,88 @@
+import shutil
+import time
+
+import pytest
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from mvp_agent.batch import run_batch
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.llm_client import LLMHTTPError
+from mvp_agent.resilience import CircuitBreaker, CircuitOpenError, Retrier
+
+
+def _flaky(failures, exc):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc
+        return "ok"
+
+    return fn, calls
+
+
+def test_retrier_retries_transient_errors():
+    fn, calls = _flaky(2, LLMHTTPError(503))
+    retry = Retrier(max_retries=3, base_delay=0)
+    assert retry.call(fn) == "ok"
+    assert len(calls) == 3
+    assert retry.stats()["llm_retries"] == 2
+
+
+def test_retrier_does_not_retry_client_errors():
+    fn, calls = _flaky(1, LLMHTTPError(400))
+    with pytest.raises(LLMHTTPError):
+        Retrier(max_retries=3, base_delay=0).call(fn)
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes():
+    breaker = CircuitBreaker(threshold=2, reset_sec=0.05)
+    fn, calls = _flaky(10, TimeoutError("slow"))
+    with pytest.raises(CircuitOpenError):
+        Retrier(max_retries=5, base_delay=0, breaker=breaker).call(fn)
+    assert len(calls) == 2
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        Retrier(breaker=breaker).call(lambda: "ok")
+
+    time.sleep(0.06)
+    assert Retrier(breaker=breaker).call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_run_batch_retries_and_records_stats(tmp_path, monkeypatch):
+    submissions = tmp_path / "submissions"
+    for i in range(4):
+        (submissions / f"alumno_{i}").mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / f"alumno_{i}" / "entrega.ipynb")
+
+    with FakeLLMServer(error_rate=0.4, error_status=503, seed=3) as server:
+        monkeypatch.setenv("LLM_API_URL", server.url)
+        args = parse_args(
+            [
+                "--submissions-root",
+                str(submissions),
+                "--rubric",
+                "examples/rubric.json",
+                "--output-dir",
+                str(tmp_path / "out"),
+                "--llm-provider",
+                "http",
+                "--model",
+                "fake",
+                "--no-cache",
+                "--no-dedup",
+                "--max-retries",
+                "8",
+                "--retry-base-delay",
+                "0.001",
+                "--breaker-threshold",
+                "0",
+            ]
+        )
+        report = run_batch(args)
+
+    assert report["ok"] == 4
+    assert report["llm_retries"] == server.errors > 0
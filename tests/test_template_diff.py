@@ -0,0 +1,48 @@
+import json
+
+from mvp_agent.evaluator import GradingSession
+from mvp_agent.template_diff import TEMPLATE_MARKER, TemplateNotebook
+from mvp_agent.utils import read_json
+
+
+def _submission(path):
+    nb = read_json("examples/sample.ipynb")
+    # Same instructions with different line breaks and indentation.
+    nb["cells"][0]["source"] = [
+        "#  Analisis Exploratorio\n",
+        "\n",
+        "Se realiza una descripcion  basica del dataset.\n",
+    ]
+    nb["cells"][2]["source"] = "Conclusiones: la media es 10.5 y no hay outliers."
+    nb["cells"].append({"cell_type": "code", "source": "df.describe()", "outputs": []})
+    path.write_text(json.dumps(nb), encoding="utf-8")
+    return str(path)
+
+
+def _context(tmp_path, mode):
+    session = GradingSession(
+        rubric=read_json("examples/rubric.json"),
+        template=TemplateNotebook("examples/sample.ipynb", mode),
+    )
+    return session.build_context("perez_juan", _submission(tmp_path / "entrega.ipynb"))
+
+
+def test_template_cells_are_marked_and_refs_kept(tmp_path):
+    notebook = _context(tmp_path, "mark")["notebook"]
+    assert notebook["template"]["unchanged"] == ["C001", "C002"]
+    assert notebook["template"]["tokens_saved"] > 0
+    assert [c["ref"] for c in notebook["cells"]] == ["C001", "C002", "C003", "C004"]
+    assert notebook["cells"][0]["source"] == TEMPLATE_MARKER
+    assert "Se realiza una descripcion" not in notebook["text"]
+    # The student's run of an unchanged code cell is still evidence.
+    assert "[OUTPUT C002]" in notebook["text"]
+    assert "Conclusiones: la media es 10.5" in notebook["text"]
+
+
+def test_drop_mode_removes_unchanged_cells_without_outputs(tmp_path):
+    notebook = _context(tmp_path, "drop")["notebook"]
+    assert [c["ref"] for c in notebook["cells"]] == ["C002", "C003", "C004"]
+    assert "[CELL C001]" not in notebook["text"]
+    assert "[CELL C004][CODE]" in notebook["text"]
+    marked = _context(tmp_path, "mark")["notebook"]["template"]["tokens_saved"]
+    assert notebook["template"]["tokens_saved"] > marked
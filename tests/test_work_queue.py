@@ -0,0 +1,68 @@
+import csv
+import shutil
+
+from mvp_agent.batch_cli import parse_args
+from mvp_agent.work_queue import WorkQueue, run_queue_role
+
+
+def _argv(submissions, out_dir, db, role):
+    return [
+        "--submissions-root",
+        str(submissions),
+        "--rubric",
+        "examples/rubric.json",
+        "--output-dir",
+        str(out_dir),
+        "--queue-db",
+        str(db),
+        "--queue-role",
+        role,
+        "--workers",
+        "2",
+    ]
+
+
+def test_queue_enqueue_work_merge(tmp_path):
+    submissions = tmp_path / "submissions"
+    for name in ["perez_juan", "garcia_maria", "lopez_ana"]:
+        (submissions / name).mkdir(parents=True)
+        shutil.copy("examples/sample.ipynb", submissions / name / "entrega.ipynb")
+    out_dir = tmp_path / "outputs_batch"
+    db = tmp_path / "queue.sqlite"
+
+    queued = run_queue_role(parse_args(_argv(submissions, out_dir, db, "enqueue")))
+    assert queued["enqueued"] == 3
+    again = run_queue_role(parse_args(_argv(submissions, out_dir, db, "enqueue")))
+    assert again["enqueued"] == 0
+
+    worked = run_queue_role(parse_args(_argv(submissions, out_dir, db, "work")))
+    assert worked["processed"] == 3
+    assert worked["done"] == 3
+
+    report = run_queue_role(parse_args(_argv(submissions, out_dir, db, "merge")))
+    assert report["ok"] == 3
+    with open(out_dir / "gradebook_summary.csv", "r", encoding="utf-8") as f:
+        keys = [r["student_key"] for r in csv.DictReader(f)]
+    assert keys == ["garcia_maria", "lopez_ana", "perez_juan"]
+
+
+def test_expired_lease_is_reassigned_then_abandoned(tmp_path):
+    wq = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=-1, max_attempts=2)
+    wq.enqueue([("/x/perez_juan", "/x/perez_juan/a.ipynb")])
+
+    assert wq.lease("node-a")["student_key"] == "perez_juan"
+    # The lease is already expired, so another node can take the job over.
+    assert wq.lease("node-b")["student_key"] == "perez_juan"
+    assert not wq.complete("perez_juan", "node-a", {"status": "ok"})
+
+    assert wq.lease("node-c") is None
+    rows = wq.rows()
+    assert rows[0]["error"] == "lease_expired"
+
+
+def test_later_enqueues_continue_the_sequence(tmp_path):
+    wq = WorkQueue(str(tmp_path / "queue.sqlite"))
+    assert wq.enqueue([("/x/garcia_maria", ""), ("/x/perez_juan", "")]) == 2
+    assert wq.enqueue([("/x/perez_juan", ""), ("/x/abarca_luis", "")]) == 1
+    keys = [row["student_key"] for row in wq.rows()]
+    assert keys == ["garcia_maria", "perez_juan", "abarca_luis"]